@@ -0,0 +1,473 @@
+import asyncio
+import inspect
+import json
+import queue
+import threading
+from concurrent.futures import Future
+
+from model import format_created
+from query import parse_time
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+COMMAND_FAILED = -32000  # Unknown id, name taken, ...
+
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+STATUS_TEXT = {200: "OK", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+               404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 415: "Unsupported Media Type"}
+
+
+class ApiError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+## Methods
+# Each takes the BoardStore and the call's named params, runs on the thread
+# that owns the engine and returns something json.dumps can write.
+
+def find_list(engine, list_id):
+    """(board id, list dict), loading every board if the list's isn't loaded yet."""
+    found = engine.find_list(list_id)
+    if found is None:
+        engine.load_all_boards()
+        found = engine.find_list(list_id)
+    if found is None:
+        raise ApiError(COMMAND_FAILED, f"No list {list_id!r}")
+    return found
+
+
+def find_card(engine, card_id):
+    """(list id, Card), loading every board if the card's isn't loaded yet."""
+    found = engine.find_card(card_id)
+    if found is None:
+        engine.load_all_boards()
+        found = engine.find_card(card_id)
+    if found is None:
+        raise ApiError(COMMAND_FAILED, f"No card {card_id!r}")
+    return found
+
+
+def find_board(engine, board_id):
+    if board_id not in engine.boards:
+        raise ApiError(COMMAND_FAILED, f"No board {board_id!r}")
+    return engine.load_board(board_id)
+
+
+def clamp(index, length):
+    """A position in a list of length items; None means the end."""
+    return length if index is None else max(0, min(int(index), length))
+
+
+def check(value, kind, name):
+    """value, if it is a kind; bad types would otherwise fail half-way through applying a change."""
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise ApiError(INVALID_PARAMS, f"{name} must be {'text' if kind is str else 'a number'}")
+    return value
+
+
+def check_created(created):
+    """created as the "YYYY-MM-DD HH:MM" cards are created with (None for now); partial times read as in filters."""
+    if created is None:
+        return None
+    try:
+        return format_created(parse_time(check(created, str, "created")))
+    except ValueError as e:
+        raise ApiError(INVALID_PARAMS, str(e))
+
+
+def card_fields(title, width, height):
+    fields = {}
+    if title is not None:
+        fields['title'] = check(title, str, "title")
+    if width is not None:
+        fields['width'] = check(width, int, "width")
+    if height is not None:
+        fields['height'] = check(height, int, "height")
+    return fields
+
+
+def list_boards(engine):
+    return [{"id": board_id, "name": board["name"], "current": board_id == engine.current_board}
+            for board_id, board in engine.boards.items()]
+
+
+def get_board(engine, board):
+    board_data = find_board(engine, board)
+    return {"id": board, "name": board_data["name"], "lists": [
+        {"id": list_id, "name": list_data["name"], "cards": [card.to_dict() for card in list_data["cards"]]}
+        for list_id, list_data in board_data["lists"].items()
+    ]}
+
+
+def create_board(engine, name):
+    board_id = engine.create_board(check(name, str, "name"))
+    if board_id is None:
+        raise ApiError(COMMAND_FAILED, f"There is already a board named {name!r}")
+    return {"id": board_id}
+
+
+def rename_board(engine, board, name):
+    find_board(engine, board)
+    if not engine.rename_board(board, check(name, str, "name")):
+        raise ApiError(COMMAND_FAILED, f"There is already a board named {name!r}")
+    return True
+
+
+def delete_board(engine, board):
+    find_board(engine, board)
+    engine.delete_board(board)
+    return True
+
+
+def create_list(engine, name, board=None):
+    board = board or engine.current_board
+    find_board(engine, board)
+    list_id = engine.create_list(check(name, str, "name"), board)
+    if list_id is None:
+        raise ApiError(COMMAND_FAILED, f"There is already a list named {name!r} on that board")
+    return {"id": list_id}
+
+
+def rename_list(engine, list, name):
+    find_list(engine, list)
+    if not engine.rename_list(list, check(name, str, "name")):
+        raise ApiError(COMMAND_FAILED, f"There is already a list named {name!r} on that board")
+    return True
+
+
+def move_list(engine, list, index):
+    board_id, list_data = find_list(engine, list)
+    engine.move_list(list, clamp(index, len(engine.boards[board_id]["lists"]) - 1))
+    return True
+
+
+def delete_list(engine, list):
+    find_list(engine, list)
+    engine.delete_list(list)
+    return True
+
+
+def get_card(engine, card):
+    list_id, card_data = find_card(engine, card)
+    return dict(card_data.to_dict(), list=list_id)
+
+
+def create_card(engine, list, title, index=None, created=None):
+    board_id, list_data = find_list(engine, list)
+    created = check_created(created)
+    return engine.create_card(list, check(title, str, "title"), clamp(index, len(list_data["cards"])), created).to_dict()
+
+
+def update_card(engine, card, title=None, width=None, height=None):
+    find_card(engine, card)
+    fields = card_fields(title, width, height)
+    if fields:
+        engine.update_card(card, **fields)
+    return True
+
+
+def move_card(engine, card, list, index=None):
+    source_id, card_data = find_card(engine, card)
+    board_id, target = find_list(engine, list)
+    if engine.find_list(source_id)[0] != board_id:
+        raise ApiError(COMMAND_FAILED, "Cards can only be moved within their board")
+    # Counted with the card itself taken out, as in BoardStore.move_card
+    engine.move_card(card, list, clamp(index, len(target["cards"]) - (source_id == list)))
+    return True
+
+
+def delete_card(engine, card):
+    find_card(engine, card)
+    engine.delete_card(card)
+    return True
+
+
+def create_cards(engine, list, titles, index=None, created=None):
+    board_id, list_data = find_list(engine, list)
+    for title in titles:
+        check(title, str, "Each title")
+    created = check_created(created)
+    return [card.to_dict() for card in engine.create_cards(list, titles, clamp(index, len(list_data["cards"])), created)]
+
+
+def find_cards(engine, cards):
+    for card_id in cards:
+        find_card(engine, card_id)
+
+
+def move_cards(engine, cards, list, index=None):
+    find_cards(engine, cards)
+    board_id, target = find_list(engine, list)
+    moving = set(cards)
+    engine.move_cards(cards, list, None if index is None else
+                      clamp(index, sum(card.id not in moving for card in target["cards"])))
+    return True
+
+
+def update_cards(engine, cards, title=None, width=None, height=None):
+    find_cards(engine, cards)
+    fields = card_fields(title, width, height)
+    if fields:
+        engine.update_cards(cards, **fields)
+    return True
+
+
+def delete_cards(engine, cards):
+    find_cards(engine, cards)
+    engine.delete_cards(cards)
+    return True
+
+
+def search(engine, query, limit=20):
+    return [{"kind": kind, "id": item_id} for kind, item_id in engine.search(query, limit)]
+
+
+METHODS = {
+    "boards.list": list_boards,
+    "board.get": get_board,
+    "board.create": create_board,
+    "board.rename": rename_board,
+    "board.delete": delete_board,
+    "list.create": create_list,
+    "list.rename": rename_list,
+    "list.move": move_list,
+    "list.delete": delete_list,
+    "card.get": get_card,
+    "card.create": create_card,
+    "card.update": update_card,
+    "card.move": move_card,
+    "card.delete": delete_card,
+    # Batch methods: one change however many cards (one save, one re-render, one Undo step)
+    "cards.create": create_cards,
+    "cards.move": move_cards,
+    "cards.update": update_cards,
+    "cards.delete": delete_cards,
+    "search": search,
+}
+
+
+def call(engine, request):
+    """Run one JSON-RPC request object; returns its response, or None for a notification."""
+    if not isinstance(request, dict) or request.get('jsonrpc') != "2.0" or not isinstance(request.get('method'), str):
+        return error_response(None, INVALID_REQUEST, "Not a JSON-RPC 2.0 request")
+    request_id = request.get('id')
+    try:
+        method = METHODS.get(request['method'])
+        if method is None:
+            raise ApiError(METHOD_NOT_FOUND, f"No method {request['method']!r}")
+        params = request.get('params', {})
+        if not isinstance(params, dict):
+            raise ApiError(INVALID_PARAMS, "params must be an object of named parameters")
+        try:
+            inspect.signature(method).bind(engine, **params)
+        except TypeError as e:
+            raise ApiError(INVALID_PARAMS, str(e))
+        result = method(engine, **params)
+    except ApiError as e:
+        response = error_response(request_id, e.code, e.message)
+    except (KeyError, ValueError, TypeError, IndexError) as e:
+        response = error_response(request_id, COMMAND_FAILED, f"{type(e).__name__}: {e}")
+    else:
+        response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+    return response if 'id' in request else None
+
+
+def error_response(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+## API Server
+class ApiServer:
+    """A JSON-RPC 2.0 over HTTP server on localhost, for scripts and CI bots.
+
+    POST a request (or a batch: an array of them) to /rpc with
+    Content-Type: application/json; see METHODS for what can be called.
+    The server runs an asyncio loop on a background thread, which only
+    parses and answers requests. The engine is never touched there: calls
+    are queued, and the thread that owns the engine (the Tk thread in the
+    app) runs everything queued so far with run_pending() and answers the
+    waiting connections. A flood of calls therefore lands as a few batches,
+    each saved and rendered once.
+
+    Only connections to 127.0.0.1 are accepted. Requests must name a local
+    Host and be JSON, so a web page can't post to it; with a token, they
+    also need "Authorization: Bearer <token>"."""
+    MAX_BODY = 16 * 1024 * 1024
+    BATCH_MAX = 1000  # Requests run per run_pending() call; the rest wait for the next
+
+    def __init__(self, engine, port, token=None, host="127.0.0.1"):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.token = token
+        self.calls = queue.SimpleQueue()  # (requests, Future), filled by the loop thread
+        self.loop = None
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """Start listening on a background thread; raises OSError if the port can't be bound."""
+        started = Future()
+        self.thread = threading.Thread(target=self.run, args=(started,), daemon=True)
+        self.thread.start()
+        started.result()
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def run(self, started):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self.handle_connection, self.host, self.port))
+        except OSError as e:
+            started.set_exception(e)
+            self.loop.close()
+            return
+        started.set_result(None)
+        try:
+            self.loop.run_forever()
+        finally:
+            # Open keep-alive connections are dropped rather than waited for
+            self.server.close()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def stop(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+        self.thread = None
+
+    # --- Engine side ---
+
+    def run_pending(self, timeout=None):
+        """Run queued calls on the engine, at most BATCH_MAX requests; returns how many ran.
+
+        Must be called from the thread that owns the engine. With a timeout,
+        waits up to that long for the first call."""
+        count = 0
+        while count < self.BATCH_MAX:
+            try:
+                if count == 0 and timeout:
+                    requests, future = self.calls.get(timeout=timeout)
+                else:
+                    requests, future = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            if future.cancelled():
+                # The server stopped while this waited
+                continue
+            try:
+                future.set_result([call(self.engine, request) for request in requests])
+            except Exception as e:
+                # A bug, not a bad request: answer it rather than leave the client hanging
+                print(f"API call failed. Error: {e!r}")
+                future.set_result([error_response(request.get('id') if isinstance(request, dict) else None,
+                                                  COMMAND_FAILED, repr(e)) for request in requests])
+            count += len(requests)
+        return count
+
+    # --- HTTP side (the loop thread) ---
+
+    async def handle_connection(self, reader, writer):
+        """Serve one keep-alive connection, a request at a time."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > self.MAX_BODY:
+                    await self.respond(writer, 413, None, keep_alive=False)
+                    break
+                body = await reader.readexactly(length)
+                keep_alive = version == "HTTP/1.1" and headers.get('connection', '').lower() != "close"
+                status, payload = await self.handle_request(method, path, headers, body)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, method, path, headers, body):
+        """(HTTP status, JSON payload or None) for one HTTP request."""
+        if path.split("?")[0] not in ("/", "/rpc"):
+            return 404, None
+        if method != "POST":
+            return 405, None
+        if headers.get('host', '').rsplit(':', 1)[0] not in LOCAL_HOSTS:
+            return 403, None
+        if not headers.get('content-type', '').startswith("application/json"):
+            return 415, None
+        if self.token and headers.get('authorization') != f"Bearer {self.token}":
+            return 401, None
+        try:
+            requests = json.loads(body)
+        except ValueError as e:
+            return 200, error_response(None, PARSE_ERROR, f"Invalid JSON: {e}")
+        batch = isinstance(requests, list)
+        if batch and not requests:
+            return 200, error_response(None, INVALID_REQUEST, "Empty batch")
+        future = Future()
+        self.calls.put((requests if batch else [requests], future))
+        responses = [response for response in await asyncio.wrap_future(future) if response is not None]
+        if not responses:
+            return 204, None
+        return 200, responses if batch else responses[0]
+
+    async def respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                + ("Content-Type: application/json\r\n" if body else "")
+                + ("" if keep_alive else "Connection: close\r\n")
+                + "\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    from board_store import BoardStore
+    from storage import open_store
+
+    if len(sys.argv) < 3:
+        print("Usage: python api.py taskflow_data.json PORT")
+        sys.exit(1)
+    # Serve a data file without the window, saving after each batch
+    engine = BoardStore(open_store(sys.argv[1]))
+    engine.load()
+    server = ApiServer(engine, int(sys.argv[2]), os.environ.get("TASKFLOW_API_TOKEN"))
+    server.start()
+    print(f"Serving {sys.argv[1]} on http://127.0.0.1:{server.port}/rpc", file=sys.stderr)
+    try:
+        while True:
+            engine.sync()
+            server.run_pending(timeout=0.5)
+            engine.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        engine.close()
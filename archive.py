@@ -0,0 +1,157 @@
+import os
+
+from board_store import BoardStore
+from storage import open_store
+
+
+def archive_file(data_file):
+    """Where a data file's archive lives: taskflow_data.json -> taskflow_data.archive.json (same backend)."""
+    stem, ext = os.path.splitext(data_file)
+    return f"{stem}.archive{ext or '.json'}"
+
+
+def parse_archive_rules(text):
+    """Auto-archive rules from text like "Done=14,Shipped=30": {list name: days}.
+
+    Entries that don't read as 'name=days' are reported and skipped."""
+    rules = {}
+    for entry in text.split(","):
+        if not entry.strip():
+            continue
+        name, _, days = entry.rpartition("=")
+        try:
+            if not name.strip():
+                raise ValueError(entry)
+            rules[name.strip()] = int(days)
+        except ValueError:
+            print(f"Ignoring auto-archive rule {entry.strip()!r}: expected 'List name=days'")
+    return rules
+
+
+## Archive
+class Archive:
+    """Cold storage for archived cards and lists, in a data file of its own.
+
+    The archive file has the same layout as the main one: boards and lists
+    under the ids (and names) they had when their cards were archived, so a
+    card can go back where it came from. It is opened on first use, so
+    starting the app never reads it, and archived cards cost the main file
+    and the board view nothing.
+
+    BoardStore calls store_items and drop_items around changes flagged
+    'archive'. Each side is written out before the other one lets go, so a
+    crash can leave an item in both files but never in neither."""
+    def __init__(self, data_file):
+        self.data_file = data_file
+        self.engine = None  # A BoardStore over the archive file, once opened
+
+    def open(self):
+        """The archive's BoardStore, loading it (every board) on first call.
+
+        Later calls take in what other processes archived since (see BoardStore.sync)."""
+        if self.engine is None:
+            engine = BoardStore(open_store(self.data_file))
+            engine.load()
+            engine.load_all_boards()
+            self.engine = engine
+        elif self.engine.sync() is None:
+            self.engine.load_all_boards()
+        return self.engine
+
+    def is_open(self):
+        return self.engine is not None
+
+    def close(self):
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
+
+    # --- Queries ---
+
+    @property
+    def boards(self):
+        return self.open().boards
+
+    def find_card(self, card_id):
+        """Return (board id, list id, Card) for an archived card, or None."""
+        engine = self.engine or self.open()
+        found = engine.find_card(card_id)
+        if not found:
+            return None
+        return engine.find_list(found[0])[0], found[0], found[1]
+
+    def list_name(self, list_id):
+        return (self.engine or self.open()).find_list(list_id)[1]["name"]
+
+    # --- Mirroring the main store ---
+
+    def store_items(self, data, change):
+        """Add the cards a delete_cards or delete_list change is about to take off a board in data, and save them."""
+        board = data['boards'][change['board']]
+        if change['op'] == 'delete_list':
+            lists = {change['list']: board["lists"][change['list']]["cards"]}
+        else:
+            lists = {}
+            for list_id, card_ids in change['lists'].items():
+                wanted = set(card_ids)
+                lists[list_id] = [card for card in board["lists"][list_id]["cards"] if card.id in wanted]
+
+        engine = self.open()
+        self.ensure_board(board)
+        places = {}
+        for list_id, cards in lists.items():
+            self.ensure_list(board["id"], board["lists"][list_id])
+            end = len(engine.find_list(list_id)[1]["cards"])
+            places[list_id] = [[end + offset, card] for offset, card in enumerate(cards)]
+        if places:
+            engine.apply({'op': 'add_cards', 'board': board["id"], 'places': places}, record=False)
+        engine.flush()
+
+    def drop_items(self, change):
+        """Take out the cards an add_cards or restore_list change has just put back on a board, and save."""
+        if change['op'] == 'restore_list':
+            card_ids = [card.id for card in change['data']["cards"]]
+        else:
+            card_ids = [card.id for places in change['places'].values() for position, card in places]
+        self.delete(card_ids)
+
+    def delete(self, card_ids):
+        """Remove archived cards for good, along with any archive list left empty."""
+        engine = self.open()
+        boards = {}  # Board id -> {list id: [card ids]}
+        for card_id in card_ids:
+            found = self.find_card(card_id)
+            if found:
+                board_id, list_id, card = found
+                boards.setdefault(board_id, {}).setdefault(list_id, []).append(card_id)
+        for board_id, lists in boards.items():
+            engine.apply({'op': 'delete_cards', 'board': board_id, 'lists': lists}, record=False)
+            for list_id in lists:
+                if not engine.find_list(list_id)[1]["cards"]:
+                    engine.apply({'op': 'delete_list', 'board': board_id, 'list': list_id}, record=False)
+            if not engine.boards[board_id]["lists"]:
+                engine.apply({'op': 'delete_board', 'board': board_id, 'current': None}, record=False)
+        engine.flush()
+
+    def ensure_board(self, board):
+        """Give the archive a board with board's id, under its current name if that's free."""
+        engine = self.engine
+        name = board["name"]
+        owner = engine.board_id_by_name(name)
+        if owner not in (None, board["id"]):
+            # An archived board of a deleted board can still hold the name
+            name = f"{name} ({board['id'][:8]})"
+        if board["id"] not in engine.boards:
+            engine.apply({'op': 'create_board', 'board': board["id"], 'name': name}, record=False)
+        elif engine.boards[board["id"]]["name"] != name:
+            engine.apply({'op': 'rename_board', 'board': board["id"], 'name': name}, record=False)
+
+    def ensure_list(self, board_id, list_data):
+        engine = self.engine
+        found = engine.find_list(list_data["id"])
+        if found is None:
+            engine.apply({'op': 'create_list', 'board': board_id, 'list': list_data["id"],
+                          'name': list_data["name"]}, record=False)
+        elif found[1]["name"] != list_data["name"]:
+            engine.apply({'op': 'rename_list', 'board': board_id, 'list': list_data["id"],
+                          'name': list_data["name"]}, record=False)
@@ -0,0 +1,524 @@
+"""Benchmarks for loading, saving and rendering boards of a given shape.
+
+    python benchmark.py run --shapes 10x100,50x1000 --output results.json
+    python benchmark.py compare baseline.json results.json
+    python benchmark.py memory --cards 200000
+    python benchmark.py api --clients 16 --requests 2000
+
+A shape is LISTSxCARDS, with CARDS cards in each list. Every shape runs in
+its own process on a freshly generated data file, so peak RSS is per shape.
+The rendering benchmarks need a display; without one, Xvfb is started if it
+is installed, and otherwise only the headless ones run (or pass --headless).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+from board_store import BoardStore
+from model import DATA_VERSION, new_id, pack_cards
+from storage import BinaryStore, JournalStore, SQLiteStore, open_store
+
+DEFAULT_SHAPES = "10x100,50x1000,200x5000"
+SAVE_BATCH = 1000  # Changes per save_data run
+BACKEND_EXTENSIONS = {"json": ".json", "sqlite": ".db", "binary": ".tfb"}
+
+
+## Synthetic Boards
+def parse_shape(shape):
+    lists, cards = shape.lower().split("x")
+    return int(lists), int(cards)
+
+
+def generate_data(num_lists, cards_per_list):
+    """A big board to measure plus a one-card board to switch away to."""
+    lists = {}
+    for list_number in range(num_lists):
+        list_id = new_id()
+        lists[list_id] = {
+            "id": list_id,
+            "name": f"List {list_number}",
+            "cards": [
+                {"id": new_id(), "title": f"Card {list_number}.{card_number}", "created": "2024-01-01 09:00"}
+                for card_number in range(cards_per_list)
+            ]
+        }
+    bench = {"id": new_id(), "name": "Bench", "lists": lists}
+    other_list = new_id()
+    other = {"id": new_id(), "name": "Other", "lists": {other_list: {"id": other_list, "name": "List", "cards": [
+        {"id": new_id(), "title": "Card", "created": "2024-01-01 09:00"}
+    ]}}}
+    return {'version': DATA_VERSION, 'boards': {bench["id"]: bench, other["id"]: other}, 'current_board': bench["id"]}
+
+
+def write_data(data, data_file):
+    if data_file.endswith(".db"):
+        store = SQLiteStore(data_file)
+        store.load()
+        store.import_data(data)
+        store.close()
+    elif data_file.endswith(".tfb"):
+        BinaryStore(data_file).write_atomic(data, 0)
+    else:
+        store = JournalStore(data_file)
+        store.write_atomic(data, 0)
+
+
+## Measurements
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def measure(results, name, operation, repeat, setup=None, settle=None, widgets=None):
+    """Time operation() repeat times and record wall time, peak RSS and widget count."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        operation()
+        if settle:
+            # Let Tk finish the layout and drawing the operation caused
+            settle()
+        times.append((time.perf_counter() - start) * 1000)
+    results[name] = {
+        'wall_ms': statistics.median(times),
+        'min_ms': min(times),
+        'max_ms': max(times),
+        'runs': repeat,
+        'peak_rss_kb': peak_rss_kb()
+    }
+    if widgets:
+        results[name]['widgets'] = widgets()
+
+
+def bench_headless(data_file, bench_id, repeat, results):
+    state = {}
+
+    def open_engine():
+        state['engine'] = BoardStore(open_store(data_file))
+
+    def load():
+        state['engine'].load()
+        state['engine'].load_board(bench_id)
+
+    measure(results, 'load_data', load, repeat, setup=open_engine)
+
+    engine = state['engine']
+    list_ids = list(engine.boards[bench_id]["lists"])
+    cards = [card["id"] for card in engine.boards[bench_id]["lists"][list_ids[0]]["cards"]]
+
+    def save():
+        for number in range(SAVE_BATCH):
+            engine.rename_card(cards[number % len(cards)], f"Renamed {number}")
+        engine.flush()
+
+    if cards:
+        measure(results, 'save_data', save, repeat)
+    engine.close()
+
+
+def bench_gui(data_file, bench_id, repeat, results):
+    os.environ["TASKFLOW_DATA_FILE"] = data_file
+    import customtkinter as ctk
+    import taskflow
+
+    root = ctk.CTk()
+    state = {}
+
+    def settle():
+        root.update()
+
+    def start():
+        state['app'] = taskflow.TaskBoard(root)
+
+    # Construction loads the data and renders the current board once
+    measure(results, 'startup', start, 1, settle=settle, widgets=lambda: count_widgets(root))
+    app = state['app']
+
+    measure(results, 'render_board', app.render_board, repeat, settle=settle, widgets=lambda: count_widgets(root))
+
+    list_ids = list(app.boards[bench_id]["lists"])
+    measure(results, 'render_list_cards', lambda: app.render_list_cards(list_ids[0]), repeat,
+            settle=settle, widgets=lambda: count_widgets(root))
+
+    if len(list_ids) > 1 and app.boards[bench_id]["lists"][list_ids[0]]["cards"]:
+        def drop():
+            # Drag the first card of the first list onto the middle of the second list
+            source = app.list_frames[list_ids[0]]
+            view = source.cards_view
+            widget = view.visible_items[0][0] if hasattr(view, 'visible_items') else view.card_tag(0)
+            app.start_drag(None, widget, list_ids[0], 0)
+            target = app.list_frames[list_ids[1]].cards_view.canvas
+            app.on_drop(types.SimpleNamespace(
+                x_root=target.winfo_rootx() + target.winfo_width() // 2,
+                y_root=target.winfo_rooty() + target.winfo_height() // 2
+            ))
+
+        measure(results, 'on_drop', drop, repeat, settle=settle, widgets=lambda: count_widgets(root))
+
+    def switch_away():
+        app.board_selected("Other")
+        settle()
+
+    measure(results, 'board_switch', lambda: app.board_selected("Bench"), repeat,
+            setup=switch_away, settle=settle, widgets=lambda: count_widgets(root))
+
+    app.on_close()
+
+
+def run_shape(shape, backend, repeat, headless):
+    """Benchmark one shape in this process; returns {operation: measurements}."""
+    num_lists, cards_per_list = parse_shape(shape)
+    work_dir = tempfile.mkdtemp(prefix="taskflow-bench-")
+    try:
+        data_file = os.path.join(work_dir, "bench" + BACKEND_EXTENSIONS[backend])
+        data = generate_data(num_lists, cards_per_list)
+        bench_id = data["current_board"]
+        write_data(data, data_file)
+        del data
+
+        results = {}
+        bench_headless(data_file, bench_id, repeat, results)
+        if not headless:
+            bench_gui(data_file, bench_id, repeat, results)
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def card_memory(count, seed=0):
+    """Bytes per card held as loaded JSON dicts and as packed Cards: {'dicts': ..., 'cards': ...}."""
+    rng = random.Random(seed)
+    # Cards made over a few weeks of working hours, with some titles repeated
+    text = json.dumps({'boards': {"b": {"id": "b", "name": "Bench", "lists": {"l": {"id": "l", "name": "List", "cards": [
+        {
+            "id": new_id(),
+            "title": rng.choice(("Review", "Fix bug", "Write docs")) if rng.random() < 0.2 else f"Card {number}",
+            "created": f"2024-03-{rng.randint(1, 28):02d} {rng.randint(9, 17):02d}:{rng.randint(0, 59):02d}",
+            **({'width': 300, 'height': 120} if rng.random() < 0.1 else {})
+        }
+        for number in range(count)
+    ]}}}}})
+
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        data = json.loads(text)
+        as_dicts = tracemalloc.get_traced_memory()[0] - start
+        pack_cards(data)
+        as_cards = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return {'dicts': as_dicts / count, 'cards': as_cards / count}
+
+
+## API Load Test
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_api_server(data_file, port):
+    """Run api.py on data_file in its own process, returning once it accepts connections."""
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api.py"),
+                               data_file, str(port)], stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return server
+        except OSError:
+            if server.poll() is not None or time.monotonic() > deadline:
+                server.kill()
+                raise RuntimeError("The API server didn't start")
+            time.sleep(0.05)
+
+
+class ApiClient:
+    """One keep-alive HTTP connection making JSON-RPC calls, one at a time."""
+    def __init__(self, port, token=None):
+        self.port = port
+        self.token = token
+        self.next_id = 1
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+    async def post(self, payload):
+        body = json.dumps(payload).encode()
+        head = (f"POST /rpc HTTP/1.1\r\nHost: 127.0.0.1:{self.port}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                + (f"Authorization: Bearer {self.token}\r\n" if self.token else "") + "\r\n")
+        self.writer.write(head.encode() + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        body = await self.reader.readexactly(length)
+        if status != 200:
+            raise RuntimeError(f"HTTP {status}")
+        return json.loads(body)
+
+    def request(self, method, **params):
+        self.next_id += 1
+        return {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params}
+
+    async def call(self, method, **params):
+        response = await self.post(self.request(method, **params))
+        if 'error' in response:
+            raise RuntimeError(f"{method}: {response['error']['message']}")
+        return response['result']
+
+    def close(self):
+        self.writer.close()
+
+
+async def api_load(port, token, clients, requests, batch):
+    """Have clients connections each make requests requests; returns (seconds, [latency ms], calls made).
+
+    Each request creates batch cards in one list (a JSON-RPC batch array when
+    batch > 1); every other single-call request moves the card made before
+    it to a second list instead, so both kinds of change are measured."""
+    setup = ApiClient(port, token)
+    await setup.connect()
+    board_id = (await setup.call("board.create", name=f"API load {new_id()[:6]}"))["id"]
+    todo = (await setup.call("list.create", board=board_id, name="To do"))["id"]
+    done = (await setup.call("list.create", board=board_id, name="Done"))["id"]
+    setup.close()
+
+    latencies = []
+    errors = []
+
+    async def run_client(number):
+        client = ApiClient(port, token)
+        await client.connect()
+        last_card = None
+        for request_number in range(requests):
+            if batch > 1:
+                payload = [client.request("card.create", list=todo, title=f"Card {number}.{request_number}.{item}")
+                           for item in range(batch)]
+            elif last_card and request_number % 2:
+                payload = client.request("card.move", card=last_card, list=done, index=0)
+            else:
+                payload = client.request("card.create", list=todo, title=f"Card {number}.{request_number}")
+            start = time.perf_counter()
+            response = await client.post(payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            for item in response if batch > 1 else [response]:
+                if 'error' in item:
+                    errors.append(item['error']['message'])
+                elif isinstance(item['result'], dict):
+                    last_card = item['result']['id']
+        client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(number) for number in range(clients)))
+    elapsed = time.perf_counter() - start
+    if errors:
+        print(f"{len(errors)} call(s) failed, e.g. {errors[0]}", file=sys.stderr)
+    return elapsed, latencies, clients * requests * batch
+
+
+## Display
+def ensure_display():
+    """Return an Xvfb process started for the benchmarks, None if a display exists, or False."""
+    if os.environ.get("DISPLAY"):
+        return None
+    if not shutil.which("Xvfb"):
+        return False
+    display = ":97"
+    xvfb = subprocess.Popen(["Xvfb", display, "-screen", "0", "1600x1000x24"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1)
+    os.environ["DISPLAY"] = display
+    return xvfb
+
+
+## Commands
+def run(args):
+    headless = args.headless
+    xvfb = None
+    if not headless:
+        xvfb = ensure_display()
+        if xvfb is False:
+            print("No display and no Xvfb; running the headless benchmarks only.", file=sys.stderr)
+            headless = True
+
+    report = {
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'backend': args.backend,
+        'repeat': args.repeat,
+        'shapes': {}
+    }
+    try:
+        for shape in args.shapes.split(","):
+            print(f"Benchmarking {shape} ({args.backend})...", file=sys.stderr)
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+                out_file = out.name
+            command = [sys.executable, os.path.abspath(__file__), "shape", shape,
+                       "--backend", args.backend, "--repeat", str(args.repeat), "--output", out_file]
+            if headless:
+                command.append("--headless")
+            # taskflow prints on import, so results come back through a file
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            with open(out_file) as f:
+                report['shapes'][shape] = json.load(f)
+            os.remove(out_file)
+    finally:
+        if xvfb:
+            xvfb.terminate()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def shape(args):
+    results = run_shape(args.shape, args.backend, args.repeat, args.headless)
+    with open(args.output, "w") as f:
+        json.dump(results, f)
+
+
+def memory(args):
+    result = card_memory(args.cards)
+    print(f"{args.cards} cards: {result['dicts']:.0f} bytes/card as dicts, {result['cards']:.0f} as Cards "
+          f"({1 - result['cards'] / result['dicts']:.0%} less)")
+
+
+def compare(args):
+    """Print each operation's change against the baseline; exit 1 if any regressed."""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = 0
+    for shape_name, operations in current['shapes'].items():
+        base_operations = baseline['shapes'].get(shape_name)
+        if base_operations is None:
+            print(f"{shape_name}: not in baseline")
+            continue
+        for name, result in operations.items():
+            base = base_operations.get(name)
+            if base is None:
+                print(f"{shape_name} {name}: not in baseline")
+                continue
+            flags = []
+            ratio = result['wall_ms'] / base['wall_ms'] if base['wall_ms'] else 1.0
+            # Tiny timings are mostly noise, so they must also grow by min_ms
+            if ratio > 1 + args.tolerance and result['wall_ms'] - base['wall_ms'] > args.min_ms:
+                flags.append("time")
+            if result['peak_rss_kb'] > base['peak_rss_kb'] * (1 + args.tolerance):
+                flags.append("memory")
+            if result.get('widgets', 0) > base.get('widgets', 0) * (1 + args.tolerance):
+                flags.append("widgets")
+            regressions += bool(flags)
+            print(f"{shape_name} {name}: {base['wall_ms']:.1f} -> {result['wall_ms']:.1f} ms "
+                  f"({ratio - 1:+.0%}), rss {base['peak_rss_kb']} -> {result['peak_rss_kb']} kB"
+                  + (f", widgets {base['widgets']} -> {result['widgets']}" if 'widgets' in result and 'widgets' in base else "")
+                  + (f"  REGRESSION ({', '.join(flags)})" if flags else ""))
+
+    print(f"{regressions} regression(s)")
+    sys.exit(1 if regressions else 0)
+
+
+def api(args):
+    server = None
+    work_dir = None
+    port = args.port
+    if port is None:
+        # Nothing to talk to: serve a fresh data file headless, in another process
+        work_dir = tempfile.mkdtemp(prefix="taskflow-api-")
+        port = free_port()
+        server = start_api_server(os.path.join(work_dir, "api" + BACKEND_EXTENSIONS[args.backend]), port)
+    try:
+        elapsed, latencies, calls = asyncio.run(api_load(port, args.token, args.clients, args.requests, args.batch))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    latencies.sort()
+    print(f"{len(latencies)} requests ({calls} calls) from {args.clients} clients in {elapsed:.2f} s: "
+          f"{len(latencies) / elapsed:.0f} requests/s, {calls / elapsed:.0f} calls/s, latency "
+          f"p50 {latencies[len(latencies) // 2]:.1f} ms, p99 {latencies[len(latencies) * 99 // 100]:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TaskFlow performance benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="benchmark board shapes and write a JSON report")
+    run_parser.add_argument("--shapes", default=DEFAULT_SHAPES, help="comma-separated LISTSxCARDS (default: %(default)s)")
+    run_parser.add_argument("--backend", choices=tuple(BACKEND_EXTENSIONS), default="json")
+    run_parser.add_argument("--repeat", type=int, default=5, help="runs per operation; the median is reported")
+    run_parser.add_argument("--headless", action="store_true", help="skip the benchmarks that need a display")
+    run_parser.add_argument("--output", help="write the report here instead of stdout")
+    run_parser.set_defaults(func=run)
+
+    shape_parser = commands.add_parser("shape", help=argparse.SUPPRESS)
+    shape_parser.add_argument("shape")
+    shape_parser.add_argument("--backend", choices=tuple(BACKEND_EXTENSIONS), default="json")
+    shape_parser.add_argument("--repeat", type=int, default=5)
+    shape_parser.add_argument("--headless", action="store_true")
+    shape_parser.add_argument("--output", required=True)
+    shape_parser.set_defaults(func=shape)
+
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline report")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative growth (default: %(default)s)")
+    compare_parser.add_argument("--min-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    compare_parser.set_defaults(func=compare)
+
+    memory_parser = commands.add_parser("memory", help="compare the memory used per card by dicts and Cards")
+    memory_parser.add_argument("--cards", type=int, default=200000)
+    memory_parser.set_defaults(func=memory)
+
+    api_parser = commands.add_parser("api", help="load-test the automation API and report requests per second")
+    api_parser.add_argument("--port", type=int, help="a running TaskFlow's TASKFLOW_API_PORT (default: start "
+                                                     "a headless server on a scratch file)")
+    api_parser.add_argument("--token", help="its TASKFLOW_API_TOKEN, if set")
+    api_parser.add_argument("--backend", choices=tuple(BACKEND_EXTENSIONS), default="json",
+                            help="store for the headless server")
+    api_parser.add_argument("--clients", type=int, default=16, help="concurrent connections")
+    api_parser.add_argument("--requests", type=int, default=1000, help="requests per client")
+    api_parser.add_argument("--batch", type=int, default=1, help="card.create calls per JSON-RPC batch request")
+    api_parser.set_defaults(func=api)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
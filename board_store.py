@@ -0,0 +1,605 @@
+from history import History
+from model import BOARD_HEADER_OPS, BoardIndex, Card, apply_change, inverse_change, new_id, now_created, parse_created
+from query import SortedCardIndex, insort_by
+from search import SearchIndex
+
+
+def clamp_index(index, length):
+    """index moved into 0..length, so every store is handed the same position (SQLite can't take others)."""
+    return max(0, min(int(index), length))
+
+
+## Board Store
+class BoardStore:
+    """The boards, lists and cards behind the app, with no Tk involved.
+
+    Every edit goes through a command method, which turns it into a change
+    record, applies it, queues it with the persistence store and then hands
+    it to each subscriber. The change records double as events: they say
+    which board, list and card were touched, so a UI can re-render just that.
+    Commands that would clash with an existing name return None or False
+    instead of applying anything. Every command except select_board can be
+    undone and redone; history records the inverse of each change.
+
+    With an Archive (archive.py), cards and lists can be archived and
+    restored. Those are ordinary delete and add changes flagged 'archive',
+    which the archive mirrors, so undoing them moves the items back too.
+
+    Other processes can edit the same file at the same time; sync() takes
+    in what they saved.
+
+    Without query_indexes, the search and sorted-card indexes are only built
+    when search() or query() first needs them, so a script that just edits
+    doesn't pay for indexing every card at load.
+
+    Scripts can drive it directly:
+
+        engine = BoardStore(open_store("boards.json"))
+        engine.load()
+        board_id = engine.create_board("Sprint")
+        todo = engine.create_list("To do")
+        engine.create_card(todo, "Write docs")
+        engine.close()
+    """
+    def __init__(self, store, history=None, archive=None, query_indexes=True):
+        self.store = store
+        self.history = history or History()
+        self.archive = archive
+        self.query_indexes = query_indexes
+        self.data = {'boards': {}, 'current_board': None}
+        self.index = BoardIndex()
+        self.search_index = SearchIndex() if query_indexes else None
+        self.sorted_cards = SortedCardIndex() if query_indexes else None
+        self.listeners = []
+
+    # --- Loading ---
+
+    def load(self):
+        """Load the boards from the store (boards it loads lazily stay unloaded)."""
+        self.data = self.store.load()
+        self.index = BoardIndex()
+        self.search_index = None
+        self.sorted_cards = None
+        self.history.clear()
+        for board in self.boards.values():
+            if board["lists"] is not None:
+                self.index.add_board(board)
+        if self.query_indexes:
+            self.build_query_indexes()
+
+    def build_query_indexes(self):
+        """Index the loaded boards for search() and query()."""
+        self.search_index = SearchIndex()
+        self.sorted_cards = SortedCardIndex()
+        for board in self.boards.values():
+            if board["lists"] is not None:
+                self.sorted_cards.add_board(board)
+            self.search_index.add_board(board)
+
+    def load_board(self, board_id):
+        """Return a board, fetching its lists and cards if the store hasn't yet."""
+        if self.boards[board_id]["lists"] is None:
+            board = self.store.load_board(board_id)
+            self.boards[board_id] = board
+            self.index.add_board(board)
+            if self.search_index is not None:
+                self.search_index.add_board(board)
+                self.sorted_cards.add_board(board)
+        return self.boards[board_id]
+
+    def load_all_boards(self):
+        """Load every board the store left unloaded (e.g. so all cards are searchable)."""
+        for board_id in list(self.boards):
+            self.load_board(board_id)
+
+    def reload(self):
+        """Load everything again from the store, after saving what's queued; keeps the current board if it's still there.
+
+        Subscribers get a {'op': 'reload'} event, as anything may have changed."""
+        self.store.flush()
+        current = self.current_board
+        self.load()
+        if current in self.boards:
+            self.data['current_board'] = current
+        if self.current_board is not None:
+            self.load_board(self.current_board)
+        self.notify({'op': 'reload'})
+
+    def flush(self):
+        self.store.flush()
+
+    def close(self):
+        self.store.close()
+        if self.archive is not None:
+            self.archive.close()
+
+    # --- Events ---
+
+    def subscribe(self, listener):
+        """Call listener(change) after every change is applied."""
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def apply(self, change, record=True):
+        """Apply a change record, queue it for saving and notify subscribers.
+
+        With record, its inverse goes on the undo stack."""
+        archiving = change.get('archive') and self.archive is not None
+        if record:
+            inverse = self.inverse(change)
+            if inverse is not None:
+                self.history.record([change], [inverse])
+        if archiving and change['op'] in ('delete_cards', 'delete_list'):
+            # Saved in the archive before leaving the board...
+            self.archive.store_items(self.data, change)
+        self.update(change)
+        self.store.append(change)
+        if archiving and change['op'] in ('add_cards', 'restore_list'):
+            # ...and saved on the board before leaving the archive
+            self.store.flush()
+            self.archive.drop_items(change)
+        self.notify(change)
+        return change
+
+    def inverse(self, change):
+        """The change that undoes change, worked out before it is applied (None if it can't be undone)."""
+        inverse = inverse_change(self.data, change, self.index)
+        if inverse is not None and change.get('archive'):
+            # Undoing an archive restores, and undoing a restore archives
+            inverse['archive'] = True
+        return inverse
+
+    def update(self, change):
+        """Apply a change record to the boards and the indexes."""
+        apply_change(self.data, change, self.index)
+        if self.search_index is not None:
+            self.search_index.apply(change)
+            self.sorted_cards.apply(change)
+
+    def notify(self, change):
+        for listener in list(self.listeners):
+            listener(change)
+
+    def sync(self):
+        """Take in the changes other processes have saved to the same file since the last sync.
+
+        Cheap when there are none (the store just stats its file), so a UI
+        can call it on a timer. Each change is applied and published like a
+        local one, so subscribers re-render just what it touched, but it
+        isn't saved again and doesn't change which board is current here.
+        Undo history is cleared, since its entries may no longer fit the
+        boards. If the store can't say what changed (SQLite never can) or a
+        change doesn't apply, everything is reloaded instead.
+        Returns the number of changes taken in, or None after a reload."""
+        changes = self.store.poll()
+        if changes is None:
+            self.reload()
+            return None
+        if not changes:
+            return 0
+        self.history.clear()
+        try:
+            for change in changes:
+                self.merge(change)
+        except (KeyError, ValueError, IndexError) as e:
+            print(f"Reloading: a change saved by another process didn't apply here. Error: {e!r}")
+            self.reload()
+            return None
+        return len(changes)
+
+    def merge(self, change):
+        """Apply a change another process made, leaving this one's current board alone."""
+        if change['op'] == 'select_board':
+            return
+        current = self.current_board
+        board = self.boards.get(change.get('board'))
+        if board is not None and board["lists"] is None and change['op'] not in BOARD_HEADER_OPS:
+            self.load_board(change['board'])
+        self.update(change)
+        if current in self.boards:
+            self.data['current_board'] = current
+        elif self.current_board is not None:
+            self.load_board(self.current_board)
+        self.notify(change)
+
+    def undo(self):
+        """Undo the latest command; returns False if there is nothing to undo."""
+        entry = self.history.pop_undo()
+        if entry is None:
+            return False
+        for change in entry['inverses']:
+            self.apply(change, record=False)
+        return True
+
+    def redo(self):
+        """Redo the latest undone command; returns False if there is nothing to redo."""
+        entry = self.history.pop_redo()
+        if entry is None:
+            return False
+        # The inverses are worked out again: they hold deleted boards, lists and
+        # cards by reference, and redoing creates new ones in their place
+        inverses = []
+        for change in entry['changes']:
+            inverses.append(self.inverse(change))
+            self.apply(change, record=False)
+        self.history.replace_inverses(entry, [inverse for inverse in reversed(inverses) if inverse is not None])
+        return True
+
+    # --- Queries ---
+
+    @property
+    def boards(self):
+        return self.data['boards']
+
+    @property
+    def current_board(self):
+        return self.data['current_board']
+
+    def board_id_by_name(self, name):
+        for board_id, board in self.boards.items():
+            if board["name"] == name:
+                return board_id
+        return None
+
+    def find_list(self, list_id):
+        """Return (board id, list dict) for a list on a loaded board, or None."""
+        return self.index.find_list(list_id)
+
+    def find_card(self, card_id):
+        """Return (list id, card dict) for a card on a loaded board, or None."""
+        return self.index.find_card(card_id)
+
+    def search(self, query, limit=20):
+        """Boards, lists and cards whose names match every word of query as a prefix.
+
+        Returns ('board' | 'list' | 'card', id) pairs; only loaded boards' lists
+        and cards are searched."""
+        if self.search_index is None:
+            self.build_query_indexes()
+        return self.search_index.search(query, limit)
+
+    def query(self, card_filter, board_id=None):
+        """The cards of each list on a board (the current one by default) that match a CardFilter.
+
+        Returns {list id: [card, ...]} for every list, in board order, with
+        each list's cards sorted as the filter asks."""
+        board_id = board_id or self.current_board
+        board = self.load_board(board_id)
+        if self.sorted_cards is None:
+            self.build_query_indexes()
+        matches = {list_id: [] for list_id in board["lists"]}
+        for card_id in self.sorted_cards.query(board_id, card_filter):
+            list_id, card = self.index.find_card(card_id)
+            matches[list_id].append(card)
+        if card_filter.sort is None:
+            for list_id, cards in matches.items():
+                cards.sort(key=lambda card: self.index.position(list_id, card.id), reverse=card_filter.descending)
+        return matches
+
+    def update_query(self, matches, card_filter, changes):
+        """Bring query() results for a board up to date with card changes on it.
+
+        Only the cards the changes touched are tested against the filter and
+        put in place, so an edit costs nothing like the whole query. Handles
+        the card ops; for anything else (lists added or removed, another
+        board) run query() again."""
+        leaving = {}  # List id -> ids of cards that left it or changed in it
+        arriving = {}  # List id -> ordered set of ids of cards to test there
+        for change in changes:
+            op = change['op']
+            if op in ('add_card', 'delete_card', 'update_card'):
+                card_id = change['card'].id if op == 'add_card' else change['card']
+                leaving.setdefault(change['list'], set()).add(card_id)
+                arriving.setdefault(change['list'], {})[card_id] = None
+            elif op == 'move_card':
+                leaving.setdefault(change['source'], set()).add(change['card'])
+                arriving.setdefault(change['target'], {})[change['card']] = None
+            elif op in ('add_cards', 'delete_cards', 'move_cards'):
+                for list_id, card_ids in change.get('lists', {}).items():
+                    leaving.setdefault(list_id, set()).update(card_ids)
+                for list_id, places in change.get('places', {}).items():
+                    card_ids = [card.id if op == 'add_cards' else card for position, card in places]
+                    arriving.setdefault(list_id, {}).update(dict.fromkeys(card_ids))
+            elif op == 'update_cards':
+                for list_id, card_id, fields in change['cards']:
+                    leaving.setdefault(list_id, set()).add(card_id)
+                    arriving.setdefault(list_id, {})[card_id] = None
+            else:
+                raise ValueError(f"update_query can't follow a {op} change")
+
+        # Every touched card is taken out first, so each card left is still in its
+        # list, then put back in the one list it is in now, if any (a later change
+        # in the batch may have moved or deleted it)
+        for list_id, card_ids in leaving.items():
+            matches[list_id] = [card for card in matches[list_id] if card.id not in card_ids]
+        for list_id, card_ids in arriving.items():
+            cards = []
+            for card_id in card_ids:
+                found = self.index.find_card(card_id)
+                if found and found[0] == list_id and card_filter.matches(found[1], list_id):
+                    cards.append(found[1])
+            if card_filter.sort is None:
+                key = lambda card: self.index.position(list_id, card.id)
+            else:
+                key = card_filter.sort_key
+            if len(cards) > SortedCardIndex.BULK:
+                matches[list_id] += cards
+                matches[list_id].sort(key=key, reverse=card_filter.descending)
+            else:
+                for card in cards:
+                    insort_by(matches[list_id], card, key, card_filter.descending)
+
+    def card_position(self, list_id, card_id):
+        return self.index.position(list_id, card_id)
+
+    def list_position(self, list_id):
+        board_id, list_data = self.index.find_list(list_id)
+        return list(self.boards[board_id]["lists"]).index(list_id)
+
+    # --- Board Commands ---
+
+    def create_board(self, name):
+        """Create a board and make it current; returns its id, or None if the name is taken."""
+        if self.board_id_by_name(name):
+            return None
+        board_id = new_id()
+        self.apply({'op': 'create_board', 'board': board_id, 'name': name})
+        return board_id
+
+    def rename_board(self, board_id, name):
+        if self.board_id_by_name(name):
+            return False
+        self.apply({'op': 'rename_board', 'board': board_id, 'name': name})
+        return True
+
+    def delete_board(self, board_id):
+        """Delete a board; if it was current, the first remaining board takes over."""
+        # Undo puts back the whole board, so it has to be in memory
+        self.load_board(board_id)
+        current = self.current_board
+        if current == board_id:
+            remaining_boards = [other for other in self.boards if other != board_id]
+            current = remaining_boards[0] if remaining_boards else None
+        self.apply({'op': 'delete_board', 'board': board_id, 'current': current})
+
+    def import_board(self, board):
+        """Add a complete board built elsewhere (e.g. by trello.py) as one change, and make it current.
+
+        However many lists and cards it has, this is one journal record, one
+        event and one undo step. A taken name gets a number appended.
+        Returns the board id."""
+        name = board["name"]
+        number = 2
+        while self.board_id_by_name(name):
+            name = f"{board['name']} ({number})"
+            number += 1
+        board["name"] = name
+        self.apply({'op': 'restore_board', 'board': board["id"], 'data': board, 'index': len(self.boards),
+                    'current': board["id"]})
+        return board["id"]
+
+    def select_board(self, board_id):
+        self.load_board(board_id)
+        self.apply({'op': 'select_board', 'board': board_id})
+
+    def set_renderer(self, board_id, renderer):
+        """Choose how the UI draws a board's cards ("widgets" or "canvas")."""
+        self.apply({'op': 'update_board', 'board': board_id, 'fields': {'renderer': renderer}})
+
+    # --- List Commands ---
+
+    def create_list(self, name, board_id=None):
+        """Append a list to a board (the current one by default); returns its id, or None."""
+        board_id = board_id or self.current_board
+        board = self.load_board(board_id)
+        if any(list_data["name"] == name for list_data in board["lists"].values()):
+            return None
+        list_id = new_id()
+        self.apply({'op': 'create_list', 'board': board_id, 'list': list_id, 'name': name})
+        return list_id
+
+    def rename_list(self, list_id, name):
+        board_id, list_data = self.index.find_list(list_id)
+        if any(other["name"] == name for other in self.boards[board_id]["lists"].values()):
+            return False
+        self.apply({'op': 'rename_list', 'board': board_id, 'list': list_id, 'name': name})
+        return True
+
+    def delete_list(self, list_id):
+        board_id, list_data = self.index.find_list(list_id)
+        self.apply({'op': 'delete_list', 'board': board_id, 'list': list_id})
+
+    def archive_list(self, list_id):
+        """Take a list and its cards off its board and into the archive."""
+        board_id, list_data = self.index.find_list(list_id)
+        self.apply({'op': 'delete_list', 'board': board_id, 'list': list_id, 'archive': True})
+
+    def move_list(self, list_id, index):
+        """Move a list to index, counted with the list itself taken out."""
+        board_id, list_data = self.index.find_list(list_id)
+        index = clamp_index(index, len(self.boards[board_id]["lists"]) - 1)
+        self.apply({'op': 'move_list', 'board': board_id, 'list': list_id, 'index': index})
+
+    # --- Card Commands ---
+
+    def create_card(self, list_id, title, index=None, created=None):
+        """Add a card to a list (at the end by default); returns the new Card.
+
+        created is a "YYYY-MM-DD HH:MM" time, now by default."""
+        board_id, list_data = self.index.find_list(list_id)
+        card = Card(new_id(), title, parse_created(created) if created else now_created())
+        change = {'op': 'add_card', 'board': board_id, 'list': list_id, 'card': card}
+        if index is not None:
+            change['index'] = clamp_index(index, len(list_data["cards"]))
+        self.apply(change)
+        return card
+
+    def rename_card(self, card_id, title):
+        self.update_card(card_id, title=title)
+
+    def resize_card(self, card_id, width, height):
+        self.update_card(card_id, width=width, height=height)
+
+    def update_card(self, card_id, **fields):
+        list_id, card = self.index.find_card(card_id)
+        board_id, list_data = self.index.find_list(list_id)
+        self.apply({'op': 'update_card', 'board': board_id, 'list': list_id, 'card': card_id, 'fields': fields})
+
+    def delete_card(self, card_id):
+        list_id, card = self.index.find_card(card_id)
+        board_id, list_data = self.index.find_list(list_id)
+        self.apply({'op': 'delete_card', 'board': board_id, 'list': list_id, 'card': card_id})
+
+    def move_card(self, card_id, target_list_id, index):
+        """Move a card to index in a list, counted with the card itself taken out (and clamped to the list)."""
+        list_id, card = self.index.find_card(card_id)
+        board_id, list_data = self.index.find_list(list_id)
+        target_board, target = self.index.find_list(target_list_id)
+        if target_board != board_id:
+            raise ValueError("Cards can only be moved within their board")
+        index = clamp_index(index, len(target["cards"]) - (target_list_id == list_id))
+        self.apply({
+            'op': 'move_card',
+            'board': board_id,
+            'card': card_id,
+            'source': list_id,
+            'target': target_list_id,
+            'index': index
+        })
+
+    # --- Bulk Card Commands ---
+    # Each is one change however many cards it covers: one pass over each
+    # list, one journal record or transaction, one event and one undo step.
+
+    def group_cards(self, card_ids):
+        """(board id, {list id: [card ids in list order]}) for cards on one board."""
+        board_id = None
+        lists = {}
+        for card_id in dict.fromkeys(card_ids):
+            list_id, card = self.index.find_card(card_id)
+            card_board, list_data = self.index.find_list(list_id)
+            if board_id is None:
+                board_id = card_board
+            elif card_board != board_id:
+                raise ValueError("Bulk card commands work on the cards of one board")
+            lists.setdefault(list_id, []).append(card_id)
+        for list_id, ids in lists.items():
+            ids.sort(key=lambda card_id: self.index.position(list_id, card_id))
+        return board_id, lists
+
+    def create_cards(self, list_id, titles, index=None, created=None):
+        """Add a card for each title to a list, in order, at index (the end by default); returns the new Cards."""
+        board_id, list_data = self.index.find_list(list_id)
+        index = len(list_data["cards"]) if index is None else clamp_index(index, len(list_data["cards"]))
+        created_at = parse_created(created) if created else now_created()
+        cards = [Card(new_id(), title, created_at) for title in titles]
+        if cards:
+            self.apply({
+                'op': 'add_cards',
+                'board': board_id,
+                'places': {list_id: [[index + offset, card] for offset, card in enumerate(cards)]}
+            })
+        return cards
+
+    def delete_cards(self, card_ids):
+        board_id, lists = self.group_cards(card_ids)
+        if lists:
+            self.apply({'op': 'delete_cards', 'board': board_id, 'lists': lists})
+
+    def archive_cards(self, card_ids):
+        """Take cards off their board and into the archive."""
+        board_id, lists = self.group_cards(card_ids)
+        if lists:
+            self.apply({'op': 'delete_cards', 'board': board_id, 'lists': lists, 'archive': True})
+
+    def move_cards(self, card_ids, target_list_id, index=None):
+        """Move cards, kept in board order, to index in a list (the end by default).
+
+        As with move_card, index is counted with the moved cards taken out."""
+        board_id, lists = self.group_cards(card_ids)
+        if not lists:
+            return
+        target_board, target = self.index.find_list(target_list_id)
+        if target_board != board_id:
+            raise ValueError("Cards can only be moved within their board")
+        staying = len(target["cards"]) - len(lists.get(target_list_id, ()))
+        index = staying if index is None else clamp_index(index, staying)
+        ordered = [card_id for list_id in self.boards[board_id]["lists"] for card_id in lists.get(list_id, ())]
+        self.apply({
+            'op': 'move_cards',
+            'board': board_id,
+            'lists': lists,
+            'places': {target_list_id: [[index + offset, card_id] for offset, card_id in enumerate(ordered)]}
+        })
+
+    def update_cards(self, card_ids, **fields):
+        board_id, lists = self.group_cards(card_ids)
+        if lists:
+            self.apply({
+                'op': 'update_cards',
+                'board': board_id,
+                'cards': [[list_id, card_id, fields] for list_id, ids in lists.items() for card_id in ids]
+            })
+
+    def resize_cards(self, card_ids, width, height):
+        """Give several cards the same size."""
+        self.update_cards(card_ids, width=width, height=height)
+
+    # --- Archive Commands ---
+
+    def restore_cards(self, card_ids):
+        """Put archived cards back at the end of the lists they came from.
+
+        A list that is no longer on its board comes back with them, and
+        cards whose board is gone go to the current board. One change per list."""
+        self.archive.open()
+        groups = {}  # (board id, list id) -> [Card]
+        for card_id in dict.fromkeys(card_ids):
+            found = self.archive.find_card(card_id)
+            if found and not self.index.find_card(card_id):
+                board_id, list_id, card = found
+                groups.setdefault((board_id, list_id), []).append(card)
+        for (board_id, list_id), cards in groups.items():
+            if board_id not in self.boards:
+                board_id = self.current_board
+            if board_id is None:
+                return
+            board = self.load_board(board_id)
+            if list_id in board["lists"]:
+                end = len(board["lists"][list_id]["cards"])
+                self.apply({
+                    'op': 'add_cards',
+                    'board': board_id,
+                    'places': {list_id: [[end + offset, card] for offset, card in enumerate(cards)]},
+                    'archive': True
+                })
+            else:
+                list_data = {"id": list_id, "name": self.archive.list_name(list_id), "cards": list(cards)}
+                self.apply({'op': 'restore_list', 'board': board_id, 'list': list_id, 'data': list_data,
+                            'index': len(board["lists"]), 'archive': True})
+
+    def auto_archive(self, rules, now=None):
+        """Archive the old cards of lists named in rules, on every loaded board.
+
+        rules maps a list name to a number of days, e.g. {"Done": 14}. Cards
+        keep no time they were last edited, so age counts from when a card
+        was created. Returns how many cards were archived."""
+        now = now or now_created()
+        count = 0
+        for board in list(self.boards.values()):
+            if board["lists"] is None:
+                continue
+            stale = []
+            for list_data in board["lists"].values():
+                days = rules.get(list_data["name"])
+                if days is None:
+                    continue
+                cutoff = now - days * 24 * 60 * 60
+                stale += [card.id for card in list_data["cards"]
+                          if isinstance(card.created_at, int) and card.created_at < cutoff]
+            if stale:
+                self.archive_cards(stale)
+                count += len(stale)
+        return count
@@ -0,0 +1,209 @@
+"""Scripted board operations, without the window.
+
+    python taskflow.py list [--board BOARD] [--json]
+    python taskflow.py export [--board BOARD] [--output FILE]
+    python taskflow.py card add --board BOARD --list LIST TITLE [TITLE...]
+    python taskflow.py card add --board BOARD --list LIST - < titles.txt
+    python taskflow.py card move --board BOARD CARD --to LIST [--index N]
+
+taskflow.py hands any subcommand to main() before it imports the GUI, so
+a command costs a Python start, the store's load and the edit. Boards and
+lists are named or given by id, cards by id or exact title; without
+--board, the board last shown in the app is used. The data file is
+TASKFLOW_DATA_FILE (taskflow_data.json) unless --data names another.
+"""
+import argparse
+import json
+import os
+import sys
+from itertools import chain
+
+from board_store import BoardStore
+from history import History
+from model import DATA_VERSION, encode_card, format_created
+from query import parse_time
+from storage import open_store
+
+STDIN_BATCH = 10000  # Titles read from stdin are added this many at a time, each batch one change
+
+
+class CommandError(Exception):
+    pass
+
+
+## Lookups
+def find_board(engine, name):
+    """The id of the board named (or with the id) name; the current board for None."""
+    if name is None:
+        if engine.current_board is None:
+            raise CommandError("There are no boards")
+        return engine.current_board
+    if name in engine.boards:
+        return name
+    board_id = engine.board_id_by_name(name)
+    if board_id is None:
+        raise CommandError(f"No board named {name!r}")
+    return board_id
+
+
+def find_list(engine, board_id, name):
+    lists = engine.load_board(board_id)["lists"]
+    if name in lists:
+        return name
+    for list_id, list_data in lists.items():
+        if list_data["name"] == name:
+            return list_id
+    raise CommandError(f"No list named {name!r} on board {engine.boards[board_id]['name']!r}")
+
+
+def find_card(engine, board_id, name):
+    """The id of the card with id name on the board, or else of its one card titled name."""
+    lists = engine.load_board(board_id)["lists"]
+    found = engine.find_card(name)
+    if found and found[0] in lists:
+        return name
+    matches = [card.id for list_data in lists.values() for card in list_data["cards"] if card.title == name]
+    if not matches:
+        raise CommandError(f"No card {name!r} on board {engine.boards[board_id]['name']!r}")
+    if len(matches) > 1:
+        raise CommandError(f"{len(matches)} cards are titled {name!r}; give the card's id instead")
+    return matches[0]
+
+
+def read_titles(stream):
+    """Non-empty lines of stream, STDIN_BATCH at a time."""
+    batch = []
+    for line in stream:
+        title = line.rstrip("\r\n")
+        if title:
+            batch.append(title)
+            if len(batch) == STDIN_BATCH:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+## Commands
+def list_command(engine, args):
+    if args.board is None and not args.json:
+        for board_id, board in engine.boards.items():
+            print(f"{'*' if board_id == engine.current_board else ' '} {board['name']}  ({board_id})")
+        return
+    if args.board is None:
+        print(json.dumps([{"id": board_id, "name": board["name"], "current": board_id == engine.current_board}
+                          for board_id, board in engine.boards.items()], indent=2))
+        return
+    board = engine.load_board(find_board(engine, args.board))
+    if args.json:
+        print(json.dumps(list(board["lists"].values()), indent=2, default=encode_card))
+        return
+    for list_id, list_data in board["lists"].items():
+        print(f"{list_data['name']}  ({list_id})")
+        for card in list_data["cards"]:
+            print(f"    {card.title}  ({card.id}, {card['created']})")
+
+
+def export_command(engine, args):
+    """Write boards as JSON in the data file's schema: one board, or the whole file."""
+    if args.board is not None:
+        data = engine.load_board(find_board(engine, args.board))
+    else:
+        engine.load_all_boards()
+        data = {'version': DATA_VERSION, 'boards': engine.boards, 'current_board': engine.current_board}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, default=encode_card)
+    else:
+        json.dump(data, sys.stdout, indent=2, default=encode_card)
+        print()
+
+
+def created_time(text):
+    """--created as the "YYYY-MM-DD HH:MM" cards are created with; partial times are read as in filters."""
+    try:
+        return format_created(parse_time(text))
+    except ValueError as e:
+        raise CommandError(str(e))
+
+
+def card_add_command(engine, args):
+    """Add cards to the end of a list and print their ids; a title of - reads titles from stdin, one per line."""
+    created = None if args.created is None else created_time(args.created)
+    board_id = find_board(engine, args.board)
+    list_id = find_list(engine, board_id, args.list)
+    titles = [title for title in args.titles if title != "-"]
+    batches = [titles] if titles else []
+    if "-" in args.titles:
+        batches = chain(batches, read_titles(sys.stdin))
+    for titles in batches:
+        cards = engine.create_cards(list_id, titles, created=created)
+        sys.stdout.write("".join(f"{card.id}\n" for card in cards))
+
+
+def card_move_command(engine, args):
+    board_id = find_board(engine, args.board)
+    card_id = find_card(engine, board_id, args.card)
+    target_id = find_list(engine, board_id, args.to)
+    source_id = engine.find_card(card_id)[0]
+    # Counted with the card itself taken out, as in BoardStore.move_card
+    length = len(engine.find_list(target_id)[1]["cards"]) - (source_id == target_id)
+    index = length if args.index is None else max(0, min(args.index, length))
+    engine.move_card(card_id, target_id, index)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="taskflow.py", description="Edit TaskFlow boards from the command line")
+    parser.add_argument("--data", default=os.environ.get("TASKFLOW_DATA_FILE", "taskflow_data.json"),
+                        help="data file (default: TASKFLOW_DATA_FILE or %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="show the boards, or a board's lists and cards")
+    list_parser.add_argument("--board")
+    list_parser.add_argument("--json", action="store_true")
+    list_parser.set_defaults(func=list_command)
+
+    export_parser = commands.add_parser("export", help="write the boards (or one) as JSON")
+    export_parser.add_argument("--board")
+    export_parser.add_argument("--output", help="file to write instead of stdout")
+    export_parser.set_defaults(func=export_command)
+
+    card_parser = commands.add_parser("card", help="add or move cards")
+    card_commands = card_parser.add_subparsers(dest="card_command", required=True)
+    add_parser = card_commands.add_parser("add", help="add cards to the end of a list, printing their ids")
+    add_parser.add_argument("--board")
+    add_parser.add_argument("--list", required=True)
+    add_parser.add_argument("--created",
+                            help='creation time, "YYYY-MM-DD HH:MM" or a leading part of it (default: now)')
+    add_parser.add_argument("titles", nargs="+", metavar="TITLE", help="- reads titles from stdin, one per line")
+    add_parser.set_defaults(func=card_add_command)
+    move_parser = card_commands.add_parser("move", help="move a card to another list on its board")
+    move_parser.add_argument("--board")
+    move_parser.add_argument("card", help="card id or title")
+    move_parser.add_argument("--to", required=True, help="list name or id")
+    move_parser.add_argument("--index", type=int, help="position in the list (default: the end)")
+    move_parser.set_defaults(func=card_move_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Nothing here searches or undoes, so no indexes for that are built and no history kept
+    engine = BoardStore(open_store(args.data), History(max_entries=0), query_indexes=False)
+    engine.load()
+    try:
+        args.func(engine, args)
+    except CommandError as e:
+        print(e, file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Output piped into something that stopped reading (e.g. head); the edits are still saved
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
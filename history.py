@@ -0,0 +1,89 @@
+from collections import deque
+
+from model import Card
+
+CARD_BYTES = 200  # Rough cost of a card held in a change: the object, its id, title and time
+FIELD_BYTES = 50  # And of any other value: an id, a name, a position
+
+
+def change_size(value):
+    """Rough memory cost of a change record, counted in cards and fields.
+
+    Every list in a change holds items of one shape (ids, cards, or rows such
+    as [position, card] and [list id, card id, fields]), so a list costs its
+    first item times its length, and a bulk change costs next to nothing to
+    weigh. A row's elements are each weighed, cards and fields included."""
+    if isinstance(value, Card):
+        return CARD_BYTES
+    if isinstance(value, dict):
+        return sum(FIELD_BYTES + change_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return FIELD_BYTES
+        first = value[0]
+        if isinstance(first, (list, tuple)):
+            return len(value) * sum(map(change_size, first))
+        return len(value) * change_size(first)
+    return FIELD_BYTES
+
+
+## History
+class History:
+    """Undo and redo stacks of change records, capped by their total size.
+
+    Each entry is one user action: the changes it applied and the inverse
+    changes that undo it, in the order to apply them. Recording a new action
+    drops the redo stack. When the entries outgrow max_bytes (or max_entries),
+    the oldest are evicted; the newest is always kept, however big. With
+    max_entries=0 nothing is kept, for scripts that never undo."""
+    def __init__(self, max_bytes=16 * 1024 * 1024, max_entries=1000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.size = 0  # Bytes held by both stacks
+
+    def record(self, changes, inverses):
+        if not self.max_entries:
+            return
+        entry = {'changes': changes, 'inverses': inverses, 'size': sum(map(change_size, changes + inverses))}
+        for dropped in self.redo_stack:
+            self.size -= dropped['size']
+        self.redo_stack = []
+        self.undo_stack.append(entry)
+        self.size += entry['size']
+        while len(self.undo_stack) > 1 and (self.size > self.max_bytes or len(self.undo_stack) > self.max_entries):
+            self.size -= self.undo_stack.popleft()['size']
+
+    def pop_undo(self):
+        """The latest entry to undo (moved to the redo stack), or None."""
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        self.redo_stack.append(entry)
+        return entry
+
+    def pop_redo(self):
+        """The latest undone entry to redo (moved back to the undo stack), or None."""
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        self.undo_stack.append(entry)
+        return entry
+
+    def replace_inverses(self, entry, inverses):
+        """Give an entry the inverses worked out as it was redone."""
+        size = sum(map(change_size, entry['changes'] + inverses))
+        self.size += size - entry['size']
+        entry['inverses'], entry['size'] = inverses, size
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack = []
+        self.size = 0
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
@@ -0,0 +1,592 @@
+import os
+import sys
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import islice
+
+# Version 1 keyed boards and lists by their display names; version 2 gives
+# boards, lists and cards persistent ids and keys them by id.
+DATA_VERSION = 2
+
+# Ops that only touch a board's name and settings, never its lists
+BOARD_HEADER_OPS = ('create_board', 'delete_board', 'restore_board', 'rename_board', 'update_board', 'select_board')
+
+
+# How card creation times are written in the data files and shown on cards
+CREATED_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def new_id():
+    """A fresh id for a board, list or card: 64 random bits as hex (as uuid4().hex[:16] was, without building a UUID)."""
+    return os.urandom(8).hex()
+
+
+## Cards
+@lru_cache(maxsize=65536)
+def parse_created(text):
+    """Seconds since the epoch for a CREATED_FORMAT time, read as UTC wall-clock time.
+
+    Cached, so cards created in the same minute share one int object. Text
+    that doesn't parse is returned as it is, and kept that way."""
+    try:
+        return int(datetime.strptime(text, CREATED_FORMAT).replace(tzinfo=timezone.utc).timestamp())
+    except ValueError:
+        return text
+
+
+@lru_cache(maxsize=4096)
+def format_created(created_at):
+    if isinstance(created_at, str):
+        return created_at
+    return datetime.fromtimestamp(created_at, timezone.utc).strftime(CREATED_FORMAT)
+
+
+def created_key(created_at):
+    """Sort key for a card's created_at (times that didn't parse sort first)."""
+    return created_at if isinstance(created_at, int) else 0
+
+
+def timestamp_created(seconds):
+    """A created time for epoch seconds: the local wall-clock minute, as typed-in and current times are kept."""
+    return parse_created(datetime.fromtimestamp(seconds).strftime(CREATED_FORMAT))
+
+
+def now_created():
+    return parse_created(datetime.now().strftime(CREATED_FORMAT))
+
+
+class Card:
+    """One card, as a __slots__ object instead of a dict.
+
+    The creation time is kept as an int (see parse_created) and only
+    formatted for display, and titles are interned, so repeated ones are
+    stored once. Cards still read and write like the dicts of the JSON
+    schema (card["title"], card.get('width', 260), card["created"] giving
+    the formatted time), so the rest of the code doesn't care which it
+    holds; missing fields are None."""
+    __slots__ = ('id', 'title', 'created_at', 'width', 'height')
+    FIELDS = ('id', 'title', 'created', 'width', 'height')
+
+    def __init__(self, card_id, title, created_at, width=None, height=None):
+        self.id = card_id
+        self.title = sys.intern(title)
+        self.created_at = created_at
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data["title"], parse_created(data["created"]), data.get('width'), data.get('height'))
+
+    def to_dict(self):
+        """The card in the JSON schema."""
+        data = {"id": self.id, "title": self.title, "created": format_created(self.created_at)}
+        if self.width is not None:
+            data['width'] = self.width
+        if self.height is not None:
+            data['height'] = self.height
+        return data
+
+    def copy(self):
+        return Card(self.id, self.title, self.created_at, self.width, self.height)
+
+    # --- Dict-style access ---
+
+    def get(self, key, default=None):
+        if key == 'created':
+            return format_created(self.created_at)
+        if key not in self.FIELDS:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key == 'created':
+            self.created_at = parse_created(value)
+        elif key == 'title':
+            self.title = sys.intern(value)
+        elif key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        if key in ('width', 'height'):
+            setattr(self, key, None)
+        return value
+
+    def update(self, fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    def __eq__(self, other):
+        if isinstance(other, (Card, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, Card) else other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Card({self.to_dict()!r})"
+
+
+def pack_cards(data):
+    """Replace the card dicts of every loaded board in data with Cards."""
+    for board in data['boards'].values():
+        for list_data in (board["lists"] or {}).values():
+            list_data["cards"] = [
+                card if isinstance(card, Card) else Card.from_dict(card) for card in list_data["cards"]
+            ]
+
+
+def pack_change(change):
+    """Replace the card dicts in a change record read back from a journal with Cards, in place."""
+    op = change['op']
+    if isinstance(change.get('card'), dict):
+        change['card'] = Card.from_dict(change['card'])
+    elif op == 'add_cards':
+        for places in change['places'].values():
+            for place in places:
+                if isinstance(place[1], dict):
+                    place[1] = Card.from_dict(place[1])
+    elif op == 'restore_list':
+        pack_cards({'boards': {change['board']: {"lists": {change['list']: change['data']}}}})
+    elif op == 'restore_board':
+        pack_cards({'boards': {change['board']: change['data']}})
+    return change
+
+
+def encode_card(value):
+    """json.dump default= hook that writes Cards in the JSON schema."""
+    if isinstance(value, Card):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+## Migration
+def upgrade_data(data):
+    """Convert name-keyed (version 1) data to id-keyed data in place.
+
+    Returns True if anything had to be converted."""
+    if data.get('version', 1) >= DATA_VERSION:
+        return False
+
+    boards = {}
+    current_board = None
+    for board_name, board in data['boards'].items():
+        board_id = new_id()
+        lists = {}
+        for list_name, list_data in board["lists"].items():
+            list_id = new_id()
+            for card in list_data["cards"]:
+                card.setdefault('id', new_id())
+            lists[list_id] = {"id": list_id, "name": list_name, "cards": list_data["cards"]}
+        boards[board_id] = {"id": board_id, "name": board_name, "lists": lists}
+        if board_name == data.get('current_board'):
+            current_board = board_id
+
+    data['boards'] = boards
+    data['current_board'] = current_board
+    data['version'] = DATA_VERSION
+    return True
+
+
+def apply_change_v1(data, change):
+    """Apply a version 1 (name and position based) journal record.
+
+    Only used to replay journals written before the upgrade to ids."""
+    boards = data['boards']
+    op = change['op']
+
+    if op == 'create_board':
+        boards[change['name']] = {"lists": {}}
+        data['current_board'] = change['name']
+    elif op == 'delete_board':
+        boards.pop(change['name'], None)
+        data['current_board'] = change.get('current')
+    elif op == 'rename_board':
+        boards[change['new']] = boards.pop(change['old'])
+        if data.get('current_board') == change['old']:
+            data['current_board'] = change['new']
+    elif op == 'select_board':
+        data['current_board'] = change['name']
+    elif op == 'create_list':
+        boards[change['board']]["lists"][change['name']] = {"cards": []}
+    elif op == 'delete_list':
+        del boards[change['board']]["lists"][change['name']]
+    elif op == 'rename_list':
+        lists = boards[change['board']]["lists"]
+        lists[change['new']] = lists.pop(change['old'])
+    elif op == 'move_list':
+        board = boards[change['board']]
+        list_data = board["lists"].pop(change['name'])
+        ordered = list(board["lists"].items())
+        ordered.insert(change['index'], (change['name'], list_data))
+        board["lists"] = dict(ordered)
+    elif op == 'add_card':
+        cards = boards[change['board']]["lists"][change['list']]["cards"]
+        cards.insert(change.get('index', len(cards)), change['card'])
+    elif op == 'delete_card':
+        del boards[change['board']]["lists"][change['list']]["cards"][change['index']]
+    elif op == 'move_card':
+        lists = boards[change['board']]["lists"]
+        card = lists[change['source']]["cards"].pop(change['source_index'])
+        lists[change['target']]["cards"].insert(change['target_index'], card)
+    elif op == 'update_card':
+        boards[change['board']]["lists"][change['list']]["cards"][change['index']].update(change['fields'])
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+
+## Change Application
+def apply_change(data, change, index=None):
+    """Apply one change record to a {'boards': ..., 'current_board': ...} dict.
+
+    Every mutation of the boards goes through here, both live and when a
+    journal is replayed. Pass the BoardIndex covering data to keep it in sync
+    and to find cards without scanning their list."""
+    boards = data['boards']
+    op = change['op']
+
+    if op == 'create_board':
+        board = {"id": change['board'], "name": change['name'], "lists": {}}
+        boards[board["id"]] = board
+        data['current_board'] = board["id"]
+        if index:
+            index.add_board(board)
+    elif op == 'delete_board':
+        board = boards.pop(change['board'])
+        data['current_board'] = change.get('current')
+        if index:
+            index.remove_board(board)
+    elif op == 'restore_board':
+        # Undoing a delete, or an import: a whole board is put in at index
+        board = change['data']
+        ordered = list(boards.items())
+        ordered.insert(change['index'], (board["id"], board))
+        data['boards'] = dict(ordered)
+        data['current_board'] = change.get('current')
+        if index:
+            index.add_board(board)
+    elif op == 'rename_board':
+        boards[change['board']]["name"] = change['name']
+    elif op == 'update_board':
+        update_fields(boards[change['board']], change['fields'])
+    elif op == 'select_board':
+        data['current_board'] = change['board']
+    elif op == 'create_list':
+        list_data = {"id": change['list'], "name": change['name'], "cards": []}
+        boards[change['board']]["lists"][list_data["id"]] = list_data
+        if index:
+            index.add_list(change['board'], list_data)
+    elif op == 'delete_list':
+        list_data = boards[change['board']]["lists"].pop(change['list'])
+        if index:
+            index.remove_list(list_data)
+    elif op == 'restore_list':
+        board = boards[change['board']]
+        list_data = change['data']
+        ordered = list(board["lists"].items())
+        ordered.insert(change['index'], (list_data["id"], list_data))
+        board["lists"] = dict(ordered)
+        if index:
+            index.add_list(change['board'], list_data)
+    elif op == 'rename_list':
+        boards[change['board']]["lists"][change['list']]["name"] = change['name']
+    elif op == 'move_list':
+        board = boards[change['board']]
+        list_data = board["lists"].pop(change['list'])
+        ordered = list(board["lists"].items())
+        ordered.insert(change['index'], (change['list'], list_data))
+        board["lists"] = dict(ordered)
+    elif op == 'add_card':
+        cards = boards[change['board']]["lists"][change['list']]["cards"]
+        cards.insert(change.get('index', len(cards)), change['card'])
+        if index:
+            index.add_card(change['list'], change['card'])
+    elif op == 'delete_card':
+        lists = boards[change['board']]["lists"]
+        del lists[change['list']]["cards"][card_position(lists, change['list'], change['card'], index)]
+        if index:
+            index.remove_card(change['card'])
+    elif op == 'move_card':
+        lists = boards[change['board']]["lists"]
+        position = card_position(lists, change['source'], change['card'], index)
+        card = lists[change['source']]["cards"].pop(position)
+        lists[change['target']]["cards"].insert(change['index'], card)
+        if index:
+            index.move_card(change['card'], change['source'], change['target'])
+    elif op == 'update_card':
+        lists = boards[change['board']]["lists"]
+        position = card_position(lists, change['list'], change['card'], index)
+        update_fields(lists[change['list']]["cards"][position], change['fields'])
+    # Bulk card ops: each touches every list once, however many cards it carries
+    elif op == 'add_cards':
+        lists = boards[change['board']]["lists"]
+        for list_id, places in change['places'].items():
+            insert_cards(lists[list_id]["cards"], places)
+            if index:
+                for position, card in places:
+                    index.add_card(list_id, card)
+    elif op == 'delete_cards':
+        lists = boards[change['board']]["lists"]
+        for list_id, card_ids in change['lists'].items():
+            take_cards(lists[list_id]["cards"], card_ids)
+            if index:
+                for card_id in card_ids:
+                    index.remove_card(card_id)
+    elif op == 'move_cards':
+        lists = boards[change['board']]["lists"]
+        taken = {}
+        for list_id, card_ids in change['lists'].items():
+            taken.update(take_cards(lists[list_id]["cards"], card_ids))
+        for list_id, places in change['places'].items():
+            insert_cards(lists[list_id]["cards"], [(position, taken[card_id]) for position, card_id in places])
+            if index:
+                for position, card_id in places:
+                    index.move_card(card_id, index.find_card(card_id)[0], list_id)
+    elif op == 'update_cards':
+        lists = boards[change['board']]["lists"]
+        by_id = {}
+        for list_id, card_id, fields in change['cards']:
+            if index:
+                card = index.find_card(card_id)[1]
+            else:
+                if list_id not in by_id:
+                    by_id[list_id] = {card["id"]: card for card in lists[list_id]["cards"]}
+                card = by_id[list_id][card_id]
+            update_fields(card, fields)
+    else:
+        raise ValueError(f"Unknown change operation: {op}")
+
+
+def card_ids(cards):
+    """Ids of a list's cards (Cards, or dicts while a journal is replayed)."""
+    return [card["id"] if isinstance(card, dict) else card.id for card in cards]
+
+
+def take_cards(cards, removed_ids):
+    """Remove cards from a list in one pass; returns {card id: card} of those removed."""
+    removing = set(removed_ids)
+    ids = card_ids(cards)
+    taken = {card_id: card for card_id, card in zip(ids, cards) if card_id in removing}
+    cards[:] = [card for card_id, card in zip(ids, cards) if card_id not in removing]
+    return taken
+
+
+def insert_cards(cards, places):
+    """Insert (position, card) pairs, in ascending position order, into a list.
+
+    Many at once are merged in one pass instead of shifting the list for each."""
+    if len(places) < 64:
+        for position, card in places:
+            cards.insert(position, card)
+        return
+    merged = []
+    rest = iter(cards)
+    for position, card in places:
+        merged.extend(islice(rest, position - len(merged)))
+        merged.append(card)
+    merged.extend(rest)
+    cards[:] = merged
+
+
+def update_fields(item, fields):
+    """Set a board's or card's fields; None removes a field (back to its default)."""
+    for key, value in fields.items():
+        if value is None:
+            item.pop(key, None)
+        else:
+            item[key] = value
+
+
+def inverse_change(data, change, index=None):
+    """The change that undoes change, worked out before change is applied.
+
+    Deleted boards, lists and cards are kept by reference in the inverse
+    rather than copied, since nothing else holds them once they're gone.
+    Returns None for changes that aren't undoable (switching boards)."""
+    boards = data['boards']
+    op = change['op']
+    board_id = change.get('board')
+
+    if op == 'create_board':
+        return {'op': 'delete_board', 'board': board_id, 'current': data['current_board']}
+    elif op == 'delete_board':
+        return {
+            'op': 'restore_board',
+            'board': board_id,
+            'data': boards[board_id],
+            'index': list(boards).index(board_id),
+            'current': data['current_board']
+        }
+    elif op == 'restore_board':
+        return {'op': 'delete_board', 'board': board_id, 'current': data['current_board']}
+    elif op == 'rename_board':
+        return dict(change, name=boards[board_id]["name"])
+    elif op == 'update_board':
+        return dict(change, fields={key: boards[board_id].get(key) for key in change['fields']})
+    elif op == 'select_board':
+        return None
+    elif op == 'create_list':
+        return {'op': 'delete_list', 'board': board_id, 'list': change['list']}
+    elif op == 'delete_list':
+        lists = boards[board_id]["lists"]
+        return {
+            'op': 'restore_list',
+            'board': board_id,
+            'list': change['list'],
+            'data': lists[change['list']],
+            'index': list(lists).index(change['list'])
+        }
+    elif op == 'restore_list':
+        return {'op': 'delete_list', 'board': board_id, 'list': change['list']}
+    elif op == 'rename_list':
+        return dict(change, name=boards[board_id]["lists"][change['list']]["name"])
+    elif op == 'move_list':
+        return dict(change, index=list(boards[board_id]["lists"]).index(change['list']))
+    elif op == 'add_card':
+        return {'op': 'delete_card', 'board': board_id, 'list': change['list'], 'card': change['card']["id"]}
+    elif op == 'delete_card':
+        lists = boards[board_id]["lists"]
+        position = card_position(lists, change['list'], change['card'], index)
+        return {
+            'op': 'add_card',
+            'board': board_id,
+            'list': change['list'],
+            'card': lists[change['list']]["cards"][position],
+            'index': position
+        }
+    elif op == 'move_card':
+        return dict(
+            change,
+            source=change['target'],
+            target=change['source'],
+            index=card_position(boards[board_id]["lists"], change['source'], change['card'], index)
+        )
+    elif op == 'update_card':
+        lists = boards[board_id]["lists"]
+        card = lists[change['list']]["cards"][card_position(lists, change['list'], change['card'], index)]
+        return dict(change, fields={key: card.get(key) for key in change['fields']})
+    elif op == 'add_cards':
+        return {
+            'op': 'delete_cards',
+            'board': board_id,
+            'lists': {list_id: [card["id"] for position, card in places] for list_id, places in change['places'].items()}
+        }
+    elif op == 'delete_cards':
+        lists = boards[board_id]["lists"]
+        return {
+            'op': 'add_cards',
+            'board': board_id,
+            'places': {list_id: card_places(lists[list_id]["cards"], card_ids)
+                       for list_id, card_ids in change['lists'].items()}
+        }
+    elif op == 'move_cards':
+        # Taking the cards out of their new places and putting each back at its
+        # old position (ascending) rebuilds every list as it was
+        lists = boards[board_id]["lists"]
+        return {
+            'op': 'move_cards',
+            'board': board_id,
+            'lists': {list_id: [card_id for position, card_id in places]
+                      for list_id, places in change['places'].items()},
+            'places': {list_id: [[position, card["id"]] for position, card in card_places(lists[list_id]["cards"], card_ids)]
+                       for list_id, card_ids in change['lists'].items()}
+        }
+    elif op == 'update_cards':
+        old = []
+        for list_id, card_id, fields in change['cards']:
+            card = index.find_card(card_id)[1] if index else next(
+                card for card in boards[board_id]["lists"][list_id]["cards"] if card["id"] == card_id)
+            old.append([list_id, card_id, {key: card.get(key) for key in fields}])
+        return dict(change, cards=old)
+    raise ValueError(f"Unknown change operation: {op}")
+
+
+def card_places(cards, wanted_ids):
+    """[position, card] for each of wanted_ids in a list, in list order."""
+    wanted = set(wanted_ids)
+    return [[position, card] for position, (card_id, card) in enumerate(zip(card_ids(cards), cards))
+            if card_id in wanted]
+
+
+def card_position(lists, list_id, card_id, index=None):
+    """Position of a card in its list, from the index when there is one."""
+    if index:
+        return index.position(list_id, card_id)
+    for position, card in enumerate(lists[list_id]["cards"]):
+        if card["id"] == card_id:
+            return position
+    raise KeyError(card_id)
+
+
+## Board Index
+class BoardIndex:
+    """Finds lists and cards by id, and cards' positions, without scanning.
+
+    Positions are cached per list and rebuilt the first time a list is asked
+    about after it changed, so repeated lookups between edits are O(1)."""
+    def __init__(self):
+        self.lists = {}  # list id -> (board id, list dict)
+        self.cards = {}  # card id -> (list id, Card)
+        self.positions = {}  # list id -> {card id: position}
+
+    def add_board(self, board):
+        for list_data in board["lists"].values():
+            self.add_list(board["id"], list_data)
+
+    def remove_board(self, board):
+        for list_data in (board["lists"] or {}).values():
+            self.remove_list(list_data)
+
+    def add_list(self, board_id, list_data):
+        self.lists[list_data["id"]] = (board_id, list_data)
+        for card in list_data["cards"]:
+            self.cards[card.id] = (list_data["id"], card)
+
+    def remove_list(self, list_data):
+        self.lists.pop(list_data["id"], None)
+        self.positions.pop(list_data["id"], None)
+        for card in list_data["cards"]:
+            self.cards.pop(card.id, None)
+
+    def add_card(self, list_id, card):
+        self.cards[card.id] = (list_id, card)
+        self.positions.pop(list_id, None)
+
+    def remove_card(self, card_id):
+        list_id, card = self.cards.pop(card_id)
+        self.positions.pop(list_id, None)
+
+    def move_card(self, card_id, source_id, target_id):
+        list_id, card = self.cards[card_id]
+        self.cards[card_id] = (target_id, card)
+        self.positions.pop(source_id, None)
+        self.positions.pop(target_id, None)
+
+    def find_card(self, card_id):
+        """Return (list id, card dict) for a card, or None."""
+        return self.cards.get(card_id)
+
+    def find_list(self, list_id):
+        """Return (board id, list dict) for a list, or None."""
+        return self.lists.get(list_id)
+
+    def position(self, list_id, card_id):
+        positions = self.positions.get(list_id)
+        if positions is None:
+            cards = self.lists[list_id][1]["cards"]
+            positions = {card.id: position for position, card in enumerate(cards)}
+            self.positions[list_id] = positions
+        return positions[card_id]
@@ -0,0 +1,114 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Histogram buckets are a quarter of a power of two wide (about 19%), so
+# percentiles come out within that of the real value at any scale
+BUCKETS_PER_DOUBLING = 4
+
+
+## Histogram
+class Histogram:
+    """Log-bucketed durations; constant memory however many samples are added."""
+    def __init__(self):
+        self.buckets = {}  # bucket -> count
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        micros = max(seconds * 1e6, 1.0)
+        bucket = int(math.log2(micros) * BUCKETS_PER_DOUBLING)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples, in seconds."""
+        if not self.count:
+            return 0.0
+        wanted = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= wanted:
+                return min(2 ** ((bucket + 1) / BUCKETS_PER_DOUBLING) / 1e6, self.max)
+        return self.max
+
+
+## Profiler
+class Profiler:
+    """Times instrumented calls into per-name histograms and a trace buffer.
+
+    Nothing is timed unless instrument() wraps a method, so code that isn't
+    profiling pays nothing. The most recent calls are kept as Chrome
+    trace events (open the dump in chrome://tracing or Perfetto)."""
+    def __init__(self, max_events=200000):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.events = deque(maxlen=max_events)
+        self.start = time.perf_counter()
+
+    def instrument(self, obj, names):
+        """Replace obj's methods with timed wrappers, named "Class.method"."""
+        for name in names:
+            method = getattr(obj, name)
+            setattr(obj, name, self.timed(f"{type(obj).__name__}.{name}", method))
+
+    def timed(self, label, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(label, start, time.perf_counter())
+        return wrapper
+
+    def record(self, label, start, end):
+        with self.lock:
+            histogram = self.histograms.get(label)
+            if histogram is None:
+                histogram = self.histograms[label] = Histogram()
+            histogram.add(end - start)
+            self.events.append((label, start, end, threading.get_ident()))
+
+    def stats(self):
+        """[(label, count, p50, p95, p99, max)] in seconds, slowest p95 first."""
+        with self.lock:
+            rows = [
+                (label, h.count, h.percentile(0.50), h.percentile(0.95), h.percentile(0.99), h.max)
+                for label, h in self.histograms.items()
+            ]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def summary(self):
+        lines = [f"{'call':<36}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+        for label, count, p50, p95, p99, slowest in self.stats():
+            lines.append(f"{label:<36}{count:>7}{p50 * 1000:>9.2f}{p95 * 1000:>9.2f}"
+                         f"{p99 * 1000:>9.2f}{slowest * 1000:>9.2f}")
+        return "\n".join(lines)
+
+    def dump_trace(self, path):
+        """Write the buffered calls in Chrome trace-event format."""
+        with self.lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace = [
+            {
+                "name": label,
+                "ph": "X",
+                "ts": (start - self.start) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": pid,
+                "tid": thread
+            }
+            for label, start, end, thread in events
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
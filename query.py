@@ -0,0 +1,272 @@
+from bisect import bisect_left, insort
+
+from model import CREATED_FORMAT, created_key, parse_created
+
+# Filled in behind a partial time, so "2024-05" means the start of May
+TIME_TEMPLATE = "2000-01-01 00:00"
+
+
+def parse_time(text):
+    """A created_at value for a time given as much of CREATED_FORMAT as wanted ("2024", "2024-05-08")."""
+    created_at = parse_created(text + TIME_TEMPLATE[len(text):])
+    if not isinstance(created_at, int):
+        raise ValueError(f"Can't read {text!r} as a time like {CREATED_FORMAT.replace('%', '')}")
+    return created_at
+
+
+## Card Filter
+class CardFilter:
+    """Which cards a board view shows, and in what order.
+
+    Cards must match every predicate given: created at or after and/or
+    before a time (partial times like "2024-05" mean the start of the
+    period; see parse_time), a title containing some text (case-insensitive),
+    and being in one of a set of lists. sort is None for list order, or
+    'created' or 'title'. Raises ValueError for a time it can't read."""
+    SORTS = (None, 'created', 'title')
+
+    def __init__(self, created_after=None, created_before=None, title_contains=None, lists=None,
+                 sort=None, descending=False):
+        if sort not in self.SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        self.created_after = parse_time(created_after) if created_after else None
+        self.created_before = parse_time(created_before) if created_before else None
+        self.title_contains = title_contains.casefold() if title_contains else None
+        self.lists = set(lists) if lists is not None else None
+        self.sort = sort
+        self.descending = descending
+
+    def is_active(self):
+        """True if the filter hides or reorders anything."""
+        return bool(self.created_after is not None or self.created_before is not None or self.title_contains
+                    or self.lists is not None or self.sort)
+
+    def matches(self, card, list_id):
+        """True if a card in list_id passes every predicate (as SortedCardIndex.query tests them)."""
+        created = created_key(card.created_at)
+        if self.created_after is not None and created < self.created_after:
+            return False
+        if self.created_before is not None and created >= self.created_before:
+            return False
+        if self.title_contains and self.title_contains not in card.title.casefold():
+            return False
+        return self.lists is None or list_id in self.lists
+
+    def sort_key(self, card):
+        """Where a card goes in sorted results, ascending; None for list order (sorted by position)."""
+        if self.sort == 'created':
+            return created_key(card.created_at), card.id
+        if self.sort == 'title':
+            return card.title.casefold(), card.id
+        return None
+
+
+def insort_by(items, item, key, descending=False):
+    """Insert item into items, kept sorted by key(item) (descending if asked)."""
+    item_key = key(item)
+    low, high = 0, len(items)
+    while low < high:
+        middle = (low + high) // 2
+        if (key(items[middle]) > item_key) if descending else (key(items[middle]) < item_key):
+            low = middle + 1
+        else:
+            high = middle
+    items.insert(low, item)
+
+
+## Sorted Card Index
+class SortedCardIndex:
+    """Each board's cards kept sorted by created time and by title.
+
+    The sorted lists hold (key, card id) pairs and are updated by apply(),
+    from the same change records as model.apply_change, so a query only
+    bisects and walks them and never sorts the board again."""
+    BULK = 64  # Adding or removing more cards than this at once re-sorts or filters the lists in one go
+
+    def __init__(self):
+        self.by_created = {}  # board id -> sorted [(created key, card id)]
+        self.by_title = {}  # board id -> sorted [(casefolded title, card id)]
+        self.card_keys = {}  # card id -> (board id, created key, casefolded title)
+        self.card_lists = {}  # card id -> list id
+        self.list_cards = {}  # list id -> set of card ids
+
+    # --- Cards ---
+
+    def add_board(self, board):
+        """Index a loaded board's cards, sorting each index once."""
+        by_created = self.by_created[board["id"]] = []
+        by_title = self.by_title[board["id"]] = []
+        for list_data in board["lists"].values():
+            self.list_cards[list_data["id"]] = set()
+            for card in list_data["cards"]:
+                created, title = self.keys(card)
+                self.remember(board["id"], list_data["id"], card.id, created, title)
+                by_created.append((created, card.id))
+                by_title.append((title, card.id))
+        by_created.sort()
+        by_title.sort()
+
+    def keys(self, card):
+        return created_key(card.created_at), card.title.casefold()
+
+    def remember(self, board_id, list_id, card_id, created, title):
+        self.card_keys[card_id] = (board_id, created, title)
+        self.card_lists[card_id] = list_id
+        self.list_cards[list_id].add(card_id)
+
+    def add_card(self, board_id, list_id, card):
+        self.add_keys(board_id, list_id, card.id, *self.keys(card))
+
+    def add_keys(self, board_id, list_id, card_id, created, title):
+        self.remember(board_id, list_id, card_id, created, title)
+        insort(self.by_created[board_id], (created, card_id))
+        insort(self.by_title[board_id], (title, card_id))
+
+    def add_cards(self, board_id, cards):
+        """Add many (list id, card) pairs, re-sorting each sorted list once rather than inserting one by one."""
+        if len(cards) < self.BULK:
+            for list_id, card in cards:
+                self.add_card(board_id, list_id, card)
+            return
+        by_created = self.by_created[board_id]
+        by_title = self.by_title[board_id]
+        for list_id, card in cards:
+            created, title = self.keys(card)
+            self.remember(board_id, list_id, card.id, created, title)
+            by_created.append((created, card.id))
+            by_title.append((title, card.id))
+        by_created.sort()
+        by_title.sort()
+
+    def remove_card(self, card_id):
+        board_id, created, title = self.card_keys.pop(card_id)
+        self.list_cards[self.card_lists.pop(card_id)].discard(card_id)
+        for entries, key in ((self.by_created[board_id], created), (self.by_title[board_id], title)):
+            del entries[bisect_left(entries, (key, card_id))]
+
+    def remove_cards(self, card_ids):
+        """Remove many cards, filtering each board's sorted lists once rather than deleting one by one."""
+        if len(card_ids) < self.BULK:
+            for card_id in card_ids:
+                self.remove_card(card_id)
+            return
+        removing = set(card_ids)
+        boards = set()
+        for card_id in card_ids:
+            boards.add(self.card_keys.pop(card_id)[0])
+            self.list_cards[self.card_lists.pop(card_id)].discard(card_id)
+        for board_id in boards:
+            for entries in (self.by_created[board_id], self.by_title[board_id]):
+                entries[:] = [entry for entry in entries if entry[1] not in removing]
+
+    def remove_board(self, board_id):
+        for created, card_id in self.by_created.pop(board_id, ()):
+            del self.card_keys[card_id]
+            self.list_cards.pop(self.card_lists.pop(card_id), None)
+        self.by_title.pop(board_id, None)
+
+    def apply(self, change):
+        """Update the indexes for a change record that has just been applied."""
+        op = change['op']
+        if op == 'create_board':
+            self.by_created[change['board']] = []
+            self.by_title[change['board']] = []
+        elif op == 'delete_board':
+            self.remove_board(change['board'])
+        elif op == 'restore_board':
+            self.add_board(change['data'])
+        elif change.get('board') not in self.by_created:
+            # A board that isn't loaded yet gets indexed when it is
+            return
+        elif op == 'create_list':
+            self.list_cards[change['list']] = set()
+        elif op == 'delete_list':
+            for card_id in list(self.list_cards[change['list']]):
+                self.remove_card(card_id)
+            del self.list_cards[change['list']]
+        elif op == 'restore_list':
+            self.list_cards[change['list']] = set()
+            for card in change['data']["cards"]:
+                self.add_card(change['board'], change['list'], card)
+        elif op == 'add_card':
+            self.add_card(change['board'], change['list'], change['card'])
+        elif op == 'delete_card':
+            self.remove_card(change['card'])
+        elif op == 'move_card':
+            self.list_cards[change['source']].discard(change['card'])
+            self.list_cards[change['target']].add(change['card'])
+            self.card_lists[change['card']] = change['target']
+        elif op == 'update_card':
+            self.update_card(change['list'], change['card'], change['fields'])
+        elif op == 'add_cards':
+            self.add_cards(change['board'], [(list_id, card) for list_id, places in change['places'].items()
+                                             for position, card in places])
+        elif op == 'delete_cards':
+            self.remove_cards([card_id for card_ids in change['lists'].values() for card_id in card_ids])
+        elif op == 'move_cards':
+            for list_id, places in change['places'].items():
+                for position, card_id in places:
+                    self.list_cards[self.card_lists[card_id]].discard(card_id)
+                    self.list_cards[list_id].add(card_id)
+                    self.card_lists[card_id] = list_id
+        elif op == 'update_cards':
+            for list_id, card_id, fields in change['cards']:
+                self.update_card(list_id, card_id, fields)
+
+    def update_card(self, list_id, card_id, fields):
+        """Re-sort a card whose title or created time changed."""
+        if 'title' not in fields and 'created' not in fields:
+            return
+        board_id, created, title = self.card_keys[card_id]
+        if 'created' in fields:
+            created = created_key(parse_created(fields['created']))
+        if 'title' in fields:
+            title = fields['title'].casefold()
+        self.remove_card(card_id)
+        self.add_keys(board_id, list_id, card_id, created, title)
+
+    # --- Queries ---
+
+    def query(self, board_id, card_filter):
+        """Ids of a board's cards matching card_filter, sorted as it asks.
+
+        With no sort the ids come in created order; put them in list order
+        with the board's positions."""
+        entries = self.by_title[board_id] if card_filter.sort == 'title' else self.by_created[board_id]
+        start, stop = 0, len(entries)
+        if card_filter.sort != 'title':
+            # The created range is a slice of the created index
+            if card_filter.created_after is not None:
+                start = bisect_left(entries, (card_filter.created_after,))
+            if card_filter.created_before is not None:
+                stop = bisect_left(entries, (card_filter.created_before,))
+
+        card_keys = self.card_keys
+        card_lists = self.card_lists
+        after = card_filter.created_after if card_filter.sort == 'title' else None
+        before = card_filter.created_before if card_filter.sort == 'title' else None
+        text = card_filter.title_contains
+        lists = card_filter.lists
+        if after is None and before is None and not text and lists is None:
+            # Nothing left to check: the slice is the answer
+            matches = [card_id for key, card_id in entries[start:stop]]
+            if card_filter.descending:
+                matches.reverse()
+            return matches
+
+        matches = []
+        for index in range(start, stop):
+            card_id = entries[index][1]
+            board, created, title = card_keys[card_id]
+            if after is not None and created < after:
+                continue
+            if before is not None and created >= before:
+                continue
+            if text and text not in title:
+                continue
+            if lists is not None and card_lists[card_id] not in lists:
+                continue
+            matches.append(card_id)
+        if card_filter.descending:
+            matches.reverse()
+        return matches
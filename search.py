@@ -0,0 +1,179 @@
+import re
+from bisect import bisect_left, insort
+from itertools import islice
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return set(TOKEN.findall(text.lower()))
+
+
+## Search Index
+class SearchIndex:
+    """An inverted index over board names, list names and card titles.
+
+    Documents are ('board' | 'list' | 'card', id) pairs. Every query term is
+    matched as a prefix, by bisecting a sorted list of the distinct tokens,
+    so partial words work while typing. When a query only extends the
+    previous one, the previous results are filtered instead of searched
+    again. The index is kept current by apply(), which takes the same
+    change records as model.apply_change, so it is never rebuilt."""
+    # Above this many previous matches, a fresh lookup beats filtering them
+    NARROW_LIMIT = 2000
+
+    def __init__(self):
+        self.postings = {}  # token -> set of docs
+        self.tokens = []  # sorted distinct tokens, for prefix lookups
+        self.doc_tokens = {}  # doc -> tokens
+        self.board_lists = {}  # board id -> set of list ids
+        self.list_cards = {}  # list id -> set of card ids
+        self.card_lists = {}  # card id -> list id
+        self.last_query = None  # (terms, matches) for narrowing as-you-type queries
+
+    # --- Documents ---
+
+    def add(self, doc, text):
+        """Index doc under the words of text, replacing any text it had."""
+        if doc in self.doc_tokens:
+            self.remove(doc)
+        tokens = tokenize(text)
+        self.doc_tokens[doc] = tokens
+        for token in tokens:
+            docs = self.postings.get(token)
+            if docs is None:
+                docs = self.postings[token] = set()
+                insort(self.tokens, token)
+            docs.add(doc)
+        self.last_query = None
+
+    def remove(self, doc):
+        for token in self.doc_tokens.pop(doc, ()):
+            docs = self.postings[token]
+            docs.discard(doc)
+            if not docs:
+                del self.postings[token]
+                del self.tokens[bisect_left(self.tokens, token)]
+        self.last_query = None
+
+    def add_board(self, board):
+        """Index a board's name and, if they are loaded, its lists and cards."""
+        self.add(('board', board["id"]), board["name"])
+        self.board_lists.setdefault(board["id"], set())
+        for list_data in (board["lists"] or {}).values():
+            self.add_list(board["id"], list_data)
+
+    def add_list(self, board_id, list_data):
+        self.add(('list', list_data["id"]), list_data["name"])
+        self.board_lists[board_id].add(list_data["id"])
+        self.list_cards[list_data["id"]] = set()
+        for card in list_data["cards"]:
+            self.add_card(list_data["id"], card)
+
+    def add_card(self, list_id, card):
+        self.add(('card', card.id), card.title)
+        self.list_cards[list_id].add(card.id)
+        self.card_lists[card.id] = list_id
+
+    def remove_board(self, board_id):
+        for list_id in self.board_lists.pop(board_id, ()):
+            self.remove_list(list_id)
+        self.remove(('board', board_id))
+
+    def remove_list(self, list_id):
+        for card_id in self.list_cards.pop(list_id, ()):
+            self.card_lists.pop(card_id, None)
+            self.remove(('card', card_id))
+        self.remove(('list', list_id))
+
+    def remove_card(self, card_id):
+        self.list_cards[self.card_lists.pop(card_id)].discard(card_id)
+        self.remove(('card', card_id))
+
+    def apply(self, change):
+        """Update the index for a change record that has just been applied."""
+        op = change['op']
+        if op == 'create_board':
+            self.add_board({"id": change['board'], "name": change['name'], "lists": {}})
+        elif op == 'delete_board':
+            self.remove_board(change['board'])
+        elif op == 'restore_board':
+            self.add_board(change['data'])
+        elif op == 'rename_board':
+            self.add(('board', change['board']), change['name'])
+        elif op == 'create_list':
+            self.add_list(change['board'], {"id": change['list'], "name": change['name'], "cards": []})
+        elif op == 'delete_list':
+            self.board_lists[change['board']].discard(change['list'])
+            self.remove_list(change['list'])
+        elif op == 'restore_list':
+            self.add_list(change['board'], change['data'])
+        elif op == 'rename_list':
+            self.add(('list', change['list']), change['name'])
+        elif op == 'add_card':
+            self.add_card(change['list'], change['card'])
+        elif op == 'delete_card':
+            self.remove_card(change['card'])
+        elif op == 'move_card':
+            self.list_cards[change['source']].discard(change['card'])
+            self.list_cards[change['target']].add(change['card'])
+            self.card_lists[change['card']] = change['target']
+        elif op == 'update_card' and 'title' in change['fields']:
+            self.add(('card', change['card']), change['fields']['title'])
+        elif op == 'add_cards':
+            for list_id, places in change['places'].items():
+                for position, card in places:
+                    self.add_card(list_id, card)
+        elif op == 'delete_cards':
+            for card_ids in change['lists'].values():
+                for card_id in card_ids:
+                    self.remove_card(card_id)
+        elif op == 'move_cards':
+            for list_id, places in change['places'].items():
+                for position, card_id in places:
+                    self.list_cards[self.card_lists[card_id]].discard(card_id)
+                    self.list_cards[list_id].add(card_id)
+                    self.card_lists[card_id] = list_id
+        elif op == 'update_cards':
+            for list_id, card_id, fields in change['cards']:
+                if 'title' in fields:
+                    self.add(('card', card_id), fields['title'])
+
+    # --- Queries ---
+
+    def prefix_matches(self, term):
+        """Docs with a token starting with term."""
+        matches = set()
+        for token in islice(self.tokens, bisect_left(self.tokens, term), None):
+            if not token.startswith(term):
+                break
+            matches |= self.postings[token]
+        return matches
+
+    def search(self, query, limit=20):
+        """Docs matching every term of query as a prefix: boards, then lists, then cards."""
+        terms = TOKEN.findall(query.lower())
+        if not terms:
+            return []
+
+        previous = self.last_query
+        if previous and len(previous[1]) <= self.NARROW_LIMIT and len(terms) >= len(previous[0]) and all(
+                term.startswith(old) for term, old in zip(terms, previous[0])):
+            # The query only got longer: narrow the previous matches
+            matches = {
+                doc for doc in previous[1]
+                if all(any(token.startswith(term) for token in self.doc_tokens[doc]) for term in terms)
+            }
+        else:
+            matches = None
+            for term in sorted(terms, key=len, reverse=True):
+                found = self.prefix_matches(term)
+                matches = found if matches is None else matches & found
+                if not matches:
+                    break
+        self.last_query = (terms, matches)
+
+        results = sorted(doc for doc in matches if doc[0] != 'card')
+        results.sort(key=lambda doc: doc[0] != 'board')
+        results.extend(islice((doc for doc in matches if doc[0] == 'card'), max(limit - len(results), 0)))
+        return results[:limit]
@@ -0,0 +1,125 @@
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+
+def stall_log_file(data_file):
+    """Where a data file's stall log lives: taskflow_data.json -> taskflow_data.stalls.log, beside it."""
+    return os.path.splitext(data_file)[0] + ".stalls.log"
+
+
+## Stall Watchdog
+class StallWatchdog:
+    """Notices when the UI thread stops servicing its event loop, and records why.
+
+    The UI thread runs a heartbeat every `interval` seconds through
+    schedule(delay_ms, callback) (root.after for Tk). A helper thread sleeps
+    until the heartbeat would be `threshold` seconds late; if it hasn't run by
+    then, it grabs the UI thread's Python stack. When the heartbeat finally
+    runs, the stall is recorded with its duration, the stack and the
+    outermost method of `owner` on that stack (the handler that blocked).
+    The last `keep` stalls stay in memory, and with a log_file every stall is
+    appended to it as a JSON line, rolling over to log_file + ".1"."""
+    def __init__(self, schedule, owner=None, interval=0.1, threshold=0.25,
+                 log_file=None, max_log_bytes=1024 * 1024, keep=100):
+        self.schedule = schedule
+        self.owner = owner
+        self.interval = interval
+        self.threshold = threshold
+        self.log_file = log_file
+        self.max_log_bytes = max_log_bytes
+
+        self.stalls = deque(maxlen=keep)
+        self.condition = threading.Condition()
+        self.thread_id = None
+        self.expected = None  # When the next heartbeat is due
+        self.sample = None  # (handler, stack) captured during the current stall
+        self.running = False
+        self.sampler = None
+
+    def start(self):
+        """Start watching the calling thread, which must be the one running the event loop."""
+        self.thread_id = threading.get_ident()
+        self.running = True
+        self.expected = time.perf_counter() + self.interval
+        self.schedule(int(self.interval * 1000), self.heartbeat)
+        self.sampler = threading.Thread(target=self.run_sampler, name="stall-watchdog", daemon=True)
+        self.sampler.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    # --- UI thread ---
+
+    def heartbeat(self):
+        if not self.running:
+            return
+        with self.condition:
+            now = time.perf_counter()
+            lag = now - self.expected
+            sample, self.sample = self.sample, None
+            self.expected = now + self.interval
+            if lag > self.threshold:
+                # The sampler is waiting for this stall to end
+                self.condition.notify()
+        if lag > self.threshold:
+            self.record(lag, sample)
+        self.schedule(int(self.interval * 1000), self.heartbeat)
+
+    def record(self, lag, sample):
+        handler, stack = sample if sample else (None, None)
+        stall = {
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'duration_ms': round(lag * 1000, 1),
+            'handler': handler,
+            'stack': stack
+        }
+        self.stalls.append(stall)
+        if self.log_file:
+            self.write(stall)
+
+    def write(self, stall):
+        try:
+            if os.path.exists(self.log_file) and os.path.getsize(self.log_file) > self.max_log_bytes:
+                os.replace(self.log_file, self.log_file + ".1")
+            with open(self.log_file, "a") as f:
+                f.write(json.dumps(stall) + "\n")
+        except OSError as e:
+            # Reported once: stalls are still kept in memory
+            print(f"Could not write stall log {self.log_file}, no longer logging stalls. Error: {e}")
+            self.log_file = None
+
+    # --- Sampler thread ---
+
+    def run_sampler(self):
+        with self.condition:
+            while self.running:
+                # Each heartbeat moves expected on, so this mostly wakes to sleep again
+                remaining = self.expected + self.threshold - time.perf_counter()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                # Stalled: one sample, then nothing until the heartbeat ends the stall
+                expected = self.expected
+                self.sample = self.capture()
+                while self.running and self.expected == expected:
+                    self.condition.wait()
+
+    def capture(self):
+        """The UI thread's stack and the outermost owner method on it."""
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return None
+        stack = traceback.format_stack(frame)
+        handler = None
+        while frame is not None:
+            if self.owner is not None and frame.f_locals.get('self') is self.owner:
+                handler = f"{type(self.owner).__name__}.{frame.f_code.co_name}"
+            frame = frame.f_back
+        return (handler, stack)
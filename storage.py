@@ -0,0 +1,1246 @@
+import copy
+import json
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+
+from model import (
+    BOARD_HEADER_OPS, DATA_VERSION, Card, apply_change, apply_change_v1, encode_card, new_id, pack_cards, pack_change,
+    parse_created, upgrade_data
+)
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+## File Locking
+def stat_key(stat):
+    """(device, inode) from a stat result: tells a rotated journal apart from the new one at the same path."""
+    return stat.st_dev, stat.st_ino
+
+
+def file_key(path):
+    try:
+        return stat_key(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+
+class FileLock:
+    """An exclusive advisory lock on a file, across processes and across this process's threads.
+
+    Uses flock (msvcrt.locking on Windows). Only processes that take the
+    lock are kept apart: every TaskFlow window and script does, around its
+    writes."""
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.Lock()  # flock alone doesn't keep two threads of one process apart
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            self.file = open(self.path, 'ab')
+            if fcntl:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            else:
+                self.file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after ten seconds; keep waiting
+                        pass
+        except BaseException:
+            if self.file:
+                self.file.close()
+                self.file = None
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        self.file = None
+        self.thread_lock.release()
+
+
+## Journal Store
+# Snapshots start with their journal seq, so it can be read without parsing the rest
+SNAPSHOT_SEQ = re.compile(rb'\{"journal_seq":(\d+)')
+# And journal records with theirs, so the last in a file can be found the same way
+RECORD_SEQ = re.compile(rb'^\{"seq":(\d+)', re.MULTILINE)
+
+
+class JournalStore:
+    """Stores boards as a JSON snapshot plus an append-only journal of changes.
+
+    Every mutation appends one small JSON line to `<data_file>.journal`. Records
+    are buffered by append() and written by flush(), which a SaveScheduler runs
+    off the UI thread. Once the journal passes `compact_threshold` bytes it is
+    rotated aside and folded into a fresh snapshot on a background thread, so the
+    full file is never rewritten on the UI thread.
+
+    Several processes can share the files. Writes, loads and compaction hold
+    an advisory lock on `<data_file>.lock`; records are numbered as they are
+    written, after whatever the other processes wrote, and poll() hands over
+    those other processes' records so they can be merged in memory."""
+    def __init__(self, data_file, compact_threshold=1024 * 1024):
+        self.data_file = data_file
+        self.journal_file = data_file + ".journal"
+        self.compacting_file = data_file + ".journal.compacting"
+        self.tmp_file = data_file + ".tmp"
+        self.compact_threshold = compact_threshold
+
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # Held while writing, as the UI thread may flush too (see archive.py)
+        self.file_lock = FileLock(data_file + ".lock")  # Held by whichever process is writing the files
+        self.seq = 0  # Highest record number written or read by this process
+        self.pending = []
+        self.journal = None
+        self.compactor = None
+
+        # How far this process has read (or written) the journal: other
+        # processes' records past that point are read into external for poll()
+        self.read_lock = threading.Lock()
+        # The journal journal_offset is in, kept open: one rotated for compaction
+        # can be read to its end even once deleted, and its inode isn't reused
+        # by a newer journal (which would pass for it) meanwhile
+        self.journal_reader = None
+        self.journal_key = None  # file_key of journal_reader
+        self.journal_offset = 0
+        self.external = []
+        self.unwritten = 0  # Records appended but not yet written
+        self.needs_reload = False  # Set when memory and the journal no longer hold the same changes in the same order
+
+    # --- Loading ---
+
+    def load(self):
+        """Return the stored data, replaying any journal records over the snapshot."""
+        with self.file_lock:
+            # A leftover temp file is a snapshot that never got renamed into place;
+            # the journal still holds everything it contained.
+            if os.path.exists(self.tmp_file):
+                os.remove(self.tmp_file)
+
+            self.trim_journal()
+            try:
+                data, seq = self.read_snapshot()
+                seq = self.replay(data, self.compacting_file, seq)
+                seq = self.replay(data, self.journal_file, seq)
+            except Exception as e:
+                # Keep the unreadable files around for manual recovery and start empty
+                print(f"Could not load {self.data_file}, moving it aside. Error: {e}")
+                for path in (self.data_file, self.compacting_file, self.journal_file):
+                    if os.path.exists(path):
+                        os.replace(path, path + ".corrupt")
+                data, seq = {'boards': {}, 'current_board': None}, 0
+            self.seq = seq
+
+            if upgrade_data(data):
+                # The journal is name-based up to here; fold it into an id-based
+                # snapshot so every record written from now on uses ids
+                self.write_atomic(data, seq)
+                for path in (self.compacting_file, self.journal_file):
+                    if os.path.exists(path):
+                        os.remove(path)
+            pack_cards(data)
+
+            self.open_journal()
+            self.external = []
+            self.needs_reload = False
+
+            # A rotated journal that was never folded (crash during compaction)
+            if os.path.exists(self.compacting_file):
+                self.start_compaction()
+
+            return data
+
+    def trim_journal(self):
+        """Cut a record a crash left half-written off the end of the journal (file lock held).
+
+        Otherwise the next record would be appended to the same line, and
+        that line, with every record after the crash, would fail to parse."""
+        try:
+            f = open(self.journal_file, 'r+b')
+        except FileNotFoundError:
+            return
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            size = end
+            # Read back a block at a time to the last complete record
+            while end > 0:
+                start = max(0, end - 64 * 1024)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                print(f"Dropping a half-written record ({size - end} bytes) from the end of {self.journal_file}")
+                f.truncate(end)
+
+    def read_snapshot(self):
+        """Read the snapshot file and return (data, last journal seq it contains)."""
+        data = {'boards': {}, 'current_board': None}
+        if os.path.exists(self.data_file):
+            with open(self.data_file, 'r') as f:
+                data.update(json.load(f))
+        seq = data.pop('journal_seq', 0)
+        return data, seq
+
+    def replay(self, data, path, seq, load_lists=None):
+        """Apply the records in a journal file that are newer than seq.
+
+        For data with lazily loaded boards, load_lists(board_id) fetches a
+        board's lists before a record changes them."""
+        if not os.path.exists(path):
+            return seq
+        apply = apply_change if data.get('version', 1) >= DATA_VERSION else apply_change_v1
+        skipped = 0
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    # Torn write from a crashed process; other processes may have written after it
+                    continue
+                if change['seq'] <= seq:
+                    continue
+                if load_lists and change['op'] not in BOARD_HEADER_OPS:
+                    board = data['boards'].get(change.get('board'))
+                    if board is not None and board["lists"] is None:
+                        board["lists"] = load_lists(change['board'])
+                try:
+                    apply(data, change)
+                except (KeyError, ValueError, IndexError):
+                    # Two processes' edits crossed (e.g. one moved a card the
+                    # other had just deleted); the later edit is dropped
+                    skipped += 1
+                seq = change['seq']
+        if skipped:
+            print(f"Skipped {skipped} record{'s' if skipped != 1 else ''} in {path} that no longer applied")
+        return seq
+
+    def last_seq(self, path):
+        """The seq of the last record in a journal file (0 if it's missing or empty)."""
+        try:
+            with open(path, 'rb') as f:
+                seqs = RECORD_SEQ.findall(f.read())
+        except FileNotFoundError:
+            return 0
+        return int(seqs[-1]) if seqs else 0
+
+    def snapshot_seq(self):
+        """The seq of the last record folded into the snapshot, read from its first bytes."""
+        try:
+            with open(self.data_file, 'rb') as f:
+                head = f.read(64)
+        except FileNotFoundError:
+            return 0
+        match = SNAPSHOT_SEQ.match(head)
+        if match:
+            return int(match.group(1))
+        # Written before journal_seq was put first
+        return self.read_snapshot()[1]
+
+    # --- Writing ---
+
+    def open_journal(self):
+        if self.journal:
+            self.journal.close()
+        self.journal = open(self.journal_file, 'ab')
+        self.follow(open(self.journal_file, 'rb'), self.journal.tell())
+
+    def follow(self, reader, offset=0):
+        """Read other processes' records from reader, an open journal, past offset from now on."""
+        if self.journal_reader:
+            self.journal_reader.close()
+        self.journal_reader = reader
+        self.journal_key = stat_key(os.fstat(reader.fileno()))
+        self.journal_offset = offset
+
+    def append(self, change):
+        """Queue one change record for the journal. Cheap enough for the UI thread."""
+        with self.lock:
+            # Encode now: the card dicts in a change keep being edited in memory.
+            # The seq goes in front when it's written (see flush).
+            self.pending.append(json.dumps(change, separators=(',', ':'), default=encode_card))
+            self.unwritten += 1
+
+    def flush(self):
+        """Write all queued records to the journal in one go, holding the file lock.
+
+        Records other processes appended since the last look are read first,
+        so these are numbered after them."""
+        with self.flush_lock:
+            with self.lock:
+                lines, self.pending = self.pending, []
+            if not lines:
+                return
+
+            with self.file_lock, self.read_lock:
+                self.catch_up()
+                if self.external:
+                    # These go after records this process hasn't applied yet,
+                    # though they were applied here first
+                    self.needs_reload = True
+                if stat_key(os.fstat(self.journal.fileno())) != self.journal_key:
+                    # Another process rotated the journal; write to the new one
+                    self.journal.close()
+                    self.journal = open(self.journal_file, 'ab')
+                records = []
+                if os.fstat(self.journal.fileno()).st_size > self.journal_offset:
+                    # Half a record from a process that crashed mid-write: end its line
+                    records.append("\n")
+                for line in lines:
+                    self.seq += 1
+                    records.append(f'{{"seq":{self.seq},{line[1:]}\n')
+                chunk = "".join(records).encode()
+                self.journal.write(chunk)
+                self.journal.flush()
+                self.journal_offset += len(chunk)
+                with self.lock:
+                    self.unwritten -= len(lines)
+
+                if self.journal_offset >= self.compact_threshold and not os.path.exists(self.compacting_file):
+                    self.rotate_journal()
+                    self.start_compaction()
+
+    def rotate_journal(self):
+        """Move the live journal aside for compaction and start a fresh one."""
+        self.journal.close()
+        os.replace(self.journal_file, self.compacting_file)
+        self.open_journal()
+
+    def write_atomic(self, data, seq):
+        """Write a snapshot to a temp file and rename it over the data file."""
+        snapshot = dict({'journal_seq': seq}, **data)
+        with open(self.tmp_file, 'w') as f:
+            json.dump(snapshot, f, separators=(',', ':'), default=encode_card)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.tmp_file, self.data_file)
+
+    # --- Compaction ---
+
+    def start_compaction(self):
+        self.compactor = threading.Thread(target=self.compact, daemon=True)
+        self.compactor.start()
+
+    def compact(self):
+        """Fold the rotated journal into a fresh snapshot (runs off the UI thread)."""
+        try:
+            with self.file_lock:
+                if not os.path.exists(self.compacting_file):
+                    # Another process got to it first
+                    return
+                data, seq = self.read_snapshot()
+                seq = self.replay(data, self.compacting_file, seq)
+                self.write_atomic(data, seq)
+                os.remove(self.compacting_file)
+        except Exception as e:
+            print(f"Journal compaction failed, will retry on next start. Error: {e}")
+
+    def wait_for_compaction(self):
+        if self.compactor is not None:
+            self.compactor.join()
+            self.compactor = None
+
+    def close(self):
+        self.flush()
+        self.wait_for_compaction()
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+        if self.journal_reader:
+            self.journal_reader.close()
+            self.journal_reader = None
+
+    # --- Other Processes ---
+
+    def poll(self):
+        """Changes other processes have saved since the last poll, ready to apply (usually none).
+
+        Costs one stat of the journal when nothing changed. Returns None
+        instead when everything must be loaded again: when some were missed,
+        or when they were saved before changes this process made first (two
+        processes editing at once), so merging them would give a different
+        order here than in the file."""
+        with self.read_lock:
+            try:
+                stat = os.stat(self.journal_file)
+                unchanged = (stat_key(stat), stat.st_size) == (self.journal_key, self.journal_offset)
+            except FileNotFoundError:
+                unchanged = False
+            if unchanged and not self.external and not self.needs_reload:
+                return []
+            self.catch_up()
+            with self.lock:
+                if self.external and self.unwritten:
+                    self.needs_reload = True
+            changes, self.external = self.external, []
+            if self.needs_reload:
+                self.needs_reload = False
+                return None
+        return [pack_change(change) for change in changes]
+
+    def catch_up(self):
+        """Read the records other processes appended to the journal into external (read_lock held).
+
+        Reads without the file lock: only whole lines are taken, and a
+        journal rotated for compaction is finished through the open reader."""
+        key = file_key(self.journal_file)
+        self.read_journal()
+        if key is None or key == self.journal_key:
+            # Same journal, or a new one not created yet
+            return
+        try:
+            reader = open(self.journal_file, 'rb')
+        except FileNotFoundError:
+            return
+        self.follow(reader)
+        # Journals between the two may have been rotated (and even folded into
+        # the snapshot) unread: whoever polls reloads, and numbering carries on
+        # past everything written
+        floor = max(self.last_seq(self.compacting_file), self.snapshot_seq())
+        if floor > self.seq:
+            self.needs_reload = True
+            self.external = []
+            self.seq = floor
+        self.read_journal()
+
+    def read_journal(self):
+        """Take the whole records past journal_offset in the journal being read."""
+        self.journal_reader.seek(self.journal_offset)
+        chunk = self.journal_reader.read()
+        end = chunk.rfind(b"\n") + 1
+        self.journal_offset += end
+        for line in chunk[:end].splitlines():
+            try:
+                change = json.loads(line)
+            except ValueError:
+                continue
+            if change['seq'] > self.seq:
+                self.seq = change['seq']
+                self.external.append(change)
+
+
+## Binary Snapshot Store
+BINARY_MAGIC = b"TFBS"
+BINARY_VERSION = 1
+# Magic, format version, journal seq, length of the board table
+BINARY_HEADER = struct.Struct("<4sHQI")
+
+
+def encode_board_lists(board):
+    """A board's lists as compact JSON rows: [[list id, name, [[card id, title, created_at, width, height]]]]."""
+    rows = []
+    for list_data in board["lists"].values():
+        cards = []
+        for card in list_data["cards"]:
+            if not isinstance(card, Card):
+                card = Card.from_dict(card)
+            row = [card.id, card.title, card.created_at]
+            if card.width is not None or card.height is not None:
+                row += [card.width, card.height]
+            cards.append(row)
+        rows.append([list_data["id"], list_data["name"], cards])
+    return json.dumps(rows, separators=(',', ':')).encode()
+
+
+def decode_board_lists(blob):
+    return {list_id: {"id": list_id, "name": name, "cards": [Card(*row) for row in cards]}
+            for list_id, name, cards in json.loads(blob)}
+
+
+class SnapshotReader:
+    """A binary snapshot, memory-mapped so each board is decoded only when asked for.
+
+    Layout: BINARY_HEADER, then a JSON table {"current_board", "boards":
+    [[id, name, settings, offset, length]]} in board order, then the boards'
+    encoded lists back to back (offsets count from the end of the table)."""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.seq, table_length = BINARY_HEADER.unpack_from(self.map)
+        if magic != BINARY_MAGIC or version > BINARY_VERSION:
+            self.map.close()
+            raise ValueError(f"{path} is not a TaskFlow binary snapshot")
+        self.table = json.loads(self.map[BINARY_HEADER.size:BINARY_HEADER.size + table_length])
+        self.blobs_start = BINARY_HEADER.size + table_length
+        self.blobs = {board_id: (offset, length) for board_id, name, settings, offset, length in self.table['boards']}
+
+    def read(self, lazy=True):
+        """Return the snapshot's data. With lazy, only the current board's lists are decoded."""
+        current_board = self.table['current_board']
+        boards = {}
+        for board_id, name, settings, offset, length in self.table['boards']:
+            board = {"id": board_id, "name": name, "lists": None}
+            board.update(settings)
+            if not lazy or board_id == current_board:
+                board["lists"] = self.decode_lists(board_id)
+            boards[board_id] = board
+        return {'version': DATA_VERSION, 'boards': boards, 'current_board': current_board}
+
+    def blob(self, board_id):
+        offset, length = self.blobs[board_id]
+        start = self.blobs_start + offset
+        return self.map[start:start + length]
+
+    def decode_lists(self, board_id):
+        return decode_board_lists(self.blob(board_id))
+
+    def close(self):
+        self.map.close()
+
+
+class BinaryStore(JournalStore):
+    """Stores boards in a memory-mapped binary snapshot plus the JSON journal.
+
+    load() maps the snapshot (see SnapshotReader) and decodes the board
+    table and the current board only; the other boards have "lists": None
+    until load_board() decodes them, so start-up time doesn't grow with the
+    number of boards. Journaling and compaction work as in JournalStore;
+    boards the journal didn't touch are copied into the new snapshot as raw
+    bytes, without decoding them. A new file is seeded from legacy_file (a
+    JSON data file), if there is one."""
+    def __init__(self, data_file, compact_threshold=1024 * 1024, legacy_file=None):
+        super().__init__(data_file, compact_threshold)
+        self.legacy_file = legacy_file
+        self.reader = None
+        self.data = None
+
+    # --- Loading ---
+
+    def load(self):
+        """Return the stored data, with only the current board's lists decoded."""
+        if (not os.path.exists(self.data_file) and not os.path.exists(self.journal_file) and self.legacy_file
+                and (os.path.exists(self.legacy_file) or os.path.exists(self.legacy_file + ".journal"))):
+            print(f"Migrating {self.legacy_file} to {self.data_file}")
+            legacy = JournalStore(self.legacy_file)
+            self.write_atomic(legacy.load(), 0)
+            legacy.close()
+        self.data = super().load()
+        return self.data
+
+    def read_snapshot(self):
+        if not os.path.exists(self.data_file):
+            return {'version': DATA_VERSION, 'boards': {}, 'current_board': None}, 0
+        if self.reader is not None:
+            self.reader.close()
+        self.reader = SnapshotReader(self.data_file)
+        return self.reader.read(), self.reader.seq
+
+    def snapshot_seq(self):
+        try:
+            with open(self.data_file, 'rb') as f:
+                magic, version, seq, table_length = BINARY_HEADER.unpack(f.read(BINARY_HEADER.size))
+        except FileNotFoundError:
+            return 0
+        return seq
+
+    def replay(self, data, path, seq, load_lists=None):
+        if load_lists is None and self.reader is not None:
+            load_lists = self.reader.decode_lists
+        return super().replay(data, path, seq, load_lists)
+
+    def load_board(self, board_id):
+        """Decode one board's lists from the mapped snapshot."""
+        return dict(self.data['boards'][board_id], lists=self.reader.decode_lists(board_id))
+
+    # --- Writing ---
+
+    def write_atomic(self, data, seq, reader=None):
+        """Write a snapshot to a temp file and rename it over the data file.
+
+        Unloaded boards are copied as raw bytes from reader (by default the
+        snapshot mapped by load())."""
+        reader = reader or self.reader
+        table = []
+        blobs = []
+        offset = 0
+        for board in data['boards'].values():
+            if board["lists"] is None:
+                blob = reader.blob(board["id"])
+            else:
+                blob = encode_board_lists(board)
+            settings = {key: value for key, value in board.items() if key not in ("id", "name", "lists")}
+            table.append([board["id"], board["name"], settings, offset, len(blob)])
+            blobs.append(blob)
+            offset += len(blob)
+        table = json.dumps({'current_board': data.get('current_board'), 'boards': table},
+                           separators=(',', ':')).encode()
+
+        with open(self.tmp_file, 'wb') as f:
+            f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, seq, len(table)))
+            f.write(table)
+            for blob in blobs:
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.tmp_file, self.data_file)
+
+    # --- Compaction ---
+
+    def compact(self):
+        """Fold the rotated journal into a fresh snapshot (runs off the UI thread).
+
+        Uses its own mapping of the snapshot and decodes only the boards the
+        journal changes."""
+        reader = None
+        try:
+            with self.file_lock:
+                if not os.path.exists(self.compacting_file):
+                    return
+                if os.path.exists(self.data_file):
+                    reader = SnapshotReader(self.data_file)
+                    data, seq = reader.read(), reader.seq
+                else:
+                    data, seq = {'version': DATA_VERSION, 'boards': {}, 'current_board': None}, 0
+                seq = self.replay(data, self.compacting_file, seq, reader.decode_lists if reader else None)
+                self.write_atomic(data, seq, reader)
+                os.remove(self.compacting_file)
+        except Exception as e:
+            print(f"Journal compaction failed, will retry on next start. Error: {e}")
+        finally:
+            if reader is not None:
+                reader.close()
+
+    def close(self):
+        super().close()
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+## SQLite Store
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS boards (
+    id INTEGER PRIMARY KEY,
+    uid TEXT,
+    name TEXT NOT NULL UNIQUE,
+    position REAL NOT NULL,
+    renderer TEXT
+);
+CREATE TABLE IF NOT EXISTS lists (
+    id INTEGER PRIMARY KEY,
+    uid TEXT,
+    board_id INTEGER NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    position REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY,
+    uid TEXT,
+    list_id INTEGER NOT NULL REFERENCES lists(id) ON DELETE CASCADE,
+    position REAL NOT NULL,
+    title TEXT NOT NULL,
+    created TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER
+);
+CREATE INDEX IF NOT EXISTS lists_by_board ON lists(board_id, position);
+CREATE INDEX IF NOT EXISTS cards_by_list ON cards(list_id, position);
+"""
+
+# Created after upgrade_schema() has filled in uids on older files
+SQLITE_UID_INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS boards_by_uid ON boards(uid);
+CREATE UNIQUE INDEX IF NOT EXISTS lists_by_uid ON lists(uid);
+CREATE UNIQUE INDEX IF NOT EXISTS cards_by_uid ON cards(uid);
+"""
+
+BOARD_SETTINGS = ('renderer',)
+CARD_COLUMNS = ('title', 'created', 'width', 'height')
+# Bulk inserts into one list bigger than this renumber the list instead of splitting gaps
+RENUMBER_BATCH = 32
+
+
+def position_between(before, after):
+    """Return a sort position strictly between two neighbours (either may be None)."""
+    if before is None and after is None:
+        return 1.0
+    if before is None:
+        return after - 1.0
+    if after is None:
+        return before + 1.0
+    return (before + after) / 2
+
+
+class SQLiteStore:
+    """Stores boards in indexed SQLite tables and loads each board on demand.
+
+    load() returns every board's id and name but only the current board's
+    lists; the others have "lists": None until load_board() fetches them.
+    Changes are translated into row-level INSERT/UPDATE/DELETE statements, so
+    editing or moving a card writes a single row. Rows are ordered by REAL
+    positions: a move takes the midpoint of its new neighbours and only
+    renumbers a list when the gap runs out. Boards, lists and cards are
+    addressed by their persistent ids (the uid columns)."""
+    def __init__(self, data_file, legacy_file=None):
+        self.data_file = data_file
+        self.legacy_file = legacy_file
+
+        self.lock = threading.Lock()
+        self.pending = []
+        self.db = None
+        self.data_version = None  # PRAGMA data_version as of load(); other connections' commits change it
+        self.rows_version = None  # data_version the cached rows below were read at
+
+        # Row ids, positions and order mirroring what is loaded in memory
+        self.board_rows = {}  # board id -> row id
+        self.list_rows = {}  # list id -> {'id', 'position'}
+        self.card_rows = {}  # card id -> {'id', 'position'}
+        self.board_lists = {}  # board id -> [list ids in order]
+        self.list_cards = {}  # list id -> [card ids in order]
+
+    # --- Loading ---
+
+    def load(self):
+        """Return all boards' ids and names, with only the current board's contents loaded."""
+        is_new = not os.path.exists(self.data_file)
+        if self.db:
+            # Loading again (see BoardStore.reload)
+            self.close()
+            for rows in (self.board_rows, self.list_rows, self.card_rows, self.board_lists, self.list_cards):
+                rows.clear()
+        self.db = sqlite3.connect(self.data_file, check_same_thread=False)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SQLITE_SCHEMA)
+        self.upgrade_schema()
+        self.db.executescript(SQLITE_UID_INDEXES)
+
+        if is_new and self.legacy_file and (os.path.exists(self.legacy_file)
+                                            or os.path.exists(self.legacy_file + ".journal")):
+            print(f"Migrating {self.legacy_file} to {self.data_file}")
+            legacy = JournalStore(self.legacy_file)
+            self.import_data(legacy.load())
+            legacy.close()
+
+        boards = {}
+        with self.lock:
+            for row_id, board_id, name, renderer in self.db.execute(
+                    "SELECT id, uid, name, renderer FROM boards ORDER BY position"):
+                self.board_rows[board_id] = row_id
+                boards[board_id] = {"id": board_id, "name": name, "lists": None}
+                if renderer is not None:
+                    boards[board_id]['renderer'] = renderer
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'current_board'").fetchone()
+            self.data_version = self.rows_version = self.db.execute("PRAGMA data_version").fetchone()[0]
+
+        current_board = row[0] if row and row[0] in boards else None
+        if current_board:
+            boards[current_board] = self.load_board(current_board)
+        return {'version': DATA_VERSION, 'boards': boards, 'current_board': current_board}
+
+    def upgrade_schema(self):
+        """Bring a file written by an older version up to the current schema."""
+        board_columns = [row[1] for row in self.db.execute("PRAGMA table_info(boards)")]
+        if 'renderer' not in board_columns:
+            with self.db:
+                self.db.execute("ALTER TABLE boards ADD COLUMN renderer TEXT")
+
+        # Rows written before persistent ids need their uids
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(cards)")]
+        if 'uid' in columns:
+            return
+        with self.db:
+            for table in ('boards', 'lists', 'cards'):
+                self.db.execute(f"ALTER TABLE {table} ADD COLUMN uid TEXT")
+            for table in ('boards', 'lists', 'cards'):
+                row_ids = [row[0] for row in self.db.execute(f"SELECT id FROM {table}")]
+                self.db.executemany(f"UPDATE {table} SET uid = ? WHERE id = ?",
+                                    [(new_id(), row_id) for row_id in row_ids])
+            # The current board used to be stored by name
+            self.db.execute("UPDATE meta SET value = (SELECT uid FROM boards WHERE name = meta.value) "
+                            "WHERE key = 'current_board'")
+
+    def load_board(self, board_id):
+        """Fetch one board with its lists and cards."""
+        with self.lock:
+            # Queued changes may touch this board's rows
+            self.write_pending()
+            return self.read_board(board_id)
+
+    def read_board(self, board_id):
+        """Read a board and cache its rows' ids, positions and order."""
+        row_id = self.board_rows[board_id]
+        name, renderer = self.db.execute("SELECT name, renderer FROM boards WHERE id = ?", (row_id,)).fetchone()
+        board = {"id": board_id, "name": name, "lists": {}}
+        if renderer is not None:
+            board['renderer'] = renderer
+        self.board_lists[board_id] = []
+        list_ids = {}
+        for list_row, list_id, list_name, position in self.db.execute(
+                "SELECT id, uid, name, position FROM lists WHERE board_id = ? ORDER BY position",
+                (row_id,)):
+            board["lists"][list_id] = {"id": list_id, "name": list_name, "cards": []}
+            self.list_rows[list_id] = {'id': list_row, 'position': position}
+            self.board_lists[board_id].append(list_id)
+            self.list_cards[list_id] = []
+            list_ids[list_row] = list_id
+
+        for list_row, card_row, card_id, position, title, created, width, height in self.db.execute(
+                "SELECT c.list_id, c.id, c.uid, c.position, c.title, c.created, c.width, c.height "
+                "FROM cards c JOIN lists l ON l.id = c.list_id "
+                "WHERE l.board_id = ? ORDER BY c.list_id, c.position",
+                (row_id,)):
+            list_id = list_ids[list_row]
+            card = Card(card_id, title, parse_created(created), width, height)
+            board["lists"][list_id]["cards"].append(card)
+            self.card_rows[card_id] = {'id': card_row, 'position': position}
+            self.list_cards[list_id].append(card_id)
+        return board
+
+    # --- Writing ---
+
+    def append(self, change):
+        """Queue one change to be written by the next flush()."""
+        if 'card' in change and not isinstance(change['card'], str):
+            # The card keeps being edited in memory until the flush runs
+            change = dict(change, card=change['card'].copy())
+        elif 'data' in change:
+            # A restored board or list, which can be edited again before the flush
+            change = dict(change, data=copy.deepcopy(change['data']))
+        elif change['op'] == 'add_cards':
+            change = dict(change, places={list_id: [[index, card.copy()] for index, card in places]
+                                          for list_id, places in change['places'].items()})
+        with self.lock:
+            self.pending.append(change)
+
+    def flush(self):
+        """Write all queued changes in a single transaction."""
+        with self.lock:
+            self.write_pending()
+
+    def write_pending(self):
+        if not self.pending:
+            return
+        changes, self.pending = self.pending, []
+        with self.db:
+            # Take the write lock before checking, so no other process can write in between
+            self.db.execute("BEGIN IMMEDIATE")
+            data_version = self.db.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self.rows_version:
+                self.refresh_rows()
+                self.rows_version = data_version
+            try:
+                for change in changes:
+                    if self.crossed(change):
+                        # Another process's edit crossed this one (e.g. it deleted
+                        # the card this moves); drop it, as a journal replay would
+                        print(f"Skipped the {change['op']} record for {self.data_file} that no longer applied")
+                        continue
+                    self.write_change(change)
+            except Exception:
+                # The transaction is rolled back, but the cached rows were edited as it went
+                self.rows_version = None
+                raise
+
+    def crossed(self, change):
+        """True if a board, list or card the change writes to is gone, or a card
+        it takes out of a list is no longer there (checked after refresh_rows)."""
+        op = change['op']
+        boards = [change['board']] if op in ('delete_board', 'rename_board', 'update_board', 'create_list',
+                                             'delete_list', 'restore_list', 'move_list') else []
+        lists = []
+        cards = []
+        members = {}  # List id -> ids of cards that must still be in it
+        if op in ('delete_list', 'rename_list', 'move_list', 'add_card'):
+            lists.append(change['list'])
+        elif op == 'delete_card':
+            members[change['list']] = [change['card']]
+        elif op == 'move_card':
+            members[change['source']] = [change['card']]
+            lists.append(change['target'])
+        elif op in ('add_cards', 'delete_cards', 'move_cards'):
+            members.update(change.get('lists', {}))
+            lists.extend(change.get('places', {}))
+        elif op == 'update_card':
+            cards.append(change['card'])
+        elif op == 'update_cards':
+            cards.extend(card_id for list_id, card_id, fields in change['cards'])
+        return (any(board_id not in self.board_rows for board_id in boards)
+                or any(list_id not in self.list_rows for list_id in lists)
+                or any(card_id not in self.card_rows for card_id in cards)
+                or any(list_id not in self.list_cards or not set(self.list_cards[list_id]).issuperset(card_ids)
+                       for list_id, card_ids in members.items()))
+
+    def refresh_rows(self):
+        """Re-read the cached rows of the loaded boards, after another process wrote to the file."""
+        loaded = list(self.board_lists)
+        for rows in (self.board_rows, self.list_rows, self.card_rows, self.board_lists, self.list_cards):
+            rows.clear()
+        for row_id, board_id in self.db.execute("SELECT id, uid FROM boards"):
+            self.board_rows[board_id] = row_id
+        for board_id in loaded:
+            if board_id in self.board_rows:
+                self.read_board(board_id)
+
+    def write_change(self, change):
+        db = self.db
+        op = change['op']
+
+        if op == 'create_board':
+            position = db.execute("SELECT COALESCE(MAX(position), 0) + 1 FROM boards").fetchone()[0]
+            cursor = db.execute("INSERT INTO boards (uid, name, position) VALUES (?, ?, ?)",
+                                (change['board'], change['name'], position))
+            self.board_rows[change['board']] = cursor.lastrowid
+            self.board_lists[change['board']] = []
+            self.set_current(change['board'])
+        elif op == 'delete_board':
+            db.execute("DELETE FROM boards WHERE id = ?", (self.board_rows.pop(change['board']),))
+            for list_id in self.board_lists.pop(change['board'], []):
+                self.forget_list(list_id)
+            self.set_current(change.get('current'))
+        elif op == 'restore_board':
+            board = change['data']
+            positions = [row[0] for row in db.execute("SELECT position FROM boards ORDER BY position")]
+            index = change['index']
+            position = position_between(positions[index - 1] if index > 0 else None,
+                                        positions[index] if index < len(positions) else None)
+            cursor = db.execute("INSERT INTO boards (uid, name, position, renderer) VALUES (?, ?, ?, ?)",
+                                (board["id"], board["name"], position, board.get('renderer')))
+            self.board_rows[board["id"]] = cursor.lastrowid
+            self.board_lists[board["id"]] = []
+            for list_index, list_data in enumerate(board["lists"].values()):
+                self.insert_list(board["id"], list_data, list_index)
+            self.set_current(change.get('current'))
+        elif op == 'rename_board':
+            db.execute("UPDATE boards SET name = ? WHERE id = ?", (change['name'], self.board_rows[change['board']]))
+        elif op == 'update_board':
+            fields = change['fields']
+            columns = [column for column in BOARD_SETTINGS if column in fields]
+            db.execute(
+                f"UPDATE boards SET {', '.join(column + ' = ?' for column in columns)} WHERE id = ?",
+                [fields[column] for column in columns] + [self.board_rows[change['board']]])
+        elif op == 'select_board':
+            self.set_current(change['board'])
+        elif op == 'create_list':
+            list_data = {"id": change['list'], "name": change['name'], "cards": []}
+            self.insert_list(change['board'], list_data, len(self.board_lists[change['board']]))
+        elif op == 'delete_list':
+            db.execute("DELETE FROM lists WHERE id = ?", (self.list_rows[change['list']]['id'],))
+            self.board_lists[change['board']].remove(change['list'])
+            self.forget_list(change['list'])
+        elif op == 'restore_list':
+            self.insert_list(change['board'], change['data'], change['index'])
+        elif op == 'rename_list':
+            db.execute("UPDATE lists SET name = ? WHERE id = ?", (change['name'], self.list_rows[change['list']]['id']))
+        elif op == 'move_list':
+            order = self.board_lists[change['board']]
+            order.remove(change['list'])
+            row = self.list_rows[change['list']]
+            row['position'] = self.insert_position('lists', order, self.list_rows, change['index'])
+            order.insert(change['index'], change['list'])
+            db.execute("UPDATE lists SET position = ? WHERE id = ?", (row['position'], row['id']))
+        elif op == 'add_card':
+            card = change['card']
+            order = self.list_cards[change['list']]
+            index = change.get('index', len(order))
+            position = self.insert_position('cards', order, self.card_rows, index)
+            cursor = db.execute(
+                "INSERT INTO cards (uid, list_id, position, title, created, width, height) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (card['id'], self.list_rows[change['list']]['id'], position,
+                 card['title'], card['created'], card.get('width'), card.get('height')))
+            self.card_rows[card['id']] = {'id': cursor.lastrowid, 'position': position}
+            order.insert(index, card['id'])
+        elif op == 'delete_card':
+            db.execute("DELETE FROM cards WHERE id = ?", (self.card_rows.pop(change['card'])['id'],))
+            self.list_cards[change['list']].remove(change['card'])
+        elif op == 'move_card':
+            self.list_cards[change['source']].remove(change['card'])
+            order = self.list_cards[change['target']]
+            row = self.card_rows[change['card']]
+            row['position'] = self.insert_position('cards', order, self.card_rows, change['index'])
+            order.insert(change['index'], change['card'])
+            db.execute("UPDATE cards SET list_id = ?, position = ? WHERE id = ?",
+                       (self.list_rows[change['target']]['id'], row['position'], row['id']))
+        elif op == 'update_card':
+            self.update_card_row(change['card'], change['fields'])
+        elif op == 'add_cards':
+            for list_id, places in change['places'].items():
+                renumbered = self.place_cards(list_id, [(index, card['id']) for index, card in places])
+                list_row = self.list_rows[list_id]['id']
+                for index, card in places:
+                    row = self.card_rows[card['id']]
+                    row['id'] = db.execute(
+                        "INSERT INTO cards (uid, list_id, position, title, created, width, height) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (card['id'], list_row, row['position'], card['title'], card['created'],
+                         card.get('width'), card.get('height'))).lastrowid
+                if renumbered:
+                    self.write_positions(list_id)
+        elif op == 'delete_cards':
+            for list_id, card_ids in change['lists'].items():
+                db.executemany("DELETE FROM cards WHERE id = ?",
+                               [(self.card_rows.pop(card_id)['id'],) for card_id in card_ids])
+                self.take_card_ids(list_id, card_ids)
+        elif op == 'move_cards':
+            for list_id, card_ids in change['lists'].items():
+                self.take_card_ids(list_id, card_ids)
+            for list_id, places in change['places'].items():
+                renumbered = self.place_cards(list_id, places)
+                list_row = self.list_rows[list_id]['id']
+                db.executemany("UPDATE cards SET list_id = ?, position = ? WHERE id = ?",
+                               [(list_row, self.card_rows[card_id]['position'], self.card_rows[card_id]['id'])
+                                for index, card_id in places])
+                if renumbered:
+                    self.write_positions(list_id)
+        elif op == 'update_cards':
+            for list_id, card_id, fields in change['cards']:
+                self.update_card_row(card_id, fields)
+        else:
+            raise ValueError(f"Unknown change operation: {op}")
+
+    def insert_position(self, table, order, rows, index):
+        """Position for an item inserted at index into order, renumbering if the gap is exhausted."""
+        # Past the end (another process's edit shortened the list) means the end, as list.insert takes it
+        index = min(index, len(order))
+        before = rows[order[index - 1]]['position'] if index > 0 else None
+        after = rows[order[index]]['position'] if index < len(order) else None
+        position = position_between(before, after)
+        if position == before or position == after:
+            for i, item_id in enumerate(order):
+                rows[item_id]['position'] = float(i * 2 + 1)
+            self.db.executemany(f"UPDATE {table} SET position = ? WHERE id = ?",
+                                [(rows[item_id]['position'], rows[item_id]['id']) for item_id in order])
+            return self.insert_position(table, order, rows, index)
+        return position
+
+    def update_card_row(self, card_id, fields):
+        columns = [column for column in CARD_COLUMNS if column in fields]
+        self.db.execute(
+            f"UPDATE cards SET {', '.join(column + ' = ?' for column in columns)} WHERE id = ?",
+            [fields[column] for column in columns] + [self.card_rows[card_id]['id']])
+
+    def take_card_ids(self, list_id, card_ids):
+        """Drop cards from a list's order in one pass."""
+        removing = set(card_ids)
+        order = self.list_cards[list_id]
+        order[:] = [card_id for card_id in order if card_id not in removing]
+
+    def place_cards(self, list_id, places):
+        """Put card ids into a list's order at ascending indexes, giving each a position in card_rows.
+
+        Up to RENUMBER_BATCH cards each take the midpoint of their neighbours;
+        a bigger batch renumbers the whole list once instead, and True is
+        returned: the caller then writes every position with write_positions()."""
+        order = self.list_cards[list_id]
+        rows = self.card_rows
+        if len(places) > RENUMBER_BATCH:
+            for index, card_id in places:
+                order.insert(index, card_id)
+                rows.setdefault(card_id, {'id': None})
+            for position, card_id in enumerate(order):
+                rows[card_id]['position'] = float(position * 2 + 1)
+            return True
+        for index, card_id in places:
+            position = self.insert_position('cards', order, rows, index)
+            order.insert(index, card_id)
+            rows.setdefault(card_id, {'id': None})['position'] = position
+        return False
+
+    def write_positions(self, list_id):
+        self.db.executemany("UPDATE cards SET position = ? WHERE id = ?",
+                            [(self.card_rows[card_id]['position'], self.card_rows[card_id]['id'])
+                             for card_id in self.list_cards[list_id]])
+
+    def insert_list(self, board_id, list_data, index):
+        """Insert a list with all its cards at index in a board."""
+        order = self.board_lists[board_id]
+        position = self.insert_position('lists', order, self.list_rows, index)
+        list_row = self.db.execute("INSERT INTO lists (uid, board_id, name, position) VALUES (?, ?, ?, ?)",
+                                   (list_data["id"], self.board_rows[board_id], list_data["name"], position)).lastrowid
+        self.list_rows[list_data["id"]] = {'id': list_row, 'position': position}
+        order.insert(index, list_data["id"])
+        self.list_cards[list_data["id"]] = []
+        for card_position, card in enumerate(list_data["cards"], 1):
+            cursor = self.db.execute(
+                "INSERT INTO cards (uid, list_id, position, title, created, width, height) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (card['id'], list_row, card_position, card['title'], card['created'],
+                 card.get('width'), card.get('height')))
+            self.card_rows[card['id']] = {'id': cursor.lastrowid, 'position': float(card_position)}
+            self.list_cards[list_data["id"]].append(card['id'])
+
+    def forget_list(self, list_id):
+        """Drop the mirror rows of a deleted list (the database cascades on its own)."""
+        self.list_rows.pop(list_id, None)
+        for card_id in self.list_cards.pop(list_id, []):
+            self.card_rows.pop(card_id, None)
+
+    def set_current(self, board_id):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('current_board', ?)", (board_id,))
+
+    def import_data(self, data):
+        """Bulk-insert a full {'boards', 'current_board'} dict, e.g. from a JSON file."""
+        with self.lock, self.db:
+            for board_position, board in enumerate(data['boards'].values(), 1):
+                board_row = self.db.execute(
+                    "INSERT INTO boards (uid, name, position, renderer) VALUES (?, ?, ?, ?)",
+                    (board["id"], board["name"], board_position, board.get('renderer'))).lastrowid
+                for list_position, list_data in enumerate(board["lists"].values(), 1):
+                    list_row = self.db.execute(
+                        "INSERT INTO lists (uid, board_id, name, position) VALUES (?, ?, ?, ?)",
+                        (list_data["id"], board_row, list_data["name"], list_position)).lastrowid
+                    self.db.executemany(
+                        "INSERT INTO cards (uid, list_id, position, title, created, width, height) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(card['id'], list_row, card_position, card['title'], card['created'],
+                          card.get('width'), card.get('height'))
+                         for card_position, card in enumerate(list_data["cards"], 1)])
+            self.set_current(data.get('current_board'))
+
+    def close(self):
+        if self.db:
+            self.flush()
+            self.db.close()
+            self.db = None
+
+    def poll(self):
+        """[] while no other process has committed to the database since load(), else None.
+
+        SQLite does the locking between processes itself, but rows carry no
+        record of what changed, so a change elsewhere means loading again."""
+        with self.lock:
+            data_version = self.db.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self.data_version:
+            return []
+        self.data_version = data_version
+        return None
+
+
+## Storage Selection
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+BINARY_EXTENSIONS = ('.tfb',)
+
+
+def open_store(data_file):
+    """Pick a storage backend from the data file's extension.
+
+    A new SQLite or binary file is seeded from the JSON file of the same name, if there is one."""
+    stem, extension = os.path.splitext(data_file)
+    if extension.lower() in SQLITE_EXTENSIONS:
+        return SQLiteStore(data_file, legacy_file=stem + ".json")
+    if extension.lower() in BINARY_EXTENSIONS:
+        return BinaryStore(data_file, legacy_file=stem + ".json")
+    return JournalStore(data_file)
+
+
+def migrate_json_to_sqlite(json_file, db_file):
+    """One-shot copy of a JSON data file (and its journal) into a new SQLite file."""
+    convert_data_file(json_file, db_file)
+
+
+def convert_data_file(source_file, target_file):
+    """One-shot copy of a data file (and its journal) into a new file of any format.
+
+    Both formats are picked by extension, as in open_store."""
+    if os.path.exists(target_file):
+        raise FileExistsError(f"{target_file} already exists")
+    source = open_store(source_file)
+    data = source.load()
+    for board_id, board in list(data['boards'].items()):
+        if board["lists"] is None:
+            data['boards'][board_id] = source.load_board(board_id)
+    source.close()
+
+    extension = os.path.splitext(target_file)[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        target = SQLiteStore(target_file)
+        target.load()
+        target.import_data(data)
+        target.close()
+    elif extension in BINARY_EXTENSIONS:
+        BinaryStore(target_file).write_atomic(data, 0)
+    else:
+        JournalStore(target_file).write_atomic(data, 0)
+
+
+## Save Scheduler
+class SaveScheduler:
+    """Coalesces bursts of changes into a single write on a background thread.
+
+    mark_dirty() is called after every mutation. The flush callback runs once
+    the store has been quiet for `debounce` seconds, or at the latest
+    `max_staleness` seconds after the first unsaved change, which bounds how
+    much work a crash can lose. A max_staleness of 0 writes as soon as possible."""
+    def __init__(self, flush, debounce=0.25, max_staleness=2.0):
+        self.flush = flush
+        self.debounce = debounce
+        self.max_staleness = max_staleness
+
+        self.condition = threading.Condition()
+        self.dirty = False
+        self.closing = False
+        self.first_change = 0.0
+        self.last_change = 0.0
+
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def mark_dirty(self):
+        with self.condition:
+            now = time.monotonic()
+            if not self.dirty:
+                self.dirty = True
+                self.first_change = now
+            self.last_change = now
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.dirty and not self.closing:
+                    self.condition.wait()
+                if not self.dirty:
+                    return
+
+                # Wait out the burst, but never past the staleness bound
+                while not self.closing:
+                    deadline = min(self.last_change + self.debounce,
+                                   self.first_change + self.max_staleness)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                self.dirty = False
+
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Background save failed. Error: {e}")
+
+    def close(self):
+        """Write any pending changes and stop the worker. Blocks until done."""
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.worker.join()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 4 or sys.argv[1] not in ("migrate", "convert"):
+        print("Usage: python storage.py migrate taskflow_data.json taskflow_data.db\n"
+              "       python storage.py convert SOURCE TARGET  (formats picked by extension: .json, .tfb, .db)")
+        sys.exit(1)
+    convert_data_file(sys.argv[2], sys.argv[3])
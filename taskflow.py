@@ -1,9 +1,33 @@
+import sys
+
+# Subcommands (python taskflow.py card add ...) are run by cli.py before any
+# of the GUI below is imported, so scripts and cron jobs start in milliseconds;
+# anything else (such as --profile) opens the window
+CLI_ARGS = ("list", "export", "card", "--data", "-h", "--help")
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1].split("=")[0] in CLI_ARGS:
+    from cli import main
+    sys.exit(main())
+
 import customtkinter as ctk
 import tkinter as tk
-import json
 import os
 import pyglet
-from datetime import datetime
+import threading
+import time
+import weakref
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from api import ApiServer
+from archive import Archive, archive_file, parse_archive_rules
+from board_store import BoardStore
+from history import History
+from profiling import Profiler
+from query import CardFilter
+from stall_watchdog import StallWatchdog, stall_log_file
+from storage import SaveScheduler, open_store
+from tkinter import filedialog
+from trello import read_trello_board
 
 # Set appearance
 ctk.set_appearance_mode("dark")
@@ -29,10 +53,21 @@ else:
 
 ## Dynamic Scrollable Frame Class
 class DynamicScrollableFrame:
-    """A frame with a dynamic scrollbar that only appears when needed."""
-    def __init__(self, parent, orientation="vertical", bg_color="#1e1e2e"):
+    """A frame with a dynamic scrollbar that only appears when needed.
+    
+    In virtualized mode (vertical only) the content is a sequence of items that
+    are created on demand: only the ones inside the viewport, plus `overscan`
+    items on either side, exist as widgets. The scroll region is sized from
+    the item heights, which start as estimates and are corrected as items get
+    measured or resized."""
+    ITEM_PADX = 5
+    ITEM_PADY = 3
+    
+    def __init__(self, parent, orientation="vertical", bg_color="#1e1e2e", virtualized=False, overscan=3):
         self.parent = parent
         self.orientation = orientation
+        self.virtualized = virtualized
+        self.overscan = overscan
         
         # Create canvas
         self.canvas = tk.Canvas(parent, bg=bg_color, highlightthickness=0)
@@ -44,31 +79,183 @@ class DynamicScrollableFrame:
             command=self.canvas.yview if orientation == "vertical" else self.canvas.xview
         )
         
-        if orientation == "vertical":
+        if virtualized:
+            self.canvas.configure(yscrollcommand=self.on_virtual_scroll)
+        elif orientation == "vertical":
             self.canvas.configure(yscrollcommand=self.scrollbar.set)
         else:
             self.canvas.configure(xscrollcommand=self.scrollbar.set)
         
         # Create inner frame
         self.inner_frame = ctk.CTkFrame(self.canvas, fg_color="transparent")
-        self.canvas_window = self.canvas.create_window((0, 0), window=self.inner_frame, anchor="nw")
         
-        # Bind to update scrollbar
-        self.inner_frame.bind("<Configure>", self.update_scrollbar)
+        if virtualized:
+            # Items live directly on the canvas; inner_frame stays unmapped
+            self.item_count = 0
+            self.item_heights = []
+            self.item_offsets = [0]
+            self.create_item = None
+            self.release_item = None
+            self.item_keys = []
+            self.measured_heights = {}  # key -> height seen on screen
+            self.visible_items = {}  # index -> (widget, canvas item id)
+            self.item_index = {}  # widget -> index, for materialized items
+            self.bound_widgets = weakref.WeakSet()
+            self.canvas.bind("<Configure>", self.on_canvas_resized)
+        else:
+            self.canvas_window = self.canvas.create_window((0, 0), window=self.inner_frame, anchor="nw")
+            
+            # Bind to update scrollbar
+            self.inner_frame.bind("<Configure>", self.update_scrollbar)
         
     def pack(self, **kwargs):
         """Pack the canvas."""
         self.canvas.pack(**kwargs)
     
+    def pack_forget(self):
+        self.canvas.pack_forget()
+        self.scrollbar.pack_forget()
+    
+    # --- Virtualized mode ---
+    
+    def set_items(self, count, height_of, create_item, release_item=None, key_of=None):
+        """Replace the virtualized content.
+        
+        height_of(index) gives a known or estimated height for an item, and
+        create_item(parent, index) builds its widget when it scrolls into view.
+        Widgets that leave the view are passed to release_item (e.g. to go back
+        to a WidgetPool) or destroyed if there is none.
+        
+        With key_of(index), the update is reconciled by key: widgets whose key is
+        still present are kept and only moved, so keys must change whenever an
+        item's content does. Without it every widget is replaced."""
+        keys = [key_of(index) for index in range(count)] if key_of else [object() for _ in range(count)]
+        new_index = {key: index for index, key in enumerate(keys)}
+        
+        kept = {}
+        for index in list(self.visible_items):
+            moved_to = new_index.get(self.item_keys[index])
+            if moved_to is None:
+                self.remove_item(index)
+            else:
+                kept[moved_to] = self.visible_items.pop(index)
+        self.visible_items = kept
+        self.item_index = {widget: index for index, (widget, item_id) in kept.items()}
+        
+        self.item_count = count
+        self.item_keys = keys
+        self.create_item = create_item
+        self.release_item = release_item
+        self.measured_heights = {key: height for key, height in self.measured_heights.items() if key in new_index}
+        self.item_heights = [self.measured_heights.get(key) or height_of(index) for index, key in enumerate(keys)]
+        self.update_offsets()
+        
+        for index, (widget, item_id) in kept.items():
+            self.canvas.coords(item_id, self.ITEM_PADX, self.item_offsets[index] + self.ITEM_PADY)
+            self.canvas.itemconfigure(item_id, state="normal")
+        self.refresh_items()
+    
+    def update_offsets(self):
+        """Recompute item y offsets (prefix sums of heights) and the scroll region."""
+        pitch = 2 * self.ITEM_PADY
+        self.item_offsets = [0]
+        self.item_offsets.extend(accumulate(height + pitch for height in self.item_heights))
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), self.item_offsets[-1]))
+        self.update_scrollbar()
+    
+    def refresh_items(self):
+        """Create widgets for items in view and destroy the ones that left it."""
+        if not self.virtualized:
+            return
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first = max(0, bisect_right(self.item_offsets, top) - 1 - self.overscan)
+        last = min(self.item_count, bisect_left(self.item_offsets, bottom) + self.overscan)
+        
+        for index in [i for i in self.visible_items if not first <= i < last]:
+            self.remove_item(index)
+        
+        for index in range(first, last):
+            if index not in self.visible_items:
+                widget = self.create_item(self.canvas, index)
+                item_id = self.canvas.create_window(
+                    self.ITEM_PADX, self.item_offsets[index] + self.ITEM_PADY,
+                    window=widget,
+                    anchor="nw"
+                )
+                # Recycled widgets keep their binding from the first time round
+                if widget not in self.bound_widgets:
+                    widget.bind("<Configure>", lambda e, w=widget: self.on_item_resized(w, e.height))
+                    self.bound_widgets.add(widget)
+                self.visible_items[index] = (widget, item_id)
+                self.item_index[widget] = index
+    
+    def remove_item(self, index):
+        widget, item_id = self.visible_items.pop(index)
+        del self.item_index[widget]
+        self.canvas.delete(item_id)
+        if self.release_item:
+            self.release_item(widget)
+        else:
+            widget.destroy()
+    
+    def on_item_resized(self, widget, height):
+        """Replace an estimated height with the measured one and shift the items below."""
+        index = self.item_index.get(widget)
+        if index is None or self.item_heights[index] == height:
+            return
+        self.item_heights[index] = height
+        self.measured_heights[self.item_keys[index]] = height
+        self.update_offsets()
+        for i, (widget, item_id) in self.visible_items.items():
+            self.canvas.coords(item_id, self.ITEM_PADX, self.item_offsets[i] + self.ITEM_PADY)
+        self.refresh_items()
+    
+    def hide_item(self, widget):
+        """Hide a materialized item (e.g. while it's being dragged)."""
+        for widget_, item_id in self.visible_items.values():
+            if widget_ is widget:
+                self.canvas.itemconfigure(item_id, state="hidden")
+    
+    def item_origin(self, widget):
+        """Screen position of a materialized item's top-left corner."""
+        return (widget.winfo_rootx(), widget.winfo_rooty())
+    
+    def scroll_to_item(self, index):
+        """Scroll so an item is at the top of the view (as far as the content allows)."""
+        self.canvas.yview_moveto(self.item_offsets[index] / max(self.item_offsets[-1], 1))
+        self.refresh_items()
+    
+    def highlight_item(self, index, color, duration_ms):
+        """Outline an item in view for a moment."""
+        if index not in self.visible_items:
+            return
+        widget = self.visible_items[index][0]
+        widget.configure(border_width=2, border_color=color)
+        # The widget may have been recycled by then, which is harmless: cards have no border
+        widget.after(duration_ms, lambda: widget.winfo_exists() and widget.configure(border_width=0))
+    
+    def on_canvas_resized(self, event=None):
+        self.update_scrollbar()
+        self.refresh_items()
+    
+    def on_virtual_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh_items()
+    
     def update_scrollbar(self, event=None):
         """Show/hide scrollbar based on content size."""
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        if not self.virtualized:
+            self.canvas.configure(scrollregion=self.canvas.bbox("all"))
         
         if self.orientation == "vertical":
             canvas_height = self.canvas.winfo_height()
-            content_height = self.inner_frame.winfo_reqheight()
+            if self.virtualized:
+                content_height = self.item_offsets[-1]
+            else:
+                content_height = self.inner_frame.winfo_reqheight()
             
-            if content_height > canvas_height:
+            if content_height > canvas_height and self.canvas.winfo_manager():
                 self.scrollbar.pack(side="right", fill="y", before=self.canvas)
             else:
                 self.scrollbar.pack_forget()
@@ -103,6 +290,728 @@ class CTkButtonFactory:
         )
         return button
 
+
+## Widget Pool Class
+class WidgetPool:
+    """Keeps released widgets so they can be re-bound to new data instead of rebuilt.
+    
+    Tk widgets can't move to another parent, so idle widgets are kept per parent.
+    At most max_idle_per_parent idle widgets are kept for one parent and
+    max_idle overall; beyond that the least recently released are destroyed.
+    Hits, misses and the time spent on each are counted so the saving can be
+    reported per render."""
+    def __init__(self, max_idle_per_parent=32, max_idle=256, on_evict=None):
+        self.max_idle_per_parent = max_idle_per_parent
+        self.max_idle = max_idle
+        self.on_evict = on_evict
+        
+        self.idle = OrderedDict()  # widget -> parent, oldest release first
+        self.idle_by_parent = {}
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hit_time = 0.0
+        self.miss_time = 0.0
+    
+    def acquire(self, parent, create, bind):
+        """Return an idle widget of parent re-bound with bind(widget), or a new one from create()."""
+        start = time.perf_counter()
+        idle = self.idle_by_parent.get(parent)
+        if idle:
+            widget = idle.pop()
+            del self.idle[widget]
+            bind(widget)
+            self.hits += 1
+            self.hit_time += time.perf_counter() - start
+        else:
+            widget = create()
+            bind(widget)
+            self.misses += 1
+            self.miss_time += time.perf_counter() - start
+        return widget
+    
+    def release(self, parent, widget):
+        """Park a widget that is no longer shown (the caller unmaps it)."""
+        self.idle[widget] = parent
+        idle = self.idle_by_parent.setdefault(parent, [])
+        idle.append(widget)
+        
+        if len(idle) > self.max_idle_per_parent:
+            self.evict(idle[0])
+        while len(self.idle) > self.max_idle:
+            self.evict(next(iter(self.idle)))
+    
+    def evict(self, widget):
+        parent = self.idle.pop(widget)
+        idle = self.idle_by_parent[parent]
+        idle.remove(widget)
+        if not idle:
+            del self.idle_by_parent[parent]
+        self.evictions += 1
+        if self.on_evict:
+            self.on_evict(widget)
+        widget.destroy()
+    
+    def discard_parent(self, parent):
+        """Forget idle widgets of a parent that has been destroyed (taking them with it)."""
+        for widget in self.idle_by_parent.pop(parent, []):
+            del self.idle[widget]
+    
+    def snapshot(self):
+        return (self.hits, self.misses, self.hit_time, self.miss_time)
+    
+    def summary(self, since=(0, 0, 0.0, 0.0)):
+        """Hit rate and estimated time saved since an earlier snapshot()."""
+        hits = self.hits - since[0]
+        misses = self.misses - since[1]
+        hit_time = self.hit_time - since[2]
+        lookups = hits + misses
+        hit_rate = hits / lookups if lookups else 0.0
+        # Each hit saved the average cost of building a widget, minus its re-bind
+        avg_miss = self.miss_time / self.misses if self.misses else 0.0
+        saved = hits * avg_miss - hit_time
+        return f"{hits}/{lookups} hits ({hit_rate:.0%}), ~{saved * 1000:.1f} ms saved"
+
+
+## Card Widget Class
+class CardWidget(ctk.CTkFrame):
+    """The widget tree for one card, built once and re-bound to other cards when recycled.
+    
+    A card widget always belongs to one ListWidget (its parent canvas), so the
+    list is read from there; the card's position is looked up by id when a
+    callback fires, since reconciling may move the widget without re-binding it."""
+    def __init__(self, parent, app, list_widget):
+        super().__init__(parent, corner_radius=8, fg_color="#313244", width=260)
+        self.app = app
+        self.list_widget = list_widget
+        self.card = None
+        self.title_entry = None
+        
+        # Card top frame for title and delete button
+        self.card_top = ctk.CTkFrame(self, fg_color="transparent")
+        self.card_top.pack(fill="x", padx=10, pady=(10, 0), side="top")
+        
+        # Card title with dynamic wrapping
+        self.title_label = ctk.CTkLabel(
+            self.card_top,
+            text="",
+            font=(app.font_family, 14),
+            anchor="w",
+            justify="left"
+        )
+        self.title_label.pack(side="left", fill="both", expand=True, padx=(5, 5), pady=2)
+        self.title_label.bind("<Double-Button-1>", lambda e: app.start_edit_card_title(self))
+        
+        # Delete card button
+        self.delete_button = ctk.CTkButton(
+            self.card_top,
+            text="×",
+            width=25,
+            height=25,
+            font=(app.font_family, 16),
+            fg_color="#f38ba8",
+            hover_color="#d16d87",
+            command=lambda: app.delete_card_dialog(self.card)
+        )
+        self.delete_button.pack(side="right", padx=5, pady=2)
+        
+        # Bottom frame for date and handles - PACK AT BOTTOM
+        card_bottom = ctk.CTkFrame(self, fg_color="transparent")
+        card_bottom.pack(fill="x", padx=10, pady=(5, 5), side="bottom")
+        
+        # Card date
+        self.date_label = ctk.CTkLabel(
+            card_bottom,
+            text="",
+            font=(app.font_family, 12),
+            text_color="#6c7086",
+            anchor="w"
+        )
+        self.date_label.pack(side="left")
+        
+        # Resize handle (bottom-right corner)
+        resize_handle = ctk.CTkLabel(
+            card_bottom,
+            text="⋱",
+            font=(app.font_family, 16, "bold"),
+            text_color="#89b4fa",
+            cursor="size_nw_se"
+        )
+        resize_handle.pack(side="right", padx=2)
+        resize_handle.bind("<Button-1>", lambda e: app.start_resize_card(e, self.card, self.winfo_height(), self.preview_size))
+        
+        # Drag handle
+        drag_handle = ctk.CTkLabel(
+            card_bottom,
+            text="///",
+            font=(app.font_family, 12, "bold"),
+            text_color="#6c7086",
+            cursor="hand2"
+        )
+        drag_handle.pack(side="right", padx=5)
+        drag_handle.bind("<Button-1>", lambda e: app.start_drag(
+            e, self, self.list_widget.list_id, app.card_index(self.list_widget.list_id, self.card)))
+        
+        # Multi-select: Ctrl+click toggles a card, Shift+click selects a range
+        for widget in (self, self.card_top, self.title_label, self.date_label):
+            widget.bind("<Control-Button-1>", lambda e: app.toggle_card_selected(self.card))
+            widget.bind("<Shift-Button-1>", lambda e: app.select_card_range(self.card))
+    
+    def bind_card(self, card):
+        """Show a (possibly different) card in this widget."""
+        self.card = card
+        self.close_title_entry()
+        
+        # Get card dimensions if stored
+        card_width = card.get('width', 260)
+        card_height = card.get('height', None)  # None = auto height
+        
+        self.configure(width=card_width)
+        if card_height:
+            self.configure(height=card_height)
+            self.pack_propagate(False)
+        else:
+            self.pack_propagate(True)
+        
+        self.title_label.configure(text=card["title"], wraplength=card_width - 60)
+        self.date_label.configure(text=card["created"])
+        if card.id in self.app.selected_cards:
+            self.configure(border_width=2, border_color=self.app.SELECTED_COLOR)
+        else:
+            self.configure(border_width=0)
+    
+    def preview_size(self, width, height):
+        """Show the card at a new size while it's being resized."""
+        self.configure(width=width, height=height)
+        self.pack_propagate(False)
+        
+        # Force update to reflow content
+        self.update_idletasks()
+    
+    def close_title_entry(self):
+        """Drop an in-progress title edit and show the label again."""
+        if self.title_entry is not None:
+            self.title_entry.destroy()
+            self.title_entry = None
+            self.title_label.pack(side="left", fill="both", expand=True, padx=(5, 5), pady=2, before=self.delete_button)
+
+
+## Canvas Card List Class
+class CanvasCardList:
+    """A list's cards drawn as items on one canvas, for boards too big for a widget per card.
+    
+    Each card is a rounded rectangle with its title, date, delete button and
+    drag/resize glyphs. All of a card's items share a "card:<id>" tag, and the
+    role tags ("title", "delete", "drag", "resize") route clicks, so one set of
+    tag bindings serves every card. Like the virtualized DynamicScrollableFrame,
+    only the cards in view (plus `overscan`) are drawn, and heights start as
+    estimates that are corrected once a card is drawn."""
+    ITEM_PADX = 5
+    ITEM_PADY = 3
+    CARD_COLOR = "#313244"
+    TEXT_COLOR = "#dce4ee"
+    SELECT_MODIFIERS = 0x0001 | 0x0004  # Shift, Control: those clicks select instead
+    
+    def __init__(self, parent, app, list_widget, bg_color="#2b2d3a", overscan=3):
+        self.app = app
+        self.list_widget = list_widget
+        self.overscan = overscan
+        
+        self.canvas = tk.Canvas(parent, bg=bg_color, highlightthickness=0)
+        self.scrollbar = ctk.CTkScrollbar(parent, orientation="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        
+        self.cards = []
+        self.item_heights = []
+        self.item_offsets = [0]
+        self.item_keys = []
+        self.measured_heights = {}  # key -> height when drawn
+        self.positions = {}  # card id -> index
+        self.drawn = {}  # index -> y the card was drawn at
+        self.sizes = {}  # index -> (width, height) overriding the card's, while resizing
+        self.title_entry = None
+        
+        self.canvas.bind("<Configure>", self.on_canvas_resized)
+        self.canvas.tag_bind("title", "<Double-Button-1>", self.on_title_double_click)
+        self.canvas.tag_bind("delete", "<Button-1>", self.on_delete_click)
+        self.canvas.tag_bind("drag", "<Button-1>", self.on_drag_click)
+        self.canvas.tag_bind("resize", "<Button-1>", self.on_resize_click)
+        self.canvas.tag_bind("card", "<Control-Button-1>", self.on_select_click)
+        self.canvas.tag_bind("card", "<Shift-Button-1>", self.on_select_click)
+        for role, cursor in (("delete", "hand2"), ("drag", "hand2"), ("resize", "size_nw_se")):
+            self.canvas.tag_bind(role, "<Enter>", lambda e, c=cursor: self.canvas.configure(cursor=c))
+            self.canvas.tag_bind(role, "<Leave>", lambda e: self.canvas.configure(cursor=""))
+    
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+    
+    def pack_forget(self):
+        self.canvas.pack_forget()
+        self.scrollbar.pack_forget()
+    
+    # --- Content ---
+    
+    def set_cards(self, cards):
+        """Show cards; measured heights are kept for cards whose key didn't change."""
+        self.close_title_entry()
+        self.cards = cards
+        self.item_keys = [self.app.card_key(card) for card in cards]
+        self.measured_heights = {
+            key: self.measured_heights[key] for key in self.item_keys if key in self.measured_heights
+        }
+        self.item_heights = [
+            self.measured_heights.get(key) or card.get('height') or self.app.CARD_HEIGHT
+            for key, card in zip(self.item_keys, cards)
+        ]
+        self.positions = {card.id: index for index, card in enumerate(cards)}
+        self.sizes = {}
+        self.canvas.delete("card")
+        self.drawn = {}
+        self.update_offsets()
+        self.refresh_items()
+    
+    def update_offsets(self):
+        """Recompute card y offsets (prefix sums of heights) and the scroll region."""
+        pitch = 2 * self.ITEM_PADY
+        self.item_offsets = [0]
+        self.item_offsets.extend(accumulate(height + pitch for height in self.item_heights))
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), self.item_offsets[-1]))
+        self.update_scrollbar()
+    
+    def refresh_items(self):
+        """Draw the cards in view, erase the ones that left it, and fix up measured heights."""
+        while True:
+            top = self.canvas.canvasy(0)
+            bottom = top + self.canvas.winfo_height()
+            first = max(0, bisect_right(self.item_offsets, top) - 1 - self.overscan)
+            last = min(len(self.cards), bisect_left(self.item_offsets, bottom) + self.overscan)
+            
+            for index in [i for i in self.drawn if not first <= i < last]:
+                self.canvas.delete(self.card_tag(index))
+                del self.drawn[index]
+            
+            resized = False
+            for index in range(first, last):
+                if index not in self.drawn:
+                    height = self.draw_card(index)
+                    if height != self.item_heights[index]:
+                        self.item_heights[index] = height
+                        if index not in self.sizes:
+                            self.measured_heights[self.item_keys[index]] = height
+                        resized = True
+            if not resized:
+                return
+            # Shift what's already drawn, then look again: more cards may fit now
+            self.update_offsets()
+            for index, y in self.drawn.items():
+                new_y = self.item_offsets[index] + self.ITEM_PADY
+                if new_y != y:
+                    self.canvas.move(self.card_tag(index), 0, new_y - y)
+                    self.drawn[index] = new_y
+    
+    def card_tag(self, index):
+        return f"card:{self.cards[index]['id']}"
+    
+    def draw_card(self, index):
+        """Draw one card at its offset and return its height."""
+        card = self.cards[index]
+        tag = self.card_tag(index)
+        tags = (tag, "card")
+        font_family = self.app.font_family
+        width, fixed_height = self.sizes.get(index, (card.get('width', 260), card.get('height')))
+        
+        x0 = self.ITEM_PADX
+        y0 = self.item_offsets[index] + self.ITEM_PADY
+        x1 = x0 + width
+        
+        title = self.canvas.create_text(
+            x0 + 15, y0 + 12,
+            text=card["title"],
+            anchor="nw",
+            width=width - 60,
+            font=(font_family, 14),
+            fill=self.TEXT_COLOR,
+            tags=tags + ("title",)
+        )
+        self.rounded_rect(x1 - 40, y0 + 10, x1 - 15, y0 + 35, 6, fill="#f38ba8", tags=tags + ("delete",))
+        self.canvas.create_text(
+            x1 - 27, y0 + 22, text="×", font=(font_family, 16), fill=self.TEXT_COLOR, tags=tags + ("delete",)
+        )
+        
+        # Bottom row sits under the title, or at the bottom of a fixed-height card
+        title_bottom = self.canvas.bbox(title)[3]
+        row_y = max(title_bottom + 8, y0 + 40)
+        if fixed_height:
+            row_y = y0 + fixed_height - 20
+        self.canvas.create_text(
+            x0 + 15, row_y, text=card["created"], anchor="w",
+            font=(font_family, 12), fill="#6c7086", tags=tags
+        )
+        self.canvas.create_text(
+            x1 - 15, row_y, text="⋱", anchor="e",
+            font=(font_family, 16, "bold"), fill="#89b4fa", tags=tags + ("resize",)
+        )
+        self.canvas.create_text(
+            x1 - 40, row_y, text="///", anchor="e",
+            font=(font_family, 12, "bold"), fill="#6c7086", tags=tags + ("drag",)
+        )
+        
+        height = fixed_height or (row_y + 15 - y0)
+        selected = card.id in self.app.selected_cards
+        body = self.rounded_rect(
+            x0, y0, x1, y0 + height, 8,
+            fill=self.CARD_COLOR,
+            outline=self.app.SELECTED_COLOR if selected else "",
+            width=2 if selected else 1,
+            tags=tags
+        )
+        self.canvas.tag_lower(body, title)
+        self.drawn[index] = y0
+        return height
+    
+    def rounded_rect(self, x0, y0, x1, y1, radius, **kwargs):
+        """A smoothed polygon approximating a rounded rectangle."""
+        points = (
+            x0 + radius, y0, x1 - radius, y0, x1, y0, x1, y0 + radius,
+            x1, y1 - radius, x1, y1, x1 - radius, y1, x0 + radius, y1,
+            x0, y1, x0, y1 - radius, x0, y0 + radius, x0, y0
+        )
+        return self.canvas.create_polygon(points, smooth=True, **kwargs)
+    
+    def preview_size(self, index, width, height):
+        """Redraw a card at a new size while it's being resized."""
+        if index not in self.drawn:
+            return
+        self.sizes[index] = (width, height)
+        self.canvas.delete(self.card_tag(index))
+        del self.drawn[index]
+        self.item_heights[index] = None  # Force the re-measure to shift the cards below
+        self.refresh_items()
+    
+    # --- Dragging ---
+    
+    def hide_item(self, tag):
+        """Hide a drawn card (e.g. while it's being dragged)."""
+        self.canvas.itemconfigure(tag, state="hidden")
+    
+    def item_origin(self, tag):
+        """Screen position of a drawn card's top-left corner."""
+        x0, y0, x1, y1 = self.canvas.bbox(tag)
+        return (self.canvas.winfo_rootx() + x0 - self.canvas.canvasx(0),
+                self.canvas.winfo_rooty() + y0 - self.canvas.canvasy(0))
+    
+    # --- Search results ---
+    
+    def scroll_to_item(self, index):
+        """Scroll so a card is at the top of the view (as far as the content allows)."""
+        self.canvas.yview_moveto(self.item_offsets[index] / max(self.item_offsets[-1], 1))
+        self.refresh_items()
+    
+    def highlight_item(self, index, color, duration_ms):
+        """Outline a drawn card for a moment; the outline shares the card's tag, so it scrolls with it."""
+        if index not in self.drawn:
+            return
+        x0, y0, x1, y1 = self.canvas.bbox(self.card_tag(index))
+        self.canvas.delete("highlight")
+        self.rounded_rect(
+            x0 - 1, y0 - 1, x1 + 1, y1 + 1, 9,
+            fill="", outline=color, width=2, tags=(self.card_tag(index), "card", "highlight")
+        )
+        self.canvas.after(duration_ms, lambda: self.canvas.delete("highlight"))
+    
+    # --- Hit-testing ---
+    
+    def current_index(self):
+        """Index of the card under the pointer, from the tags of the current item."""
+        for tag in self.canvas.gettags("current"):
+            if tag.startswith("card:"):
+                return self.positions.get(tag[5:])
+        return None
+    
+    def on_delete_click(self, event):
+        index = self.current_index()
+        if index is not None and not event.state & self.SELECT_MODIFIERS:
+            self.app.delete_card_dialog(self.cards[index])
+    
+    def on_drag_click(self, event):
+        index = self.current_index()
+        if index is not None and not event.state & self.SELECT_MODIFIERS:
+            self.app.start_drag(event, self.card_tag(index), self.list_widget.list_id, index)
+    
+    def on_resize_click(self, event):
+        index = self.current_index()
+        if index is not None and not event.state & self.SELECT_MODIFIERS:
+            self.app.start_resize_card(
+                event, self.cards[index], self.item_heights[index],
+                lambda width, height: self.preview_size(index, width, height)
+            )
+    
+    def on_select_click(self, event):
+        index = self.current_index()
+        if index is None:
+            return
+        if event.state & 0x0001:
+            self.app.select_card_range(self.cards[index])
+        else:
+            self.app.toggle_card_selected(self.cards[index])
+    
+    def on_title_double_click(self, event):
+        index = self.current_index()
+        if index is None:
+            return
+        self.close_title_entry()
+        card = self.cards[index]
+        x0, y0, x1, y1 = self.canvas.bbox(f"{self.card_tag(index)}&&title")
+        entry = ctk.CTkEntry(self.canvas, font=(self.app.font_family, 14), width=max(card.get('width', 260) - 60, 100))
+        entry.insert(0, card["title"])
+        self.title_entry = (entry, self.canvas.create_window(x0, y0 - 4, window=entry, anchor="nw"))
+        entry.focus()
+        def save(event=None):
+            if self.title_entry is None or self.title_entry[0] is not entry:
+                # Already saved, or the cards were redrawn
+                return
+            new_title = entry.get().strip()
+            self.close_title_entry()
+            self.app.save_card_title(card, new_title)
+        entry.bind("<Return>", save)
+        entry.bind("<FocusOut>", save)
+    
+    def close_title_entry(self):
+        if self.title_entry is not None:
+            entry, item_id = self.title_entry
+            self.title_entry = None
+            self.canvas.delete(item_id)
+            entry.destroy()
+    
+    # --- Scrolling ---
+    
+    def on_canvas_resized(self, event=None):
+        self.update_scrollbar()
+        self.refresh_items()
+    
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh_items()
+    
+    def update_scrollbar(self):
+        """Show the scrollbar only when the cards don't fit."""
+        if self.item_offsets[-1] > self.canvas.winfo_height() and self.canvas.winfo_manager():
+            self.scrollbar.pack(side="right", fill="y", before=self.canvas)
+        else:
+            self.scrollbar.pack_forget()
+
+
+## List Widget Class
+class ListWidget(ctk.CTkFrame):
+    """The widget tree for one list, including its virtualized cards area; recycled like cards."""
+    def __init__(self, parent, app):
+        super().__init__(parent, width=280, corner_radius=10, fg_color="#2b2d3a")
+        self.app = app
+        self.list_id = None  # For drop detection
+        self.list_name = None
+        self.list_data = None
+        self.name_entry = None
+        
+        # List header
+        self.header = ctk.CTkFrame(self, fg_color="#3d3f4f", corner_radius=8, height=40)
+        self.header.pack(fill="x", padx=5, pady=5)
+        self.header.pack_propagate(False)
+
+        self.list_label = ctk.CTkLabel(
+            self.header,
+            text="",
+            font=(app.font_family, 14, "bold")
+        )
+        self.list_label.pack(side="left", padx=10, pady=8)
+        self.list_label.bind("<Double-Button-1>", lambda event: app.start_edit_list_name(self))
+
+        # Bind drag for list on header
+        self.header.bind("<Button-1>", lambda e: app.start_drag(e, self, self.list_id))
+
+        # Delete list button
+        self.delete_button = ctk.CTkButton(
+            self.header,
+            text="×",
+            width=30,
+            height=30,
+            font=(app.font_family, 20),
+            fg_color="#f38ba8",
+            hover_color="#d16d87",
+            command=lambda: app.delete_list(self.list_id)
+        )
+        self.delete_button.pack(side="right", padx=5)
+
+        # Archive list button: the list and its cards go to the archive
+        self.archive_button = ctk.CTkButton(
+            self.header,
+            text="⇩",
+            width=30,
+            height=30,
+            font=(app.font_family, 16),
+            fg_color="#313244",
+            hover_color="#45475a",
+            command=lambda: app.archive_list(self.list_id)
+        )
+        self.archive_button.pack(side="right")
+
+        # Add card button at bottom - PACK FIRST
+        ctk.CTkButton(
+            self,
+            text="+ Add Card",
+            fg_color="#313244",
+            hover_color="#45475a",
+            command=lambda: app.create_card_dialog(self.list_id)
+        ).pack(side="bottom", fill="x", padx=5, pady=5)
+
+        # Cards container with dynamic vertical scrollbar, virtualized so long
+        # lists only build widgets for the cards in view
+        self.cards_scrollable = DynamicScrollableFrame(
+            self,
+            orientation="vertical",
+            bg_color="#2b2d3a",
+            virtualized=True
+        )
+        self.cards_scrollable.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        # The canvas-drawn alternative is only built if a board asks for it
+        self.renderer = "widgets"
+        self.cards_canvas = None
+        self.cards_view = self.cards_scrollable
+    
+    def set_renderer(self, renderer):
+        """Switch the cards area between card widgets and canvas-drawn cards."""
+        if renderer == self.renderer:
+            return
+        if renderer == "canvas" and self.cards_canvas is None:
+            self.cards_canvas = CanvasCardList(self, self.app, self)
+        
+        # Empty the old view so its card widgets go back to the pool
+        if self.renderer == "canvas":
+            self.cards_canvas.set_cards([])
+        else:
+            self.cards_scrollable.set_items(0, None, None, self.cards_scrollable.release_item)
+        self.cards_view.pack_forget()
+        
+        self.renderer = renderer
+        self.cards_view = self.cards_canvas if renderer == "canvas" else self.cards_scrollable
+        self.cards_view.pack(fill="both", expand=True, padx=5, pady=5)
+    
+    def bind_list(self, list_data):
+        """Show a (possibly different) list in this widget; cards are set separately."""
+        if list_data["id"] != self.list_id:
+            self.cards_view.canvas.yview_moveto(0)
+        self.list_id = list_data["id"]
+        self.list_name = list_data["name"]
+        self.list_data = list_data
+        self.close_name_entry()
+        self.list_label.configure(text=self.list_name)
+    
+    def close_name_entry(self):
+        if self.name_entry is not None:
+            self.name_entry.destroy()
+            self.name_entry = None
+            self.list_label.pack(side="left", padx=10, pady=8, before=self.archive_button)
+
+
+## Archive Browser
+class ArchiveBrowser(ctk.CTkToplevel):
+    """A window listing the archived cards, to restore them or delete them for good.
+
+    Rows are lines of one tk.Listbox, which copes with an archive of tens of
+    thousands of cards where a widget per card would not."""
+    def __init__(self, app):
+        super().__init__(app.root)
+        self.app = app
+        self.archive = app.engine.archive
+        self.rows = []  # Card id of each line
+        self.title("TaskFlow - Archive")
+        self.geometry("640x520")
+
+        top = ctk.CTkFrame(self, fg_color="transparent")
+        top.pack(fill="x", padx=10, pady=(10, 5))
+        self.filter_entry = ctk.CTkEntry(top, placeholder_text="Title contains", width=240)
+        self.filter_entry.pack(side="left")
+        self.filter_entry.bind("<KeyRelease>", self.refresh)
+        self.count_label = ctk.CTkLabel(top, text="", font=(app.font_family, 12))
+        self.count_label.pack(side="right")
+
+        buttons = ctk.CTkFrame(self, fg_color="transparent")
+        buttons.pack(side="bottom", fill="x", padx=10, pady=10)
+        ctk.CTkButton(buttons, text="Restore", width=90, command=self.restore_selected).pack(side="left", padx=5)
+        ctk.CTkButton(
+            buttons,
+            text="Delete",
+            width=90,
+            fg_color="#f38ba8",
+            hover_color="#d16d87",
+            command=self.delete_selected
+        ).pack(side="left", padx=5)
+        ctk.CTkButton(
+            buttons,
+            text="Close",
+            width=90,
+            fg_color="#313244",
+            hover_color="#45475a",
+            command=self.destroy
+        ).pack(side="right", padx=5)
+
+        self.listbox = tk.Listbox(
+            self,
+            selectmode="extended",
+            bg="#2b2d3a",
+            fg="#cdd6f4",
+            selectbackground="#45475a",
+            highlightthickness=0,
+            borderwidth=0,
+            activestyle="none",
+            font=(app.font_family, 12)
+        )
+        scrollbar = ctk.CTkScrollbar(self, command=self.listbox.yview)
+        self.listbox.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y", pady=5)
+        self.listbox.pack(fill="both", expand=True, padx=(10, 0), pady=5)
+        self.refresh()
+
+    def refresh(self, event=None):
+        """Refill the rows, board by board and list by list, keeping the title filter."""
+        text = self.filter_entry.get().strip().casefold()
+        self.rows = []
+        lines = []
+        for board in self.archive.boards.values():
+            for list_data in board["lists"].values():
+                for card in list_data["cards"]:
+                    if text and text not in card.title.casefold():
+                        continue
+                    self.rows.append(card.id)
+                    lines.append(f"{board['name']} › {list_data['name']}:  {card.title}  ({card['created']})")
+        self.listbox.delete(0, "end")
+        if lines:
+            self.listbox.insert("end", *lines)
+        self.count_label.configure(text=f"{len(lines)} archived card{'s' if len(lines) != 1 else ''}")
+
+    def selected_ids(self):
+        return [self.rows[row] for row in self.listbox.curselection()]
+
+    def restore_selected(self):
+        """Put the selected cards back on their boards (an undoable change, like archiving)."""
+        self.app.engine.restore_cards(self.selected_ids())
+        self.refresh()
+
+    def delete_selected(self):
+        card_ids = self.selected_ids()
+        if not card_ids:
+            return
+        count = len(card_ids)
+        dialog = ctk.CTkInputDialog(
+            text=f"Type 'confirm' to delete {count} archived card{'s' if count != 1 else ''} for good:",
+            title="Delete Archived Cards"
+        )
+        if dialog.get_input() == "confirm":
+            self.archive.delete(card_ids)
+            self.refresh()
+
+
 ## TaskBoard Class
 class TaskBoard:
     def __init__(self, root):
@@ -115,10 +1024,36 @@ class TaskBoard:
         
         self.font_family = font_family_variable 
         
-        # Data storage
-        self.data_file = "taskflow_data.json"
-        self.boards = {}
-        self.current_board = None
+        # Data storage (a .db/.sqlite file selects the SQLite backend, a .tfb file the binary one)
+        self.data_file = os.environ.get("TASKFLOW_DATA_FILE", "taskflow_data.json")
+        self.store = open_store(self.data_file)
+        # Archived cards and lists live in their own file (taskflow_data.archive.json),
+        # only opened when something is archived or the archive window is shown
+        self.archive = Archive(archive_file(self.data_file))
+        # Undo history is kept as inverse changes, capped at UNDO_MAX_BYTES (oldest dropped first)
+        self.UNDO_MAX_BYTES = 16 * 1024 * 1024
+        self.engine = BoardStore(self.store, History(self.UNDO_MAX_BYTES), self.archive)  # All board logic; the UI renders its change events
+        
+        # Auto-archive: TASKFLOW_AUTO_ARCHIVE="Done=14,Shipped=30" archives cards older
+        # than that many days from lists with those names, at start-up, on opening
+        # a board and every AUTO_ARCHIVE_MS after
+        self.AUTO_ARCHIVE_MS = 60 * 60 * 1000
+        self.auto_archive_rules = parse_archive_rules(os.environ.get("TASKFLOW_AUTO_ARCHIVE", ""))
+        self.archive_browser = None
+        
+        # Opt-in timing of the load, save, render and drag paths (TASKFLOW_PROFILE=1
+        # or --profile): F12 toggles a percentile overlay, and a Chrome trace is
+        # written to TASKFLOW_TRACE (taskflow_trace.json) on close
+        self.profiler = Profiler() if os.environ.get("TASKFLOW_PROFILE") else None
+        self.profile_overlay = None
+        if self.profiler:
+            self.profiler.instrument(self.store, ('append', 'flush'))
+            self.profiler.instrument(self.engine, ('load', 'apply'))
+            self.profiler.instrument(self, (
+                'render_board', 'render_list_cards', 'render_card',
+                'start_drag', 'on_drag_motion', 'process_drag_frame', 'on_drop',
+                'update_search_results'
+            ))
         
         # Drag and drop
         self.dragged_item = None
@@ -127,33 +1062,284 @@ class TaskBoard:
         self.offset_y = None
         self.drag_start_x_root = None
         self.drag_start_y_root = None
+        self.drop_geometry = None  # Captured in start_drag, used for hit-testing
+        self.drop_indicator = None  # One placeholder bar, moved around while dragging
+        self.drop_target = None
+        
+        # Ghosts are built on first use and relabelled for every later drag
+        self.card_ghost = None
+        self.list_ghost = None
+        
+        # Motion events only record the pointer; the ghost moves at most once
+        # per frame. Set TASKFLOW_DEBUG_DRAG=1 to print event counts per drag.
+        self.DRAG_FRAME_MS = 16
+        self.drag_frame = None  # Pending after() id
+        self.drag_pointer = None
+        self.drag_events = {'received': 0, 'processed': 0, 'coalesced': 0}
+        self.debug_drag = bool(os.environ.get("TASKFLOW_DEBUG_DRAG"))
 
         self.resize_data = None
         
+        # Search: the engine keeps the index; these are the result rows under the search box
+        self.SEARCH_RESULTS = 8
+        self.SEARCH_HIGHLIGHT_MS = 1500
+        self.search_buttons = []
+        self.search_docs = []
+        self.search_query = ""
+        
+        # Filter for the board view; filtered_cards holds its matches per list while it's active
+        self.card_filter = CardFilter()
+        self.filtered_cards = None
+        self.FILTER_SORTS = {
+            "List order": (None, False),
+            "Newest first": ('created', True),
+            "Oldest first": ('created', False),
+            "Title A-Z": ('title', False),
+            "Title Z-A": ('title', True)
+        }
+        
+        # Multi-select (Ctrl/Shift+click) for the bulk actions bar; an ordered set of card ids
+        self.SELECTED_COLOR = "#89b4fa"
+        self.selected_cards = {}
+        self.selection_anchor = None  # Card a Shift+click range starts from
+        self.selection_targets = []  # List ids behind the "Move to" choices
+        
+        # Trello import: exports are parsed on a background thread, which fills
+        # import_state; poll_import adds finished boards and shows progress
+        self.IMPORT_POLL_MS = 100
+        self.import_thread = None
+        self.import_state = None
+        
         # Permanent offset adjustment - HARDCODED VALUES
         self.ghost_offset_x = -315
         self.ghost_offset_y = -109
         
-        # Constants for drag drop
-        self.HEADER_HEIGHT = 50
+        # Background saving: quiet period before a write, and the longest a
+        # change may stay unsaved (lower = more durable, higher = fewer writes)
+        self.SAVE_DEBOUNCE = 0.25
+        self.SAVE_MAX_STALENESS = 2.0
+        self.saver = SaveScheduler(self.store.flush, self.SAVE_DEBOUNCE, self.SAVE_MAX_STALENESS)
+        
+        # Other TaskFlow windows and scripts may edit the same data file: every
+        # SYNC_POLL_MS the store checks it (a stat) and their changes are merged
+        self.SYNC_POLL_MS = 500
+        
+        # Changes made while a batch runs (merged ones, API calls) are rendered
+        # together at its end; see run_batched
+        self.change_batch = None
+        
+        # Local automation API (api.py), off unless TASKFLOW_API_PORT is set. Calls
+        # queue up on the server's thread and run here every API_POLL_MS, each
+        # batch saved and rendered once; TASKFLOW_API_TOKEN makes it require a token
+        self.API_POLL_MS = 20
+        self.api_server = None
+        
+        # Height assumed for cards that haven't been measured on screen yet
         self.CARD_HEIGHT = 80
-        self.LIST_WIDTH = 300
         
-        # Store references to list frames for partial updates
+        # Store references to list frames (by list id, in board order) for partial updates
         self.list_frames = {}
         self.list_scrollables = {}
         
-        self.load_data()
+        # Recycled card and list widgets; set TASKFLOW_DEBUG_POOL=1 to print
+        # the hit rate and time saved after each render
+        self.card_pool = WidgetPool(max_idle_per_parent=32, max_idle=512)
+        self.list_pool = WidgetPool(
+            max_idle_per_parent=16,
+            max_idle=16,
+            on_evict=lambda widget: self.card_pool.discard_parent(widget.cards_scrollable.canvas)
+        )
+        self.debug_pool = bool(os.environ.get("TASKFLOW_DEBUG_POOL"))
+        
+        self.engine.load()
         
         self.setup_ui()
+        self.engine.subscribe(self.on_board_change)
             
         if not self.boards:
             self.create_board("My First Board")
         
         self.update_board_dropdown()
         self.render_board()
+        if self.auto_archive_rules:
+            self.run_auto_archive(repeat=True)
+        self.root.after(self.SYNC_POLL_MS, self.poll_external_changes)
+        if os.environ.get("TASKFLOW_API_PORT"):
+            self.start_api_server(int(os.environ["TASKFLOW_API_PORT"]))
+        
+        # Opt-in (TASKFLOW_WATCHDOG=1): log UI freezes (event loop late by more than
+        # TASKFLOW_STALL_MS) with the blocking handler's stack, beside the data file
+        self.watchdog = None
+        if os.environ.get("TASKFLOW_WATCHDOG", "0") != "0":
+            self.watchdog = StallWatchdog(
+                self.root.after,
+                owner=self,
+                threshold=float(os.environ.get("TASKFLOW_STALL_MS", 250)) / 1000,
+                log_file=stall_log_file(self.data_file)
+            )
+            self.watchdog.start()
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+    
+    @property
+    def boards(self):
+        return self.engine.boards
+    
+    @property
+    def current_board(self):
+        """Id of the board being shown."""
+        return self.engine.current_board
+    
+    @current_board.setter
+    def current_board(self, board_id):
+        self.engine.data['current_board'] = board_id
+    
+    def on_board_change(self, change):
+        """Save and re-render after a change, touching only the lists it affected."""
+        self.saver.mark_dirty()
+        if self.change_batch is not None:
+            # Rendered with the rest of the batch (see run_batched)
+            self.change_batch.append(change)
+            return
+        self.render_changes([change])
+    
+    def run_batched(self, function):
+        """Call function, rendering the changes it makes once at the end rather than one at a time."""
+        self.change_batch = []
+        try:
+            return function()
+        finally:
+            changes, self.change_batch = self.change_batch, None
+            if changes:
+                self.render_changes(changes)
+    
+    def render_changes(self, changes):
+        """Re-render what changes touched: each affected list once, or the whole board if any change needs it."""
+        # Shown results may name or point at something that just changed
+        if self.search_docs:
+            self.close_search_results()
+            self.search_query = ""
+        
+        ops = {change['op'] for change in changes}
+        if self.selected_cards and ops & {'delete_board', 'restore_board', 'select_board', 'create_board',
+                                          'delete_list', 'delete_card', 'delete_cards', 'reload'}:
+            # Drop selected cards that are gone or no longer on screen
+            self.selected_cards = {
+                card_id: None for card_id in self.selected_cards
+                if self.engine.find_card(card_id)
+                and self.engine.find_list(self.engine.find_card(card_id)[0])[0] == self.current_board
+            }
+            self.update_selection_bar()
+        if (any(change.get('archive') for change in changes)
+                and self.archive_browser is not None and self.archive_browser.winfo_exists()):
+            self.archive_browser.refresh()
+        if 'select_board' in ops and self.auto_archive_rules:
+            # Lazily loaded boards are only checked once opened
+            self.root.after_idle(self.run_auto_archive)
+        if ops & {'create_board', 'delete_board', 'restore_board', 'rename_board', 'select_board', 'reload'}:
+            self.update_board_dropdown()
+            self.render_board()
+            return
+        
+        list_ids = {}  # Ordered set of lists to re-render
+        for change in changes:
+            op = change['op']
+            if change.get('board') != self.current_board:
+                # Nothing on screen shows other boards' contents
+                continue
+            elif op in ('add_card', 'delete_card', 'update_card'):
+                list_ids[change['list']] = None
+            elif op == 'move_card':
+                list_ids[change['source']] = None
+                list_ids[change['target']] = None
+            elif op in ('add_cards', 'delete_cards', 'move_cards', 'update_cards'):
+                # However many cards a bulk change moved, each list is re-rendered once
+                list_ids.update(dict.fromkeys(change.get('lists', ())))
+                list_ids.update(dict.fromkeys(change.get('places', ())))
+                list_ids.update((list_id, None) for list_id, card_id, fields in change.get('cards', ()))
+            else:
+                self.render_board()
+                return
+        if list_ids:
+            if self.filtered_cards is not None:
+                # Only the cards these changes touched are tested again; query() reruns when the filter changes
+                self.engine.update_query(self.filtered_cards, self.card_filter,
+                                         [change for change in changes if change.get('board') == self.current_board])
+            for list_id in list_ids:
+                self.render_list_cards(list_id)
+    
+    def on_close(self):
+        """Flush unsaved changes before the window goes away."""
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.api_server:
+            self.api_server.stop()
+        self.saver.close()
+        self.store.close()
+        self.archive.close()
+        if self.profiler:
+            trace_file = os.environ.get("TASKFLOW_TRACE", "taskflow_trace.json")
+            self.profiler.dump_trace(trace_file)
+            print(self.profiler.summary())
+            print(f"Trace written to {trace_file}")
+        self.root.destroy()
+    
+    def poll_external_changes(self):
+        """Merge what other processes saved to the data file; each change re-renders only what it touched."""
+        # Not mid-drag or mid-resize, which hold on to the widgets being re-rendered
+        if self.dragged_item is None and self.resize_data is None:
+            try:
+                self.run_batched(self.engine.sync)
+            except Exception as e:
+                print(f"Could not merge changes from other processes. Error: {e}")
+        self.root.after(self.SYNC_POLL_MS, self.poll_external_changes)
+    
+    def start_api_server(self, port):
+        """Serve the local automation API on port (see api.py)."""
+        server = ApiServer(self.engine, port, os.environ.get("TASKFLOW_API_TOKEN"))
+        try:
+            server.start()
+        except OSError as e:
+            print(f"Could not start the API server on port {port}. Error: {e}")
+            return
+        self.api_server = server
+        print(f"API listening on http://127.0.0.1:{server.port}/rpc")
+        self.root.after(self.API_POLL_MS, self.run_api_calls)
+    
+    def run_api_calls(self):
+        """Run the API calls queued since the last poll as one batch: one save and one re-render for all of them."""
+        # Like merges, they wait while a drag or resize holds on to widgets
+        if self.dragged_item is None and self.resize_data is None:
+            self.run_batched(self.api_server.run_pending)
+        self.root.after(self.API_POLL_MS, self.run_api_calls)
+    
+    def toggle_profile_overlay(self, event=None):
+        """Show or hide the profiler's percentile table over the board."""
+        if self.profile_overlay is not None:
+            self.profile_overlay.destroy()
+            self.profile_overlay = None
+            return
+        self.profile_overlay = tk.Label(
+            self.root,
+            font=("Courier", 10),
+            justify="left",
+            anchor="nw",
+            bg="#11111b",
+            fg="#cdd6f4",
+            padx=8,
+            pady=6
+        )
+        self.profile_overlay.place(relx=1.0, x=-10, y=70, anchor="ne")
+        self.update_profile_overlay()
+    
+    def update_profile_overlay(self):
+        if self.profile_overlay is None:
+            return
+        self.profile_overlay.configure(text=self.profiler.summary())
+        self.profile_overlay.lift()
+        self.root.after(500, self.update_profile_overlay)
     
-    def create_card_ghost(self, card):
+    def create_card_ghost(self):
         ghost = ctk.CTkFrame(
             self.root,
             corner_radius=8,
@@ -169,30 +1355,29 @@ class TaskBoard:
         card_top.pack_propagate(False)
         
         # Card title
-        title_label = ctk.CTkLabel(
+        ghost.title_label = ctk.CTkLabel(
             card_top,
-            text=card["title"],
+            text="",
             font=(self.font_family, 14),
             wraplength=240,
             anchor="w",
             justify="left"
         )
-        title_label.pack(side="left", fill="both", expand=True, padx=(5, 5), pady=2)
+        ghost.title_label.pack(side="left", fill="both", expand=True, padx=(5, 5), pady=2)
         
         # Card date
-        date_label = ctk.CTkLabel(
+        ghost.date_label = ctk.CTkLabel(
             ghost,
-            text=card["created"],
+            text="",
             font=(self.font_family, 12),
             text_color="#6c7086",
             anchor="w"
         )
-        date_label.pack(fill="x", padx=10, pady=(5, 10))
+        ghost.date_label.pack(fill="x", padx=10, pady=(5, 10))
         
         return ghost
     
-    def create_list_ghost(self, list_name, list_data):
-        num_cards = len(list_data["cards"])
+    def create_list_ghost(self):
         ghost = ctk.CTkFrame(
             self.root,
             width=280,
@@ -207,22 +1392,40 @@ class TaskBoard:
         header.pack(fill="x", padx=5, pady=5)
         header.pack_propagate(False)
         
-        ctk.CTkLabel(
+        ghost.name_label = ctk.CTkLabel(
             header,
-            text=list_name,
+            text="",
             font=(self.font_family, 14, "bold")
-        ).pack(side="left", padx=10, pady=8)
+        )
+        ghost.name_label.pack(side="left", padx=10, pady=8)
         
         # Cards count
-        ctk.CTkLabel(
+        ghost.count_label = ctk.CTkLabel(
             ghost,
-            text=f"{num_cards} cards",
+            text="",
             font=(self.font_family, 10),
             text_color="#6c7086"
-        ).pack(pady=5)
+        )
+        ghost.count_label.pack(pady=5)
         
         return ghost
     
+    def card_ghost_for(self, card):
+        """The shared card ghost, relabelled for this card."""
+        if self.card_ghost is None:
+            self.card_ghost = self.create_card_ghost()
+        self.card_ghost.title_label.configure(text=card["title"])
+        self.card_ghost.date_label.configure(text=card["created"])
+        return self.card_ghost
+    
+    def list_ghost_for(self, list_data):
+        """The shared list ghost, relabelled for this list."""
+        if self.list_ghost is None:
+            self.list_ghost = self.create_list_ghost()
+        self.list_ghost.name_label.configure(text=list_data["name"])
+        self.list_ghost.count_label.configure(text=f"{len(list_data['cards'])} cards")
+        return self.list_ghost
+    
     # --- UI Setup ---
     
     def setup_ui(self):
@@ -281,12 +1484,148 @@ class TaskBoard:
         )
         new_board_btn.pack(side="left", padx=5, pady=10)
 
-        # 3. New List button using the factory
-        new_list_btn = button_factory.create_button(
-            text="+ New List",
-            command=self.create_list_dialog
+        # 3. New List button using the factory
+        new_list_btn = button_factory.create_button(
+            text="+ New List",
+            command=self.create_list_dialog
+        )
+        new_list_btn.pack(side="left", padx=5, pady=10)
+
+        # 4. Browse archived cards, to restore or delete them
+        archive_btn = button_factory.create_button(
+            text="🗄 Archive",
+            command=self.open_archive_browser
+        )
+        archive_btn.pack(side="left", padx=5, pady=10)
+
+        # 5. Import Trello board exports (JSON)
+        import_btn = button_factory.create_button(
+            text="⇪ Import",
+            command=self.import_trello_dialog
+        )
+        import_btn.pack(side="left", padx=5, pady=10)
+
+        # Undo/redo (also Ctrl+Z and Ctrl+Y / Ctrl+Shift+Z)
+        undo_btn = button_factory.create_button(text="↶ Undo", command=self.undo)
+        undo_btn.configure(width=70)
+        undo_btn.pack(side="left", padx=5, pady=10)
+        redo_btn = button_factory.create_button(text="↷ Redo", command=self.redo)
+        redo_btn.configure(width=70)
+        redo_btn.pack(side="left", padx=5, pady=10)
+
+        # Per-board card renderer: a widget per card, or cards drawn on one canvas per list
+        self.renderer_var = ctk.StringVar(value="Widgets")
+        self.renderer_toggle = ctk.CTkSegmentedButton(
+            self.top_frame,
+            values=["Widgets", "Canvas"],
+            variable=self.renderer_var,
+            command=self.renderer_selected
+        )
+        self.renderer_toggle.pack(side="left", padx=5, pady=10)
+
+        # Search over every board's names and card titles; matches show as you type
+        self.search_entry = ctk.CTkEntry(
+            self.top_frame,
+            placeholder_text="Search...",
+            width=220
+        )
+        self.search_entry.pack(side="right", padx=20, pady=10)
+
+        # Import progress, shown only while an import runs
+        self.import_label = ctk.CTkLabel(self.top_frame, text="", font=(self.font_family, 12))
+        self.search_entry.bind("<KeyRelease>", self.update_search_results)
+        self.search_entry.bind("<Return>", lambda e: self.search_docs and self.open_search_result(self.search_docs[0]))
+        self.search_entry.bind("<Escape>", self.close_search_results)
+
+        self.search_results = ctk.CTkFrame(self.root, corner_radius=8, fg_color="#313244")
+        for number in range(self.SEARCH_RESULTS):
+            button = ctk.CTkButton(
+                self.search_results,
+                text="",
+                anchor="w",
+                width=360,
+                fg_color="transparent",
+                hover_color="#45475a",
+                command=lambda number=number: self.search_result_clicked(number)
+            )
+            self.search_buttons.append(button)
+
+        # Filter bar: shows only matching cards, optionally sorted
+        filter_frame = ctk.CTkFrame(self.root, height=40, corner_radius=0, fg_color="transparent")
+        filter_frame.pack(fill="x", side="top", padx=10)
+
+        ctk.CTkLabel(filter_frame, text="Filter:", font=(self.font_family, 12)).pack(side="left", padx=(10, 5))
+        self.filter_title_entry = ctk.CTkEntry(filter_frame, placeholder_text="Title contains", width=180)
+        self.filter_after_entry = ctk.CTkEntry(filter_frame, placeholder_text="After (YYYY-MM-DD)", width=150)
+        self.filter_before_entry = ctk.CTkEntry(filter_frame, placeholder_text="Before (YYYY-MM-DD)", width=150)
+        for entry in (self.filter_title_entry, self.filter_after_entry, self.filter_before_entry):
+            entry.pack(side="left", padx=5, pady=5)
+            entry.bind("<Return>", self.apply_filter)
+
+        self.filter_sort_var = ctk.StringVar(value="List order")
+        ctk.CTkComboBox(
+            filter_frame,
+            variable=self.filter_sort_var,
+            values=list(self.FILTER_SORTS),
+            width=140,
+            state="readonly",
+            command=self.apply_filter
+        ).pack(side="left", padx=5, pady=5)
+
+        ctk.CTkButton(
+            filter_frame,
+            text="Clear",
+            width=60,
+            fg_color="#313244",
+            hover_color="#45475a",
+            command=self.clear_filter
+        ).pack(side="left", padx=5, pady=5)
+
+        # Bulk actions for the selected cards, shown only while some are selected
+        self.selection_frame = ctk.CTkFrame(self.root, height=40, corner_radius=0, fg_color="transparent")
+        self.filter_frame = filter_frame
+        
+        self.selection_label = ctk.CTkLabel(self.selection_frame, text="", font=(self.font_family, 12, "bold"))
+        self.selection_label.pack(side="left", padx=(10, 10))
+        
+        self.selection_target_var = ctk.StringVar(value="")
+        self.selection_target = ctk.CTkComboBox(
+            self.selection_frame,
+            variable=self.selection_target_var,
+            values=[],
+            width=160,
+            state="readonly"
         )
-        new_list_btn.pack(side="left", padx=5, pady=10)
+        self.selection_target.pack(side="left", padx=5, pady=5)
+        ctk.CTkButton(self.selection_frame, text="Move", width=60, command=self.move_selected_cards).pack(
+            side="left", padx=5, pady=5)
+        
+        self.selection_width_entry = ctk.CTkEntry(self.selection_frame, placeholder_text="Width", width=70)
+        self.selection_height_entry = ctk.CTkEntry(self.selection_frame, placeholder_text="Height", width=70)
+        for entry in (self.selection_width_entry, self.selection_height_entry):
+            entry.pack(side="left", padx=5, pady=5)
+            entry.bind("<Return>", self.resize_selected_cards)
+        ctk.CTkButton(self.selection_frame, text="Resize", width=60, command=self.resize_selected_cards).pack(
+            side="left", padx=5, pady=5)
+        
+        ctk.CTkButton(self.selection_frame, text="Archive", width=60, command=self.archive_selected_cards).pack(
+            side="left", padx=5, pady=5)
+        ctk.CTkButton(
+            self.selection_frame,
+            text="Delete",
+            width=60,
+            fg_color="#f38ba8",
+            hover_color="#d16d87",
+            command=self.delete_selected_cards
+        ).pack(side="left", padx=5, pady=5)
+        ctk.CTkButton(
+            self.selection_frame,
+            text="Clear",
+            width=60,
+            fg_color="#313244",
+            hover_color="#45475a",
+            command=self.clear_selection
+        ).pack(side="left", padx=5, pady=5)
 
         # Main content area with dynamic horizontal scrollbar
         main_frame = ctk.CTkFrame(self.root, fg_color="transparent")
@@ -302,22 +1641,39 @@ class TaskBoard:
         # Bind drag events to root
         self.root.bind("<B1-Motion>", self.on_drag_motion)
         self.root.bind("<ButtonRelease-1>", self.on_drop)
+        
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+        self.root.bind("<Control-Z>", self.redo)  # Ctrl+Shift+Z
+        self.root.bind("<Escape>", self.clear_selection)
+        
+        if self.profiler:
+            self.root.bind("<F12>", self.toggle_profile_overlay)
 
     
-    def start_drag(self, event, widget, list_name, idx=None):
+    def start_drag(self, event, widget, list_id, idx=None):
         if self.dragged_item:
             return
         
         drag_type = 'card' if idx is not None else 'list'
         self.drag_data = {
             'type': drag_type,
-            'list_name': list_name,
+            'list_id': list_id,
             'idx': idx
         }
         
-        # Get widget's absolute screen position BEFORE any changes
-        widget_screen_x = widget.winfo_rootx()
-        widget_screen_y = widget.winfo_rooty()
+        # Get widget's absolute screen position BEFORE any changes (a dragged
+        # card is a widget or, with the canvas renderer, the tag of its items)
+        if drag_type == 'card' and self.filtered_cards is not None:
+            # Positions on screen aren't list positions while filtered
+            self.drag_data = None
+            return
+        
+        if drag_type == 'card':
+            widget_screen_x, widget_screen_y = self.list_scrollables[list_id].item_origin(widget)
+        else:
+            widget_screen_x = widget.winfo_rootx()
+            widget_screen_y = widget.winfo_rooty()
         
         # Get mouse screen position
         mouse_screen_x = self.root.winfo_pointerx()
@@ -331,68 +1687,203 @@ class TaskBoard:
         self.drag_start_x_root = mouse_screen_x
         self.drag_start_y_root = mouse_screen_y
         
-        # Forget current packing
-        widget.pack_forget()
+        # Capture the layout while the dragged widget still takes its space
+        self.capture_drop_geometry()
+        
+        # Forget current packing (cards sit in a virtualized or drawn list's canvas)
+        if drag_type == 'card':
+            self.list_scrollables[list_id].hide_item(widget)
+        else:
+            widget.pack_forget()
         
+        # The model is left alone until the drop applies a single move
         board = self.boards[self.current_board]
         self.dragged_item = None
         
         if drag_type == 'card':
-            card = board['lists'][list_name]['cards'].pop(idx)
+            card = board['lists'][list_id]['cards'][idx]
             self.drag_data['card'] = card
-            self.dragged_item = self.create_card_ghost(card)
+            self.dragged_item = self.card_ghost_for(card)
         else:
-            list_data = board['lists'].pop(list_name)
+            list_data = board['lists'][list_id]
             self.drag_data['list_data'] = list_data
-            self.dragged_item = self.create_list_ghost(list_name, list_data)
+            self.dragged_item = self.list_ghost_for(list_data)
         
-        # Place ghost at widget's screen position (converted to root-relative)
-        root_screen_x = self.root.winfo_rootx()
-        root_screen_y = self.root.winfo_rooty()
+        # Place ghost at widget's screen position (converted to root-relative;
+        # the root can't move mid-drag, so its offset is read once)
+        root_screen_x = self.drop_geometry['root_x']
+        root_screen_y = self.drop_geometry['root_y']
         
         ghost_x = widget_screen_x - root_screen_x
         ghost_y = widget_screen_y - root_screen_y
         
         self.dragged_item.place(x=ghost_x, y=ghost_y)
         self.dragged_item.lift()
+        
+        self.drag_pointer = (mouse_screen_x, mouse_screen_y)
+        self.drag_events = {'received': 0, 'processed': 0, 'coalesced': 0}
 
+    # --- Drop Targets ---
+    
+    def capture_drop_geometry(self):
+        """Record list rectangles and card offsets once per drag.
+        
+        Layout can't change while dragging, so drop targets are then found by
+        bisecting these instead of querying every widget on each event."""
+        lists = []
+        for list_id, list_frame in self.list_frames.items():
+            if not list_frame.winfo_ismapped():
+                continue
+            scrollable = list_frame.cards_view
+            lists.append({
+                'id': list_id,
+                'left': list_frame.winfo_rootx(),
+                'top': list_frame.winfo_rooty(),
+                'width': list_frame.winfo_width(),
+                'height': list_frame.winfo_height(),
+                'cards_left': scrollable.canvas.winfo_rootx(),
+                'cards_top': scrollable.canvas.winfo_rooty(),
+                'cards_width': scrollable.canvas.winfo_width(),
+                'cards_height': scrollable.canvas.winfo_height(),
+                'scroll_top': scrollable.canvas.canvasy(0),
+                # item_offsets is replaced, never mutated, so this is a snapshot
+                'offsets': scrollable.item_offsets,
+                'midpoints': None
+            })
+        self.drop_geometry = {
+            'lists': lists,
+            'lefts': [geometry['left'] for geometry in lists],
+            'list_midpoints': [
+                geometry['left'] + geometry['width'] / 2
+                for geometry in lists if geometry['id'] != self.drag_data['list_id']
+            ],
+            'root_x': self.root.winfo_rootx(),
+            'root_y': self.root.winfo_rooty()
+        }
+    
+    def card_midpoints(self, geometry):
+        """Card midpoints of a list (without the dragged card), built on first hover."""
+        if geometry['midpoints'] is None:
+            offsets = geometry['offsets']
+            skip = self.drag_data['idx'] if geometry['id'] == self.drag_data['list_id'] else None
+            geometry['midpoints'] = [
+                (offsets[i] + offsets[i + 1]) / 2
+                for i in range(len(offsets) - 1) if i != skip
+            ]
+        return geometry['midpoints']
+    
+    def find_drop_target(self, x, y):
+        """Return (list id, insertion index) for a drop at screen (x, y), or None.
+        
+        Indices count positions with the dragged card or list taken out."""
+        geometry = self.drop_geometry
+        if self.drag_data['type'] == 'list':
+            return (self.drag_data['list_id'], bisect_left(geometry['list_midpoints'], x))
+        
+        position = bisect_right(geometry['lefts'], x) - 1
+        if position < 0:
+            return None
+        target = geometry['lists'][position]
+        if x > target['left'] + target['width'] or not target['top'] <= y <= target['top'] + target['height']:
+            return None
+        content_y = y - target['cards_top'] + target['scroll_top']
+        return (target['id'], bisect_left(self.card_midpoints(target), content_y))
+    
+    def show_drop_indicator(self, drop_target):
+        """Move the placeholder bar to where a drop would land; nothing is re-rendered."""
+        if drop_target == self.drop_target:
+            return
+        self.drop_target = drop_target
+        if drop_target is None:
+            self.hide_drop_indicator()
+            return
+        if self.drop_indicator is None:
+            self.drop_indicator = tk.Frame(self.root, bg="#89b4fa", height=3, width=3)
+        
+        geometry = self.drop_geometry
+        root_x = geometry['root_x']
+        root_y = geometry['root_y']
+        list_id, index = drop_target
+        if self.drag_data['type'] == 'list':
+            others = [g for g in geometry['lists'] if g['id'] != list_id]
+            if not others:
+                self.hide_drop_indicator()
+                return
+            if index < len(others):
+                x = others[index]['left'] - 5
+            else:
+                x = others[-1]['left'] + others[-1]['width'] + 5
+            self.drop_indicator.place(
+                x=x - 1 - root_x, y=others[0]['top'] - root_y,
+                width=3, height=max(g['height'] for g in others)
+            )
+        else:
+            target = next(g for g in geometry['lists'] if g['id'] == list_id)
+            offsets = target['offsets']
+            # Back to an index among all items, dragged card included
+            item = index
+            if list_id == self.drag_data['list_id'] and index >= self.drag_data['idx']:
+                item += 1
+            y = offsets[min(item, len(offsets) - 1)] - target['scroll_top']
+            y = min(max(y, 0), target['cards_height'])
+            self.drop_indicator.place(
+                x=target['cards_left'] + 5 - root_x, y=target['cards_top'] + y - 1 - root_y,
+                width=max(target['cards_width'] - 10, 10), height=3
+            )
+        self.drop_indicator.lift()
+        self.dragged_item.lift()
+    
+    def hide_drop_indicator(self):
+        if self.drop_indicator is not None:
+            self.drop_indicator.place_forget()
+    
     def on_drag_motion(self, event):
+        """Record the pointer and schedule a frame, unless one is already pending."""
         if self.dragged_item:
-            # Get current mouse screen position
-            mouse_screen_x = self.root.winfo_pointerx()
-            mouse_screen_y = self.root.winfo_pointery()
-            
-            # Get root's screen position
-            root_screen_x = self.root.winfo_rootx()
-            root_screen_y = self.root.winfo_rooty()
-            
-            # Calculate ghost position: (mouse - root) - offset
-            ghost_x = (mouse_screen_x - root_screen_x) - self.offset_x
-            ghost_y = (mouse_screen_y - root_screen_y) - self.offset_y
-            
-            self.dragged_item.place(x=ghost_x, y=ghost_y)
+            self.drag_events['received'] += 1
+            self.drag_pointer = (event.x_root, event.y_root)
+            if self.drag_frame is None:
+                self.drag_frame = self.root.after(self.DRAG_FRAME_MS, self.process_drag_frame)
+            else:
+                self.drag_events['coalesced'] += 1
+    
+    def process_drag_frame(self):
+        """Move the ghost and drop indicator to the latest pointer position."""
+        self.drag_frame = None
+        if not self.dragged_item:
+            return
+        self.drag_events['processed'] += 1
+        
+        mouse_screen_x, mouse_screen_y = self.drag_pointer
+        
+        # Calculate ghost position: (mouse - root) - offset
+        ghost_x = (mouse_screen_x - self.drop_geometry['root_x']) - self.offset_x
+        ghost_y = (mouse_screen_y - self.drop_geometry['root_y']) - self.offset_y
+        
+        self.dragged_item.place(x=ghost_x, y=ghost_y)
+        
+        self.show_drop_indicator(self.find_drop_target(mouse_screen_x, mouse_screen_y))
     
     def on_drop(self, event):
         if not self.dragged_item:
             return
         
+        if self.drag_frame is not None:
+            self.root.after_cancel(self.drag_frame)
+            self.drag_frame = None
         self.dragged_item.place_forget()
-        self.dragged_item.destroy()
+        
+        if self.debug_drag:
+            events = self.drag_events
+            print(f"drag: {events['received']} motion events, {events['processed']} frames, "
+                  f"{events['coalesced']} coalesced")
         
         dx = abs(event.x_root - self.drag_start_x_root)
         dy = abs(event.y_root - self.drag_start_y_root)
         
         if dx < 10 and dy < 10:
-            # Not dragged far enough, put back
-            board = self.boards[self.current_board]
-            if self.drag_data['type'] == 'card':
-                source_list = self.drag_data['list_name']
-                idx = self.drag_data['idx']
-                board['lists'][source_list]['cards'].insert(idx, self.drag_data['card'])
-            else:
-                source_list = self.drag_data['list_name']
-                board['lists'][source_list] = self.drag_data['list_data']
-            self.save_data()
+            # Not dragged far enough, put back (nothing changed, so nothing to save)
+            source_list = self.drag_data['list_id']
             
             # Only re-render affected list
             if self.drag_data['type'] == 'card':
@@ -402,70 +1893,29 @@ class TaskBoard:
         else:
             # Process drop
             drag_type = self.drag_data['type']
-            board = self.boards[self.current_board]
-            mouse_x = event.x_root
-            mouse_y = event.y_root
+            source_list = self.drag_data['list_id']
+            drop_target = self.find_drop_target(event.x_root, event.y_root)
             
             if drag_type == 'card':
-                source_list = self.drag_data['list_name']
                 card = self.drag_data['card']
                 
-                target_list = None
-                insertion_idx = 0
-                
-                for lf in self.lists_container.winfo_children():
-                    if lf.winfo_ismapped():
-                        lx = lf.winfo_rootx()
-                        ly = lf.winfo_rooty()
-                        lw = lf.winfo_width()
-                        lh = lf.winfo_height()
-                        if lx <= mouse_x <= lx + lw and ly <= mouse_y <= ly + lh:
-                            target_list = lf.list_name
-                            cards_start_y = ly + self.HEADER_HEIGHT
-                            rel_y = max(0, mouse_y - cards_start_y)
-                            insertion_idx = min(len(board['lists'][target_list]['cards']), int(rel_y / self.CARD_HEIGHT))
-                            break
-                
-                if target_list:
-                    board['lists'][target_list]['cards'].insert(insertion_idx, card)
-                    self.save_data()
-                    
-                    # Only re-render the two affected lists
-                    if source_list == target_list:
-                        self.render_list_cards(source_list)
-                    else:
-                        self.render_list_cards(source_list)
-                        self.render_list_cards(target_list)
+                if drop_target and drop_target != (source_list, self.drag_data['idx']):
+                    # Re-renders the two affected lists
+                    self.engine.move_card(card["id"], *drop_target)
                 else:
                     # Put back to source
-                    board['lists'][source_list]['cards'].insert(self.drag_data['idx'], card)
-                    self.save_data()
                     self.render_list_cards(source_list)
                 
             elif drag_type == 'list':
-                source_list = self.drag_data['list_name']
-                list_data = self.drag_data['list_data']
-                
-                container_x = self.lists_container.winfo_rootx()
-                rel_x = max(0, mouse_x - container_x)
-                target_idx = int(rel_x / self.LIST_WIDTH)
-                num_lists = len(board['lists'])
-                if target_idx > num_lists:
-                    target_idx = num_lists
-                
-                ordered_lists = list(board['lists'].keys())
-                ordered_lists.insert(target_idx, source_list)
-                
-                new_lists = {}
-                for ln in ordered_lists:
-                    if ln == source_list:
-                        new_lists[ln] = list_data
-                    else:
-                        new_lists[ln] = board['lists'][ln]
-                board['lists'] = new_lists
-                self.save_data()
-                self.render_board()
+                target_idx = drop_target[1]
+                if target_idx != self.engine.list_position(source_list):
+                    self.engine.move_list(source_list, target_idx)
+                else:
+                    self.render_board()
         
+        self.hide_drop_indicator()
+        self.drop_geometry = None
+        self.drop_target = None
         self.dragged_item = None
         self.drag_data = None
         self.offset_x = None
@@ -473,65 +1923,192 @@ class TaskBoard:
         self.drag_start_x_root = None
         self.drag_start_y_root = None
     
+    def update_search_results(self, event=None):
+        """Show the matches for the search box's text under it."""
+        query = self.search_entry.get()
+        if query == self.search_query:
+            # Arrow keys and the like
+            return
+        self.search_query = query
+        if not query.strip():
+            self.close_search_results()
+            return
+        # Boards the store loads lazily are loaded on the first search, so their cards can match
+        self.engine.load_all_boards()
+        
+        self.search_docs = self.engine.search(query, self.SEARCH_RESULTS)
+        for number, button in enumerate(self.search_buttons):
+            if number < len(self.search_docs):
+                button.configure(text=self.search_result_label(self.search_docs[number]))
+                button.pack(fill="x", padx=4, pady=1)
+            else:
+                button.pack_forget()
+        if not self.search_docs:
+            self.search_buttons[0].configure(text="No matches")
+            self.search_buttons[0].pack(fill="x", padx=4, pady=1)
+        
+        self.search_results.place(
+            x=self.search_entry.winfo_rootx() + self.search_entry.winfo_width() - self.root.winfo_rootx(),
+            y=self.search_entry.winfo_rooty() + self.search_entry.winfo_height() - self.root.winfo_rooty() + 4,
+            anchor="ne"
+        )
+        self.search_results.lift()
+    
+    def search_result_label(self, doc):
+        kind, doc_id = doc
+        if kind == 'board':
+            return f"▦ {self.boards[doc_id]['name']}"
+        if kind == 'list':
+            board_id, list_data = self.engine.find_list(doc_id)
+            return f"☰ {list_data['name']} · {self.boards[board_id]['name']}"
+        list_id, card = self.engine.find_card(doc_id)
+        board_id, list_data = self.engine.find_list(list_id)
+        return f"{card['title']} — {list_data['name']} · {self.boards[board_id]['name']}"
+    
+    def search_result_clicked(self, number):
+        # The first row also says when nothing matched
+        if number < len(self.search_docs):
+            self.open_search_result(self.search_docs[number])
+    
+    def close_search_results(self, event=None):
+        self.search_results.place_forget()
+        self.search_docs = []
+    
+    def open_search_result(self, doc):
+        """Show the board holding a search result, scrolled to it, with a card highlighted."""
+        self.close_search_results()
+        kind, doc_id = doc
+        if kind == 'board':
+            board_id = doc_id
+        elif kind == 'list':
+            board_id = self.engine.find_list(doc_id)[0]
+        else:
+            list_id = self.engine.find_card(doc_id)[0]
+            board_id = self.engine.find_list(list_id)[0]
+        if board_id != self.current_board:
+            self.engine.select_board(board_id)
+        if kind == 'board':
+            return
+        
+        list_id = doc_id if kind == 'list' else list_id
+        # Lay out the (possibly new) board first, so the scroll positions are real
+        self.root.update_idletasks()
+        self.scroll_to_list(list_id)
+        if kind == 'card':
+            view = self.list_scrollables[list_id]
+            if self.filtered_cards is None:
+                index = self.engine.card_position(list_id, doc_id)
+            else:
+                shown = [card.id for card in self.visible_cards(list_id)]
+                if doc_id not in shown:
+                    # Hidden by the filter
+                    return
+                index = shown.index(doc_id)
+            view.scroll_to_item(index)
+            view.highlight_item(index, "#f9e2af", self.SEARCH_HIGHLIGHT_MS)
+    
+    def scroll_to_list(self, list_id):
+        """Scroll the board sideways so a list is in view."""
+        canvas = self.main_scrollable.canvas
+        list_frame = self.list_frames[list_id]
+        content_width = max(self.lists_container.winfo_reqwidth(), 1)
+        left = list_frame.winfo_x()
+        view_left = canvas.canvasx(0)
+        if left < view_left or left + list_frame.winfo_width() > view_left + canvas.winfo_width():
+            canvas.xview_moveto(left / content_width)
+    
+    def undo(self, event=None):
+        """Undo the last edit; it re-renders just like the edit did."""
+        if event is not None and isinstance(self.root.focus_get(), tk.Entry):
+            # Leave the keys to the text being edited
+            return
+        self.engine.undo()
+    
+    def redo(self, event=None):
+        if event is not None and isinstance(self.root.focus_get(), tk.Entry):
+            return
+        self.engine.redo()
+    
+    def import_trello_dialog(self):
+        """Pick Trello exports and import each as a new board, without blocking the window."""
+        if self.import_thread is not None:
+            print("An import is already running.")
+            return
+        paths = filedialog.askopenfilenames(
+            title="Import Trello export",
+            filetypes=[("Trello JSON export", "*.json"), ("All files", "*")]
+        )
+        if not paths:
+            return
+        self.import_state = {
+            'done': 0,
+            'total': sum(os.path.getsize(path) for path in paths),
+            'boards': [],
+            'error': None
+        }
+        self.import_thread = threading.Thread(target=self.run_import, args=(paths,), daemon=True)
+        self.import_thread.start()
+        self.import_label.configure(text="Importing... 0%")
+        self.import_label.pack(side="right", padx=5, pady=10)
+        self.root.after(self.IMPORT_POLL_MS, self.poll_import)
+    
+    def run_import(self, paths):
+        """Parse the exports (runs off the Tk thread; the engine is only touched by poll_import)."""
+        state = self.import_state
+        finished = 0
+        try:
+            for path in paths:
+                board = read_trello_board(path, lambda done, total: state.update(done=finished + done))
+                finished += os.path.getsize(path)
+                state['boards'].append(board)
+        except Exception as e:
+            state['error'] = e
+    
+    def poll_import(self):
+        """Add boards the import thread has finished and update the progress label."""
+        state = self.import_state
+        # Checked first, so a board finished after the drain below is picked up next time
+        running = self.import_thread.is_alive()
+        while state['boards']:
+            self.engine.import_board(state['boards'].pop(0))
+        if running:
+            self.import_label.configure(text=f"Importing... {state['done'] * 100 // max(state['total'], 1)}%")
+            self.root.after(self.IMPORT_POLL_MS, self.poll_import)
+            return
+        self.import_thread = None
+        self.import_label.pack_forget()
+        if state['error'] is not None:
+            print(f"Trello import failed. Error: {state['error']}")
+    
     def board_selected(self, choice):
         """Updates the current_board when a selection is made in the dropdown."""
-        if choice in self.boards:
-            self.current_board = choice
-            self.board_name_label.configure(text=choice)
-            self.save_data()
-            self.render_board()
+        board_id = self.engine.board_id_by_name(choice)
+        if board_id:
+            self.engine.select_board(board_id)
+    
+    def renderer_selected(self, choice):
+        """Switch the current board between widget and canvas-drawn cards."""
+        if not self.current_board or self.current_board == "No boards":
+            return
+        renderer = "canvas" if choice == "Canvas" else "widgets"
+        if renderer != self.boards[self.current_board].get('renderer', "widgets"):
+            self.engine.set_renderer(self.current_board, renderer)
     
     def rename_board_dialog(self, event=None):
         if not self.current_board or self.current_board == "No boards":
             return
+        old_name = self.boards[self.current_board]["name"]
         dialog = ctk.CTkInputDialog(
             text="Enter new board name:",
             title="Rename Board",
-            entry_text=self.current_board
+            entry_text=old_name
         )
         new_name = dialog.get_input()
-        if new_name and new_name.strip() and new_name != self.current_board and new_name not in self.boards:
-            board_data = self.boards.pop(self.current_board)
-            self.boards[new_name] = board_data
-            self.current_board = new_name
-            self.board_name_label.configure(text=new_name)
-            self.board_var.set(new_name)
-            self.save_data()
-            self.board_dropdown.configure(values=list(self.boards.keys()))
-            self.render_board()
-    
-    # --- Data Management ---
-    
-    def load_data(self):
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                    self.boards = data.get('boards', {})
-                    self.current_board = data.get('current_board')
-            except:
-                self.boards = {}
-                self.current_board = None
-
-    def save_data(self):
-        data = {
-            'boards': self.boards,
-            'current_board': self.current_board
-        }
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, indent=2)
-    
-    # --- Board Methods ---
+        if new_name and new_name.strip() and new_name != old_name:
+            self.engine.rename_board(self.current_board, new_name)
     
     def create_board(self, name):
-        if name in self.boards:
-            return
-        
-        self.boards[name] = {"lists": {}}
-        self.current_board = name
-        self.save_data()
-        self.update_board_dropdown()
-        self.render_board()
+        self.engine.create_board(name)
     
     def create_board_dialog(self):
         dialog = ctk.CTkInputDialog(
@@ -544,16 +2121,17 @@ class TaskBoard:
             self.create_board(name)
     
     def update_board_dropdown(self):
-        board_names = list(self.boards.keys())
+        board_names = [board["name"] for board in self.boards.values()]
         
         if board_names:
             self.board_dropdown.configure(values=board_names)
             
-            if self.current_board is None or self.current_board not in board_names:
-                 self.current_board = board_names[0]
-                 
-            self.board_var.set(self.current_board)
-            self.board_name_label.configure(text=self.current_board)
+            if self.current_board is None or self.current_board not in self.boards:
+                 self.current_board = next(iter(self.boards))
+            
+            current_name = self.boards[self.current_board]["name"]
+            self.board_var.set(current_name)
+            self.board_name_label.configure(text=current_name)
         else:
             self.board_dropdown.configure(values=["No boards"])
             self.board_var.set("No boards")
@@ -565,36 +2143,21 @@ class TaskBoard:
             print("Cannot delete: No board is currently selected.")
             return
         
+        board_name = self.boards[self.current_board]["name"]
         dialog = ctk.CTkInputDialog(
-            text=f"Type '{self.current_board}' to confirm deletion of the board:",
+            text=f"Type '{board_name}' to confirm deletion of the board:",
             title="Delete Board"
         )
         confirmation = dialog.get_input()
         
-        if confirmation == self.current_board:
-            deleted_board = self.current_board
-            
-            del self.boards[deleted_board]
-            
-            remaining_boards = list(self.boards.keys())
-            self.current_board = remaining_boards[0] if remaining_boards else None
-            
-            self.save_data()
-            self.update_board_dropdown()
-            self.render_board()
+        if confirmation == board_name:
+            self.engine.delete_board(self.current_board)
     
     def create_list(self, name):
         if not self.current_board or self.current_board == "No boards":
             return
         
-        board = self.boards[self.current_board]
-        
-        if name in board["lists"]:
-            return
-        
-        board["lists"][name] = {"cards": []}
-        self.save_data()
-        self.render_board()
+        self.engine.create_list(name)
     
     def create_list_dialog(self):
         if not self.current_board or self.current_board == "No boards":
@@ -611,125 +2174,159 @@ class TaskBoard:
             self.create_list(name)
     
 
-    def start_edit_list_name(self, label, list_name, header):
-        current = label.cget("text")
-        label.destroy()
-        entry = ctk.CTkEntry(header, font=(self.font_family, 14, "bold"))
+    def start_edit_list_name(self, list_widget):
+        list_id = list_widget.list_id
+        current = list_widget.list_label.cget("text")
+        list_widget.list_label.pack_forget()
+        entry = ctk.CTkEntry(list_widget.header, font=(self.font_family, 14, "bold"))
         entry.insert(0, current)
         entry.pack(side="left", padx=10, pady=8)
         entry.focus()
+        list_widget.name_entry = entry
         def save(event=None):
+            if list_widget.name_entry is not entry:
+                # Already saved, or the widget was recycled for another list
+                return
             new_name = entry.get().strip()
-            entry.destroy()
-            board = self.boards[self.current_board]
-            renamed = False
-            if new_name and new_name != list_name and new_name not in board["lists"]:
-                list_data = board["lists"].pop(list_name)
-                board["lists"][new_name] = list_data
-                renamed = True
-                self.save_data()
-            self.render_board()
+            list_widget.close_name_entry()
+            if new_name and new_name != current and self.engine.find_list(list_id):
+                # Re-renders the board, or nothing if the name is taken
+                self.engine.rename_list(list_id, new_name)
         entry.bind("<Return>", save)
         entry.bind("<FocusOut>", save)
 
-    def render_list_cards(self, list_name):
+    def apply_filter(self, event=None):
+        """Filter the board view by the filter bar's fields, re-setting only each list's cards."""
+        sort, descending = self.FILTER_SORTS[self.filter_sort_var.get()]
+        try:
+            self.card_filter = CardFilter(
+                created_after=self.filter_after_entry.get().strip(),
+                created_before=self.filter_before_entry.get().strip(),
+                title_contains=self.filter_title_entry.get().strip(),
+                sort=sort,
+                descending=descending
+            )
+        except ValueError as e:
+            print(f"Filter not applied: {e}")
+            return
+        self.refresh_filter()
+        for list_id, list_frame in self.list_frames.items():
+            self.set_list_cards(list_frame, self.visible_cards(list_id))
+    
+    def clear_filter(self):
+        for entry in (self.filter_title_entry, self.filter_after_entry, self.filter_before_entry):
+            entry.delete(0, "end")
+        self.filter_sort_var.set("List order")
+        self.apply_filter()
+    
+    def refresh_filter(self):
+        """Run the filter over the whole current board; between filter changes render_changes updates the results."""
+        if self.card_filter.is_active() and self.current_board in self.boards:
+            self.filtered_cards = self.engine.query(self.card_filter)
+        else:
+            self.filtered_cards = None
+    
+    def visible_cards(self, list_id):
+        """The cards a list shows: all of them, or the filter's matches."""
+        if self.filtered_cards is not None:
+            return self.filtered_cards.get(list_id, [])
+        return self.boards[self.current_board]["lists"][list_id]["cards"]
+    
+    def render_list_cards(self, list_id):
         """Re-render only the cards in a specific list"""
-        if list_name not in self.list_scrollables:
+        if list_id not in self.list_frames:
             return
         
-        # Clear existing cards
-        scrollable = self.list_scrollables[list_name]
-        for widget in scrollable.inner_frame.winfo_children():
-            widget.destroy()
-        
-        # Re-render cards
         board = self.boards[self.current_board]
-        if list_name in board["lists"]:
-            list_data = board["lists"][list_name]
-            for idx, card in enumerate(list_data["cards"]):
-                self.render_card(scrollable.inner_frame, list_name, card, idx)
-
-    def render_list(self, list_name, list_data):
-        list_frame = ctk.CTkFrame(
-            self.lists_container,
-            width=280,
-            corner_radius=10,
-            fg_color="#2b2d3a"
+        if list_id in board["lists"]:
+            before = self.card_pool.snapshot()
+            self.set_list_cards(self.list_frames[list_id], self.visible_cards(list_id))
+            if self.debug_pool:
+                print(f"render_list_cards({board['lists'][list_id]['name']}): cards {self.card_pool.summary(before)}")
+    
+    def set_list_cards(self, list_widget, cards):
+        """Reconcile a list's virtualized cards; only changed cards in view are re-bound."""
+        if list_widget.renderer == "canvas":
+            list_widget.cards_canvas.set_cards(cards)
+            return
+        scrollable = list_widget.cards_scrollable
+        scrollable.set_items(
+            len(cards),
+            lambda i: cards[i].get('height') or self.CARD_HEIGHT,
+            lambda parent, i: self.render_card(parent, list_widget, cards[i]),
+            lambda widget: self.card_pool.release(scrollable.canvas, widget),
+            lambda i: self.card_key(cards[i])
         )
-        list_frame.pack(side="left", padx=10, pady=10, fill="both", anchor="n")
-        list_frame.list_name = list_name  # For drop detection
-        
-        # Store reference
-        self.list_frames[list_name] = list_frame
-        
-        # List header
-        header = ctk.CTkFrame(list_frame, fg_color="#3d3f4f", corner_radius=8, height=40)
-        header.pack(fill="x", padx=5, pady=5)
-        header.pack_propagate(False)
+    
+    def card_key(self, card):
+        """Render key for a card: its id plus everything a card widget shows."""
+        return (card.id, card.title, card.created_at, card.width, card.height, card.id in self.selected_cards)
 
-        list_label = ctk.CTkLabel(
-            header,
-            text=list_name,
-            font=(self.font_family, 14, "bold")
+    def render_list(self, list_data, renderer):
+        list_frame = self.list_pool.acquire(
+            self.lists_container,
+            lambda: ListWidget(self.lists_container, self),
+            lambda widget: widget.bind_list(list_data)
         )
-        list_label.pack(side="left", padx=10, pady=8)
-        list_label.bind("<Double-Button-1>", lambda event: self.start_edit_list_name(list_label, list_name, header))
-
-        # Bind drag for list on header
-        header.bind("<Button-1>", lambda e, ln=list_name: self.start_drag(e, list_frame, ln))
-
-        # Delete list button
-        ctk.CTkButton(
-            header,
-            text="×",
-            width=30,
-            height=30,
-            font=(self.font_family, 20),
-            fg_color="#f38ba8",
-            hover_color="#d16d87",
-            command=lambda: self.delete_list(list_name)
-        ).pack(side="right", padx=5)
-
-        # Add card button at bottom - PACK FIRST
-        ctk.CTkButton(
-            list_frame,
-            text="+ Add Card",
-            fg_color="#313244",
-            hover_color="#45475a",
-            command=lambda: self.create_card_dialog(list_name)
-        ).pack(side="bottom", fill="x", padx=5, pady=5)
-
-        # Cards container with dynamic vertical scrollbar
-        cards_scrollable = DynamicScrollableFrame(list_frame, orientation="vertical", bg_color="#2b2d3a")
-        cards_scrollable.pack(fill="both", expand=True, padx=5, pady=5)
-        
-        # Store reference
-        self.list_scrollables[list_name] = cards_scrollable
-
-        # Render each card
-        for idx, card in enumerate(list_data["cards"]):
-            self.render_card(cards_scrollable.inner_frame, list_name, card, idx)
+        list_frame.set_renderer(renderer)
+        self.set_list_cards(list_frame, self.visible_cards(list_data["id"]))
+        return list_frame
     
 
     def render_board(self):
-        # Clear existing lists
-        for widget in self.lists_container.winfo_children():
-            widget.destroy()
-        
-        # Clear references
+        """Reconcile the list widgets with the current board.
+        
+        Lists are matched by id: existing widgets only get a new header or
+        reconciled cards, a new order is just a re-pack, and only added or
+        removed lists take or return widgets from the pool."""
+        board = None
+        if self.current_board and self.current_board != "No boards":
+            # The current board may have changed without going through board_selected
+            board = self.engine.load_board(self.current_board)
+        renderer = board.get('renderer', "widgets") if board else "widgets"
+        self.refresh_filter()
+        self.renderer_var.set("Canvas" if renderer == "canvas" else "Widgets")
+        
+        lists_before = self.list_pool.snapshot()
+        cards_before = self.card_pool.snapshot()
+        
+        previous = self.list_frames
         self.list_frames = {}
-        self.list_scrollables = {}
-        
-        if not self.current_board or self.current_board == "No boards":
-            return
-        
-        board = self.boards[self.current_board]
-        
-        for list_name, list_data in board["lists"].items():
-            self.render_list(list_name, list_data)
+        for list_id, list_data in (board["lists"].items() if board else ()):
+            list_frame = previous.pop(list_id, None)
+            if list_frame is None:
+                list_frame = self.render_list(list_data, renderer)
+            else:
+                if list_frame.list_data is not list_data or list_frame.list_name != list_data["name"]:
+                    list_frame.bind_list(list_data)
+                list_frame.set_renderer(renderer)
+                self.set_list_cards(list_frame, self.visible_cards(list_id))
+            self.list_frames[list_id] = list_frame
+        
+        # Hand lists that are gone back to the pool
+        for list_frame in previous.values():
+            list_frame.pack_forget()
+            self.list_pool.release(self.lists_container, list_frame)
+        
+        # Re-pack only when the order on screen differs
+        ordered = list(self.list_frames.values())
+        packed = [w for w in self.lists_container.pack_slaves() if isinstance(w, ListWidget)]
+        if packed != ordered:
+            for list_frame in packed:
+                list_frame.pack_forget()
+            for list_frame in ordered:
+                list_frame.pack(side="left", padx=10, pady=10, fill="both", anchor="n")
+        
+        # Store references
+        self.list_scrollables = {list_id: w.cards_view for list_id, w in self.list_frames.items()}
+        
+        if self.debug_pool:
+            print(f"render_board: lists {self.list_pool.summary(lists_before)}, "
+                  f"cards {self.card_pool.summary(cards_before)}")
     
 
-    def delete_list(self, list_name):
+    def delete_list(self, list_id):
+        list_name = self.boards[self.current_board]["lists"][list_id]["name"]
         dialog = ctk.CTkInputDialog(
             text=f"Type '{list_name}' to confirm deletion:",
             title="Delete List"
@@ -737,23 +2334,12 @@ class TaskBoard:
         confirmation = dialog.get_input()
         
         if confirmation == list_name:
-            board = self.boards[self.current_board]
-            del board["lists"][list_name]
-            self.save_data()
-            self.render_board()
+            self.engine.delete_list(list_id)
     
-    def create_card(self, list_name, title):
-        board = self.boards[self.current_board]
-        card = {
-            "title": title,
-            "created": datetime.now().strftime("%Y-%m-%d %H:%M")
-        }
-        board["lists"][list_name]["cards"].append(card)
-        self.save_data()
-        # Only re-render this list's cards
-        self.render_list_cards(list_name)
+    def create_card(self, list_id, title):
+        self.engine.create_card(list_id, title)
     
-    def create_card_dialog(self, list_name):
+    def create_card_dialog(self, list_id):
         dialog = ctk.CTkInputDialog(
             text="Enter card title:",
             title="New Card"
@@ -761,162 +2347,204 @@ class TaskBoard:
         title = dialog.get_input()
         
         if title:
-            self.create_card(list_name, title)
+            self.create_card(list_id, title)
     
-    def delete_card_dialog(self, list_name, idx):
+    def card_index(self, list_id, card):
+        """Current position of a card in its list, from the id index."""
+        return self.engine.card_position(list_id, card["id"])
+
+    def delete_card_dialog(self, card):
         dialog = ctk.CTkInputDialog(
             text="Type 'confirm' to confirm deletion of the card:",
             title="Delete Card"
         )
         confirmation = dialog.get_input()
         
-        if confirmation == "confirm":
-            board = self.boards[self.current_board]
-            del board["lists"][list_name]["cards"][idx]
-            self.save_data()
-            # Only re-render this list's cards
-            self.render_list_cards(list_name)
-
-    def start_edit_card_title(self, title_label, list_name, idx, card_top):
-        current = title_label.cget("text")
-        title_label.destroy()
-        entry = ctk.CTkEntry(card_top, font=(self.font_family, 14), width=260)
+        if confirmation == "confirm" and self.engine.find_card(card["id"]):
+            self.engine.delete_card(card["id"])
+
+    def start_edit_card_title(self, card_widget):
+        card = card_widget.card
+        current = card_widget.title_label.cget("text")
+        card_widget.title_label.pack_forget()
+        entry = ctk.CTkEntry(card_widget.card_top, font=(self.font_family, 14), width=260)
         entry.insert(0, current)
-        entry.pack(side="left", fill="both", expand=True, padx=(5, 5), pady=2)
+        entry.pack(side="left", fill="both", expand=True, padx=(5, 5), pady=2, before=card_widget.delete_button)
         entry.focus()
+        card_widget.title_entry = entry
         def save(event=None):
+            if card_widget.title_entry is not entry:
+                # Already saved, or the widget was recycled for another card
+                return
             new_title = entry.get().strip()
-            entry.destroy()
-            if new_title:
-                self.boards[self.current_board]["lists"][list_name]["cards"][idx]["title"] = new_title
-                self.save_data()
-            # Only re-render this list's cards
-            self.render_list_cards(list_name)
+            card_widget.close_title_entry()
+            self.save_card_title(card, new_title)
         entry.bind("<Return>", save)
         entry.bind("<FocusOut>", save)
+    
+    def save_card_title(self, card, new_title):
+        """Finish a title edit from either renderer."""
+        found = self.engine.find_card(card["id"])
+        if not found:
+            return
+        if new_title:
+            self.engine.rename_card(card["id"], new_title)
+        else:
+            # Put the title back
+            self.render_list_cards(found[0])
 
-    def render_card(self, parent, list_name, card, idx):
-        # Get card dimensions if stored
-        card_width = card.get('width', 260)
-        card_height = card.get('height', None)  # None = auto height
-        
-        card_frame = ctk.CTkFrame(
-            parent,
-            corner_radius=8,
-            fg_color="#313244",
-            width=card_width
-        )
-        
-        if card_height:
-            card_frame.configure(height=card_height)
-            card_frame.pack_propagate(False)
+    # --- Multi-select ---
+    
+    def toggle_card_selected(self, card):
+        """Ctrl+click: add a card to the selection, or take it out."""
+        found = self.engine.find_card(card.id)
+        if not found:
+            return
+        if card.id in self.selected_cards:
+            del self.selected_cards[card.id]
         else:
-            card_frame.pack_propagate(True)
-        
-        card_frame.pack(fill="x", padx=5, pady=3)
-        
-        # Card top frame for title and delete button
-        card_top = ctk.CTkFrame(card_frame, fg_color="transparent")
-        card_top.pack(fill="x", padx=10, pady=(10, 0), side="top")  # Added side="top"
-        
-        # Card title with dynamic wrapping
-        title_label = ctk.CTkLabel(
-            card_top,
-            text=card["title"],
-            font=(self.font_family, 14),
-            wraplength=card_width - 60,
-            anchor="w",
-            justify="left"
-        )
-        title_label.pack(side="left", fill="both", expand=True, padx=(5, 5), pady=2)
-        title_label.bind("<Double-Button-1>", lambda e: self.start_edit_card_title(title_label, list_name, idx, card_top))
-        
-        # Delete card button
-        ctk.CTkButton(
-            card_top,
-            text="×",
-            width=25,
-            height=25,
-            font=(self.font_family, 16),
-            fg_color="#f38ba8",
-            hover_color="#d16d87",
-            command=lambda: self.delete_card_dialog(list_name, idx)
-        ).pack(side="right", padx=5, pady=2)
-        
-        # Bottom frame for date and handles - PACK AT BOTTOM
-        card_bottom = ctk.CTkFrame(card_frame, fg_color="transparent")
-        card_bottom.pack(fill="x", padx=10, pady=(5, 5), side="bottom")  # Added side="bottom"
-        
-        # Card date
-        ctk.CTkLabel(
-            card_bottom,
-            text=card["created"],
-            font=(self.font_family, 12),
-            text_color="#6c7086",
-            anchor="w"
-        ).pack(side="left")
-        
-        # Resize handle (bottom-right corner)
-        resize_handle = ctk.CTkLabel(
-            card_bottom,
-            text="⋱",
-            font=(self.font_family, 16, "bold"),
-            text_color="#89b4fa",
-            cursor="size_nw_se"
+            self.selected_cards[card.id] = None
+        self.selection_anchor = card.id
+        self.selection_changed({found[0]})
+    
+    def select_card_range(self, card):
+        """Shift+click: select the cards a list shows from the last clicked card to this one."""
+        found = self.engine.find_card(card.id)
+        if not found:
+            return
+        card_ids = [visible.id for visible in self.visible_cards(found[0])]
+        if self.selection_anchor not in card_ids:
+            self.toggle_card_selected(card)
+            return
+        first, last = sorted((card_ids.index(self.selection_anchor), card_ids.index(card.id)))
+        self.selected_cards.update(dict.fromkeys(card_ids[first:last + 1]))
+        self.selection_changed({found[0]})
+    
+    def clear_selection(self, event=None):
+        list_ids = {found[0] for found in map(self.engine.find_card, self.selected_cards) if found}
+        self.selected_cards = {}
+        self.selection_anchor = None
+        self.selection_changed(list_ids)
+    
+    def take_selection(self):
+        """Empty the selection and return its card ids; the bulk change that follows re-renders their lists."""
+        card_ids = [card_id for card_id in self.selected_cards if self.engine.find_card(card_id)]
+        self.selected_cards = {}
+        self.selection_anchor = None
+        self.update_selection_bar()
+        return card_ids
+    
+    def selection_changed(self, list_ids):
+        """Redraw the lists whose selection changed and show or hide the bulk actions bar."""
+        for list_id in list_ids:
+            self.render_list_cards(list_id)
+        self.update_selection_bar()
+    
+    def update_selection_bar(self):
+        if not self.selected_cards:
+            self.selection_frame.pack_forget()
+            return
+        count = len(self.selected_cards)
+        self.selection_label.configure(text=f"{count} card{'s' if count != 1 else ''} selected")
+        lists = self.boards[self.current_board]["lists"]
+        self.selection_targets = list(lists)
+        names = [f"{number}. {lists[list_id]['name']}" for number, list_id in enumerate(self.selection_targets, 1)]
+        self.selection_target.configure(values=names)
+        if self.selection_target_var.get() not in names:
+            self.selection_target_var.set(names[0] if names else "")
+        if not self.selection_frame.winfo_manager():
+            self.selection_frame.pack(fill="x", side="top", padx=10, after=self.filter_frame)
+    
+    def move_selected_cards(self):
+        """Move the selected cards, in board order, to the end of the chosen list."""
+        choice = self.selection_target_var.get()
+        if not choice:
+            return
+        target = self.selection_targets[int(choice.split(".", 1)[0]) - 1]
+        self.engine.move_cards(self.take_selection(), target)
+    
+    def resize_selected_cards(self, event=None):
+        """Give the selected cards the size typed in; a blank field puts that side back to its default."""
+        try:
+            width = int(self.selection_width_entry.get()) if self.selection_width_entry.get().strip() else None
+            height = int(self.selection_height_entry.get()) if self.selection_height_entry.get().strip() else None
+        except ValueError:
+            print("Resize not applied: width and height must be whole numbers")
+            return
+        if width is not None:
+            width = max(150, width)
+        if height is not None:
+            height = max(70, height)
+        self.engine.resize_cards(self.take_selection(), width, height)
+    
+    def delete_selected_cards(self):
+        count = len(self.selected_cards)
+        dialog = ctk.CTkInputDialog(
+            text=f"Type 'confirm' to confirm deletion of {count} card{'s' if count != 1 else ''}:",
+            title="Delete Cards"
         )
-        resize_handle.pack(side="right", padx=2)
-        resize_handle.bind("<Button-1>", lambda e: self.start_resize_card(e, card_frame, list_name, idx, card))
-        
-        # Drag handle
-        drag_handle = ctk.CTkLabel(
-            card_bottom,
-            text="///",
-            font=(self.font_family, 12, "bold"),
-            text_color="#6c7086",
-            cursor="hand2"
+        if dialog.get_input() == "confirm":
+            self.engine.delete_cards(self.take_selection())
+    
+    def archive_selected_cards(self):
+        """Move the selected cards to the archive; no confirmation, as they can be restored (or undone)."""
+        self.engine.archive_cards(self.take_selection())
+    
+    # --- Archive ---
+    
+    def archive_list(self, list_id):
+        self.engine.archive_list(list_id)
+    
+    def open_archive_browser(self):
+        if self.archive_browser is not None and self.archive_browser.winfo_exists():
+            self.archive_browser.focus()
+            return
+        self.archive_browser = ArchiveBrowser(self)
+    
+    def run_auto_archive(self, repeat=False):
+        """Apply the auto-archive rules to the loaded boards."""
+        count = self.engine.auto_archive(self.auto_archive_rules)
+        if count:
+            print(f"Auto-archived {count} card{'s' if count != 1 else ''}")
+        if repeat:
+            self.root.after(self.AUTO_ARCHIVE_MS, lambda: self.run_auto_archive(repeat=True))
+    
+    def render_card(self, parent, list_widget, card):
+        """Get a card widget for card from the pool (or build one) under parent."""
+        return self.card_pool.acquire(
+            parent,
+            lambda: CardWidget(parent, self, list_widget),
+            lambda widget: widget.bind_card(card)
         )
-        drag_handle.pack(side="right", padx=5)
-        drag_handle.bind("<Button-1>", lambda e, ln=list_name, i=idx: self.start_drag(e, card_frame, ln, i))
 
-    def start_resize_card(self, event, card_frame, list_name, idx, card):
-        """Start resizing a card"""
+    def start_resize_card(self, event, card, height, preview):
+        """Start resizing a card; preview(width, height) shows the card at a new size"""
         self.resize_data = {
-            'card_frame': card_frame,
-            'list_name': list_name,
-            'idx': idx,
+            'preview': preview,
             'card': card,
             'start_x': event.x_root,
             'start_y': event.y_root,
             'start_width': card.get('width', 260),
-            'start_height': card.get('height', card_frame.winfo_height())
+            'start_height': card.get('height', height)
         }
         self.root.bind("<B1-Motion>", self.on_resize_card_motion)
         self.root.bind("<ButtonRelease-1>", self.on_resize_card_end)
 
     def on_resize_card_motion(self, event):
         """Handle card resize motion - both directions based on mouse movement"""
-        if hasattr(self, 'resize_data'):
+        if self.resize_data is not None:
             # Calculate deltas
             delta_x = event.x_root - self.resize_data['start_x']
             delta_y = event.y_root - self.resize_data['start_y']
             
-            # Apply horizontal resize if mouse moved horizontally
             new_width = max(150, self.resize_data['start_width'] + delta_x)
-            self.resize_data['card_frame'].configure(width=new_width)
-            
-            # Apply vertical resize if mouse moved vertically
             new_height = max(70, self.resize_data['start_height'] + delta_y)
-            self.resize_data['card_frame'].configure(height=new_height)
-            self.resize_data['card_frame'].pack_propagate(False)
-            
-            # Force update to reflow content
-            self.resize_data['card_frame'].update_idletasks()
+            self.resize_data['preview'](new_width, new_height)
 
     def on_resize_card_end(self, event):
         """End card resize"""
-        if hasattr(self, 'resize_data'):
-            list_name = self.resize_data['list_name']
-            idx = self.resize_data['idx']
+        if self.resize_data is not None:
+            card = self.resize_data['card']
             
             # Calculate final dimensions
             delta_x = event.x_root - self.resize_data['start_x']
@@ -926,11 +2554,8 @@ class TaskBoard:
             new_height = max(70, self.resize_data['start_height'] + delta_y)
             
             # Save dimensions
-            self.boards[self.current_board]['lists'][list_name]['cards'][idx]['width'] = new_width
-            self.boards[self.current_board]['lists'][list_name]['cards'][idx]['height'] = new_height
-            
-            self.save_data()
-            self.render_list_cards(list_name)
+            if self.engine.find_card(card["id"]):
+                self.engine.resize_card(card["id"], new_width, new_height)
             
             # Unbind resize events
             self.root.unbind("<B1-Motion>")
@@ -940,11 +2565,13 @@ class TaskBoard:
             self.root.bind("<B1-Motion>", self.on_drag_motion)
             self.root.bind("<ButtonRelease-1>", self.on_drop)
             
-            del self.resize_data
+            self.resize_data = None
 
 # Run the application
 
 if __name__ == "__main__":
+    if "--profile" in sys.argv[1:]:
+        os.environ["TASKFLOW_PROFILE"] = "1"
     root = ctk.CTk()
     app = TaskBoard(root)
     root.mainloop()
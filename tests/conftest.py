@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+# The modules sit at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board_store import BoardStore
+from storage import open_store
+
+
+@pytest.fixture(params=["boards.json", "boards.db", "boards.tfb"])
+def data_file(request, tmp_path):
+    """A fresh data file for each storage backend."""
+    return str(tmp_path / request.param)
+
+
+@pytest.fixture
+def open_engine():
+    """Opens a BoardStore on a data file (loaded), closing them all at the end."""
+    engines = []
+
+    def open_engine(data_file, **kwargs):
+        engine = BoardStore(open_store(data_file), **kwargs)
+        engine.load()
+        engines.append(engine)
+        return engine
+    yield open_engine
+    for engine in engines:
+        engine.close()
+
+
+def contents(engine):
+    """Every board's lists and cards, as plain data to compare."""
+    engine.load_all_boards()
+    return [(board["name"], [(list_data["id"], list_data["name"], [card.to_dict() for card in list_data["cards"]])
+                             for list_data in board["lists"].values()])
+            for board in engine.boards.values()]
@@ -0,0 +1,109 @@
+import http.client
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api import COMMAND_FAILED, INVALID_PARAMS, INVALID_REQUEST, METHOD_NOT_FOUND, ApiServer, call
+
+
+@pytest.fixture
+def engine(tmp_path, open_engine):
+    return open_engine(str(tmp_path / "boards.json"))
+
+
+def request(engine, method, **params):
+    return call(engine, {"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+
+
+def result(engine, method, **params):
+    response = request(engine, method, **params)
+    assert "error" not in response, response
+    return response["result"]
+
+
+def test_board_and_card_methods(engine):
+    board = result(engine, "board.create", name="Work")["id"]
+    todo = result(engine, "list.create", name="To do")["id"]
+    done = result(engine, "list.create", name="Done", board=board)["id"]
+    cards = result(engine, "cards.create", list=todo, titles=["a", "b", "c"])
+    card = result(engine, "card.create", list=todo, title="first", index=-3)
+    assert result(engine, "cards.move", cards=[cards[0]["id"], cards[2]["id"]], list=done, index=50)
+    assert result(engine, "card.update", card=card["id"], title="renamed", width=300)
+    assert result(engine, "card.get", card=card["id"])["width"] == 300
+    lists = result(engine, "board.get", board=board)["lists"]
+    assert [[card["title"] for card in list_data["cards"]] for list_data in lists] == [["renamed", "b"], ["a", "c"]]
+    assert [hit["kind"] for hit in result(engine, "search", query="renamed")] == ["card"]
+
+
+def test_errors(engine):
+    assert call(engine, {"method": "boards.list"})["error"]["code"] == INVALID_REQUEST
+    assert request(engine, "cards.shuffle")["error"]["code"] == METHOD_NOT_FOUND
+    assert request(engine, "board.create", title="Work")["error"]["code"] == INVALID_PARAMS
+    assert request(engine, "board.create", name=7)["error"]["code"] == INVALID_PARAMS
+    assert request(engine, "card.get", card="missing")["error"]["code"] == COMMAND_FAILED
+    result(engine, "board.create", name="Work")
+    assert request(engine, "board.create", name="Work")["error"]["code"] == COMMAND_FAILED
+
+
+def test_created_times_are_checked(engine):
+    result(engine, "board.create", name="Work")
+    todo = result(engine, "list.create", name="To do")["id"]
+    assert request(engine, "card.create", list=todo, title="a", created="not a date")["error"]["code"] == INVALID_PARAMS
+    assert request(engine, "cards.create", list=todo, titles=["a"], created=20240501)["error"]["code"] == INVALID_PARAMS
+    assert not engine.find_list(todo)[1]["cards"]
+    assert result(engine, "card.create", list=todo, title="a", created="2024-05-08")["created"] == "2024-05-08 00:00"
+    cards = result(engine, "cards.create", list=todo, titles=["b", "c"], created="2024-05-08 09:30")
+    assert [card["created"] for card in cards] == ["2024-05-08 09:30"] * 2
+
+
+def test_notifications_get_no_response(engine):
+    assert call(engine, {"jsonrpc": "2.0", "method": "board.create", "params": {"name": "Quiet"}}) is None
+    assert [board["name"] for board in result(engine, "boards.list")] == ["Quiet"]
+
+
+@pytest.fixture
+def server(engine):
+    server = ApiServer(engine, 0, token="secret")
+    server.start()
+    yield server
+    server.stop()
+
+
+def post(server, body, **headers):
+    headers = dict({"Content-Type": "application/json", "Authorization": "Bearer secret"}, **headers)
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    connection.request("POST", "/rpc", json.dumps(body), headers)
+    response = connection.getresponse()
+    status, payload = response.status, response.read()
+    connection.close()
+    return status, json.loads(payload) if payload else None
+
+
+def post_and_run(server, body):
+    """Post from another thread while this one runs the queued calls, as the Tk thread would."""
+    with ThreadPoolExecutor(1) as pool:
+        response = pool.submit(post, server, body)
+        while not response.done():
+            server.run_pending(timeout=0.05)
+        return response.result()
+
+
+def test_http_batches_run_on_the_owning_thread(server, engine):
+    status, responses = post_and_run(server, [
+        {"jsonrpc": "2.0", "id": 1, "method": "board.create", "params": {"name": "Work"}},
+        {"jsonrpc": "2.0", "method": "list.create", "params": {"name": "Quiet"}},
+        {"jsonrpc": "2.0", "id": 2, "method": "boards.list"},
+    ])
+    assert status == 200
+    assert [response["id"] for response in responses] == [1, 2]
+    assert [board["name"] for board in responses[1]["result"]] == ["Work"]
+    assert engine.find_list(next(iter(engine.boards[engine.current_board]["lists"])))[1]["name"] == "Quiet"
+    assert post_and_run(server, {"jsonrpc": "2.0", "method": "boards.list"}) == (204, None)
+
+
+def test_http_requests_must_be_local_json_with_the_token(server):
+    request = {"jsonrpc": "2.0", "id": 1, "method": "boards.list"}
+    assert post(server, request, Host="evil.example")[0] == 403
+    assert post(server, request, **{"Content-Type": "text/plain"})[0] == 415
+    assert post(server, request, Authorization="Bearer wrong")[0] == 401
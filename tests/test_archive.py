@@ -0,0 +1,84 @@
+from archive import Archive, archive_file, parse_archive_rules
+from model import parse_created
+
+
+def titles(engine, list_id):
+    return [card.title for card in engine.find_list(list_id)[1]["cards"]]
+
+
+def archived_titles(data_file):
+    archive = Archive(archive_file(data_file))
+    archived = sorted(card.title for board in archive.boards.values()
+                    for list_data in board["lists"].values() for card in list_data["cards"])
+    archive.close()
+    return archived
+
+
+def open_board(open_engine, data_file):
+    engine = open_engine(data_file, archive=Archive(archive_file(data_file)))
+    engine.create_board("Work")
+    todo = engine.create_list("To do")
+    done = engine.create_list("Done")
+    cards = {title: engine.create_card(done, title, created=f"2024-05-{day:02d} 09:00").id
+             for title, day in (("old", 1), ("older", 2), ("new", 20))}
+    engine.create_card(todo, "ancient", created="2020-01-01 09:00")
+    return engine, todo, done, cards
+
+
+def test_archive_file_sits_next_to_the_data_file():
+    assert archive_file("/data/boards.db") == "/data/boards.archive.db"
+    assert archive_file("boards") == "boards.archive.json"
+
+
+def test_archive_rules(capsys):
+    assert parse_archive_rules("Done=14, Shipped = 30,,nonsense,=3") == {"Done": 14, "Shipped": 30}
+    assert "'nonsense'" in capsys.readouterr().out
+
+
+def test_archived_cards_move_to_the_archive_file(data_file, open_engine):
+    engine, todo, done, cards = open_board(open_engine, data_file)
+    assert not engine.archive.is_open()
+    engine.archive_cards([cards["old"], cards["new"]])
+    assert titles(engine, done) == ["older"]
+    assert archived_titles(data_file) == ["new", "old"]
+
+    engine.restore_cards([cards["old"]])
+    assert titles(engine, done) == ["older", "old"]
+    assert archived_titles(data_file) == ["new"]
+    engine.flush()
+    reopened = open_engine(data_file)
+    assert titles(reopened, done) == ["older", "old"]
+
+
+def test_undo_moves_items_back_out_of_the_archive(data_file, open_engine):
+    engine, todo, done, cards = open_board(open_engine, data_file)
+    engine.archive_cards([cards["older"]])
+    engine.archive_list(done)
+    assert engine.find_list(done) is None
+    assert archived_titles(data_file) == ["new", "old", "older"]
+
+    assert engine.undo()
+    assert titles(engine, done) == ["old", "new"]
+    assert archived_titles(data_file) == ["older"]
+    assert engine.undo()
+    assert titles(engine, done) == ["old", "older", "new"]
+    assert archived_titles(data_file) == []
+    assert engine.redo()
+    assert archived_titles(data_file) == ["older"]
+
+
+def test_restoring_brings_back_a_deleted_list(data_file, open_engine):
+    engine, todo, done, cards = open_board(open_engine, data_file)
+    engine.archive_cards([cards["old"]])
+    engine.delete_list(done)
+    engine.restore_cards([cards["old"]])
+    assert engine.find_list(done)[1]["name"] == "Done"
+    assert titles(engine, done) == ["old"]
+
+
+def test_auto_archive_takes_old_cards_of_named_lists(data_file, open_engine):
+    engine, todo, done, cards = open_board(open_engine, data_file)
+    assert engine.auto_archive({"Done": 14}, now=parse_created("2024-05-21 09:00")) == 2
+    assert titles(engine, done) == ["new"]
+    assert titles(engine, todo) == ["ancient"]
+    assert archived_titles(data_file) == ["old", "older"]
@@ -0,0 +1,38 @@
+import json
+import types
+
+import pytest
+
+import benchmark
+from conftest import contents
+
+
+def test_generated_boards_load_in_every_backend(data_file, open_engine):
+    data = benchmark.generate_data(*benchmark.parse_shape("3x4"))
+    benchmark.write_data(data, data_file)
+    engine = open_engine(data_file)
+    sizes = [[len(cards) for list_id, name, cards in lists] for board, lists in contents(engine)]
+    assert sizes == [[4, 4, 4], [1]]
+
+
+def report(wall_ms, peak_rss_kb=1000):
+    return {'shapes': {"10x100": {"load_data": {'wall_ms': wall_ms, 'peak_rss_kb': peak_rss_kb}}}}
+
+
+@pytest.mark.parametrize("current, regressed", [
+    (report(10.5), False),  # within tolerance
+    (report(10.8, 1050), False),
+    (report(12.0), True),
+    (report(10.0, 1200), True),
+])
+def test_compare_flags_regressions(tmp_path, capsys, current, regressed):
+    paths = []
+    for name, report_data in (("baseline.json", report(10.0)), ("current.json", current)):
+        paths.append(str(tmp_path / name))
+        with open(paths[-1], "w") as f:
+            json.dump(report_data, f)
+    args = types.SimpleNamespace(baseline=paths[0], current=paths[1], tolerance=0.10, min_ms=1.0)
+    with pytest.raises(SystemExit) as exit_info:
+        benchmark.compare(args)
+    assert exit_info.value.code == (1 if regressed else 0)
+    assert ("REGRESSION" in capsys.readouterr().out) == regressed
@@ -0,0 +1,183 @@
+import pytest
+
+from conftest import contents
+
+
+def titles(engine, list_id):
+    return [card.title for card in engine.find_list(list_id)[1]["cards"]]
+
+
+def build_board(engine):
+    """A board touched by every kind of board, list and card command; returns its list ids."""
+    engine.create_board("Scratch")
+    board_id = engine.create_board("Work")
+    todo = engine.create_list("To do", board_id)
+    doing = engine.create_list("Doing", board_id)
+    done = engine.create_list("Done", board_id)
+    engine.rename_board(board_id, "Work 2")
+    engine.rename_list(done, "Finished")
+    engine.move_list(done, 0)
+    engine.set_renderer(board_id, "canvas")
+    cards = [engine.create_card(todo, f"Task {i}", created="2024-05-01 09:30") for i in range(10)]
+    first = engine.create_card(doing, "First", index=0, created="2024-05-02 10:00")
+    engine.rename_card(cards[0].id, "Task zero")
+    engine.resize_card(cards[1].id, 300, 120)
+    engine.move_card(cards[2].id, doing, 0)
+    engine.move_card(cards[3].id, done, 0)
+    engine.update_card(cards[4].id, title="Four", width=200)
+    engine.delete_card(cards[5].id)
+    engine.delete_card(first.id)
+    engine.move_cards([cards[8].id, cards[6].id], done)
+    engine.update_cards([cards[7].id, cards[9].id], title="Same")
+    engine.resize_cards([cards[7].id, cards[9].id], 280, 90)
+    engine.delete_cards([cards[9].id, cards[2].id])
+    engine.delete_board(engine.board_id_by_name("Scratch"))
+    return todo, doing, done
+
+
+def test_commands_survive_reload(data_file, open_engine):
+    engine = open_engine(data_file)
+    todo, doing, done = build_board(engine)
+    assert titles(engine, todo) == ["Task zero", "Task 1", "Four", "Same"]
+    assert titles(engine, doing) == []
+    assert titles(engine, done) == ["Task 3", "Task 6", "Task 8"]
+    assert [board["name"] for board in engine.boards.values()] == ["Work 2"]
+    engine.flush()
+
+    assert contents(open_engine(data_file)) == contents(engine)
+
+
+def test_name_clashes_are_refused(data_file, open_engine):
+    engine = open_engine(data_file)
+    work = engine.create_board("Work")
+    home = engine.create_board("Home")
+    assert engine.create_board("Work") is None
+    assert not engine.rename_board(home, "Work")
+    engine.create_list("To do", work)
+    done = engine.create_list("Done", work)
+    assert engine.create_list("To do", work) is None
+    assert not engine.rename_list(done, "To do")
+    assert engine.create_list("To do", home)
+
+
+def test_subscribers_see_each_change(data_file, open_engine):
+    engine = open_engine(data_file)
+    changes = []
+    engine.subscribe(changes.append)
+    engine.create_board("Work")
+    card = engine.create_card(engine.create_list("To do"), "Card")
+    engine.unsubscribe(changes.append)
+    engine.delete_card(card.id)
+    assert [change['op'] for change in changes] == ['create_board', 'create_list', 'add_card']
+    assert changes[-1]['card'] is card
+
+
+def test_bulk_commands_are_one_change_each(data_file, open_engine):
+    engine = open_engine(data_file)
+    engine.create_board("Work")
+    todo = engine.create_list("To do")
+    done = engine.create_list("Done")
+    cards = [engine.create_card(todo, title).id for title in "abcde"]
+    changes = []
+    engine.subscribe(changes.append)
+    engine.move_cards([cards[3], cards[0], cards[3]], done, 0)
+    engine.update_cards(cards, title="same")
+    engine.delete_cards(cards[:2])
+    engine.delete_cards([])
+    assert [change['op'] for change in changes] == ['move_cards', 'update_cards', 'delete_cards']
+    assert [card.id for card in engine.find_list(todo)[1]["cards"]] == cards[2:3] + cards[4:]
+    assert [card.id for card in engine.find_list(done)[1]["cards"]] == [cards[3]]
+
+
+def test_bulk_commands_stay_on_one_board(data_file, open_engine):
+    engine = open_engine(data_file)
+    engine.create_board("One")
+    card = engine.create_card(engine.create_list("List"), "Card")
+    engine.create_board("Two")
+    other = engine.create_card(engine.create_list("Elsewhere"), "Other")
+    with pytest.raises(ValueError):
+        engine.move_cards([card.id], engine.find_card(other.id)[0])
+    with pytest.raises(ValueError):
+        engine.delete_cards([card.id, other.id])
+
+
+def test_single_moves_stay_on_one_board(data_file, open_engine):
+    engine = open_engine(data_file)
+    engine.create_board("One")
+    card = engine.create_card(engine.create_list("List"), "Card")
+    engine.create_board("Two")
+    with pytest.raises(ValueError):
+        engine.move_card(card.id, engine.create_list("Elsewhere"), 0)
+
+
+def test_out_of_range_indexes_are_clamped(data_file, open_engine):
+    engine = open_engine(data_file)
+    engine.create_board("Board")
+    todo = engine.create_list("To do")
+    done = engine.create_list("Done")
+    engine.create_cards(todo, ["a", "b", "c"])
+    engine.create_card(todo, "start", index=-5)
+    engine.create_card(todo, "end", index=99)
+    engine.create_cards(done, ["x", "y"], index=42)
+    engine.move_card(engine.create_card(done, "z").id, todo, 1000)
+    engine.move_cards([card.id for card in engine.find_list(done)[1]["cards"]], todo, -3)
+    engine.move_list(todo, 99)
+    assert titles(engine, todo) == ["x", "y", "start", "a", "b", "c", "end", "z"]
+    assert list(engine.boards[engine.current_board]["lists"]) == [done, todo]
+    engine.flush()
+
+    assert contents(open_engine(data_file)) == contents(engine)
+
+
+def test_undo_and_redo_round_trip(data_file, open_engine):
+    engine = open_engine(data_file)
+    states = [contents(engine)]
+    engine.create_board("Work")
+    states.append(contents(engine))
+    todo = engine.create_list("To do")
+    states.append(contents(engine))
+    done = engine.create_list("Done")
+    states.append(contents(engine))
+    cards = []
+    for title in "abcd":
+        cards.append(engine.create_card(todo, title).id)
+        states.append(contents(engine))
+    for command in (
+        lambda: engine.move_card(cards[0], done, 0),
+        lambda: engine.resize_card(cards[1], 300, 120),
+        lambda: engine.update_card(cards[2], title="e"),
+        lambda: engine.move_cards([cards[3], cards[1]], done, 1),
+        lambda: engine.update_cards([cards[1], cards[2]], width=250),
+        lambda: engine.delete_cards([cards[2], cards[3]]),
+        lambda: engine.delete_card(cards[0]),
+        lambda: engine.move_list(done, 0),
+        lambda: engine.rename_list(todo, "Later"),
+        lambda: engine.delete_list(todo),
+        lambda: engine.delete_board(engine.current_board),
+    ):
+        command()
+        states.append(contents(engine))
+
+    for state in reversed(states[-6:-1]):
+        assert engine.undo()
+        assert contents(engine) == state
+    engine.flush()
+    assert contents(open_engine(data_file)) == states[-6]
+
+    for state in reversed(states[:-6]):
+        assert engine.undo()
+        assert contents(engine) == state
+    assert not engine.undo()
+    for state in states[1:]:
+        assert engine.redo()
+        assert contents(engine) == state
+    assert not engine.redo()
+    engine.flush()
+    assert contents(open_engine(data_file)) == states[-1]
+
+    # Redoing made new lists and boards, and undoing again brings those back
+    for state in reversed(states[:-1]):
+        assert engine.undo()
+        assert contents(engine) == state
+    engine.flush()
+    assert contents(open_engine(data_file)) == states[0]
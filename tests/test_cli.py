@@ -0,0 +1,93 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cli
+
+TASKFLOW = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "taskflow.py")
+
+
+@pytest.fixture
+def board_file(data_file, open_engine):
+    """A data file with one board, "Work", whose lists are "To do" and "Done"."""
+    engine = open_engine(data_file)
+    engine.create_board("Work")
+    engine.create_card(engine.create_list("To do"), "Existing")
+    engine.create_list("Done")
+    engine.flush()
+    return data_file
+
+
+def run(data_file, *args):
+    return cli.main(["--data", data_file, *args])
+
+
+def board_json(data_file, capsys):
+    capsys.readouterr()
+    assert run(data_file, "list", "--board", "Work", "--json") == 0
+    return {list_data["name"]: [card["title"] for card in list_data["cards"]]
+            for list_data in json.loads(capsys.readouterr().out)}
+
+
+def test_card_add_prints_ids(board_file, capsys):
+    assert run(board_file, "card", "add", "--list", "To do", "One", "Two") == 0
+    ids = capsys.readouterr().out.split()
+    assert len(ids) == 2
+    assert board_json(board_file, capsys) == {"To do": ["Existing", "One", "Two"], "Done": []}
+
+
+def test_card_add_reads_titles_from_stdin(board_file, capsys, monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("From\n\nstdin\n"))
+    assert run(board_file, "card", "add", "--board", "Work", "--list", "Done", "-") == 0
+    assert board_json(board_file, capsys)["Done"] == ["From", "stdin"]
+
+
+def test_card_move_by_title(board_file, capsys):
+    assert run(board_file, "card", "move", "Existing", "--to", "Done", "--index", "7") == 0
+    assert board_json(board_file, capsys) == {"To do": [], "Done": ["Existing"]}
+
+
+def test_unknown_names_fail(board_file, capsys):
+    assert run(board_file, "card", "add", "--list", "Nowhere", "Card") == 1
+    assert "No list named 'Nowhere'" in capsys.readouterr().err
+    assert run(board_file, "card", "move", "Missing", "--to", "Done") == 1
+    assert "No card 'Missing'" in capsys.readouterr().err
+
+
+def test_card_add_checks_the_created_time(board_file, capsys, tmp_path):
+    assert run(board_file, "card", "add", "--list", "Done", "--created", "not a date", "Card") == 1
+    assert "Can't read 'not a date'" in capsys.readouterr().err
+    assert board_json(board_file, capsys)["Done"] == []
+
+    assert run(board_file, "card", "add", "--list", "Done", "--created", "2024-05", "Card") == 0
+    output = str(tmp_path / "export.json")
+    run(board_file, "export", "--output", output)
+    with open(output) as f:
+        data = json.load(f)
+    done = [list_data for list_data in data["boards"][data["current_board"]]["lists"].values()
+            if list_data["name"] == "Done"]
+    assert [card["created"] for card in done[0]["cards"]] == ["2024-05-01 00:00"]
+
+
+def test_export_writes_the_data_file_schema(board_file, tmp_path):
+    output = str(tmp_path / "export.json")
+    assert run(board_file, "export", "--output", output) == 0
+    with open(output) as f:
+        data = json.load(f)
+    board = data["boards"][data["current_board"]]
+    assert board["name"] == "Work"
+    assert [card["title"] for card in next(iter(board["lists"].values()))["cards"]] == ["Existing"]
+
+
+@pytest.mark.parametrize("args", [["--data", "{}", "list", "--board", "Work"],
+                                  ["--data={}", "list", "--board", "Work"]])
+def test_taskflow_hands_subcommands_to_the_cli(board_file, args):
+    # Without the GUI imported, so this runs with no display (or customtkinter)
+    output = subprocess.run([sys.executable, TASKFLOW, *(arg.format(board_file) for arg in args)],
+                            capture_output=True, text=True, timeout=60)
+    assert output.returncode == 0, output.stderr
+    assert "Existing" in output.stdout
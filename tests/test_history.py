@@ -0,0 +1,51 @@
+from history import CARD_BYTES, FIELD_BYTES, History, change_size
+
+
+def change(title):
+    return {'op': 'update_card', 'board': "b", 'list': "l", 'card': "c", 'fields': {'title': title}}
+
+
+def test_recording_drops_the_redo_stack():
+    history = History()
+    history.record([change("a")], [change("")])
+    history.record([change("b")], [change("a")])
+    assert history.pop_undo()['changes'] == [change("b")]
+    assert history.can_redo()
+    history.record([change("c")], [change("a")])
+    assert not history.can_redo()
+    assert history.size == 3 * change_size(change("a")) + change_size(change(""))
+
+
+def test_oldest_entries_are_evicted_past_max_entries():
+    history = History(max_entries=3)
+    for title in "abcde":
+        history.record([change(title)], [change("")])
+    assert [entry['changes'][0]['fields']['title'] for entry in history.undo_stack] == ["c", "d", "e"]
+
+
+def test_oldest_entries_are_evicted_past_max_bytes():
+    entry_size = 2 * change_size(change("a"))
+    history = History(max_bytes=entry_size * 3)
+    for title in "abcde":
+        history.record([change(title)], [change(title)])
+    assert len(history.undo_stack) == 3
+    assert history.size == entry_size * 3
+    # The newest entry is kept however big it is
+    history.record([change("x")] * 10, [change("")] * 10)
+    assert len(history.undo_stack) == 1
+
+
+def test_bulk_changes_are_weighed_by_their_cards(tmp_path, open_engine):
+    engine = open_engine(str(tmp_path / "boards.json"), history=History(max_bytes=100 * CARD_BYTES))
+    engine.create_board("Board")
+    cards = engine.create_cards(engine.create_list("List"), [f"card {i}" for i in range(90)])
+    engine.history.clear()
+    for card in cards[:3]:
+        engine.rename_card(card.id, "renamed")
+    assert len(engine.history.undo_stack) == 3
+
+    engine.delete_cards([card.id for card in cards])
+    # Its 90 ids, and the inverse's 90 [position, card] rows: together past
+    # max_bytes, so the renames before it are evicted
+    assert len(engine.history.undo_stack) == 1
+    assert engine.history.size == 12 * FIELD_BYTES + 90 * (2 * FIELD_BYTES + CARD_BYTES)
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from model import BoardIndex, Card, apply_change, encode_card, parse_created, upgrade_data
+from storage import JournalStore
+
+
+def version_1_data():
+    return {'boards': {"Work": {"lists": {"To do": {"cards": [{"title": "one", "created": "2024-01-01 10:00"},
+                                                                     {"title": "two", "created": "2024-01-01 10:00"}]},
+                                          "Done": {"cards": []}}}},
+            'current_board': "Work"}
+
+
+def test_upgrade_keys_everything_by_id():
+    data = version_1_data()
+    assert upgrade_data(data)
+    assert not upgrade_data(data)
+    board = data['boards'][data['current_board']]
+    assert board["name"] == "Work"
+    assert [list_data["name"] for list_data in board["lists"].values()] == ["To do", "Done"]
+    for list_id, list_data in board["lists"].items():
+        assert list_data["id"] == list_id
+    cards = next(iter(board["lists"].values()))["cards"]
+    assert [card["title"] for card in cards] == ["one", "two"]
+    assert cards[0]["id"] != cards[1]["id"]
+
+
+def test_json_store_upgrades_a_name_based_journal(tmp_path):
+    data_file = str(tmp_path / "boards.json")
+    with open(data_file, "w") as f:
+        json.dump(dict(version_1_data(), journal_seq=0), f)
+    with open(data_file + ".journal", "w") as f:
+        f.write(json.dumps({'op': 'move_card', 'board': "Work", 'source': "To do", 'source_index': 1,
+                            'target': "Done", 'target_index': 0, 'seq': 1}) + "\n")
+    store = JournalStore(data_file)
+    data = store.load()
+    store.close()
+
+    lists = list(data['boards'][data['current_board']]["lists"].values())
+    assert [[card["title"] for card in list_data["cards"]] for list_data in lists] == [["one"], ["two"]]
+    # The upgrade is folded into a fresh snapshot, so it happens once
+    with open(data_file) as f:
+        assert json.load(f)['version'] == 2
+    assert JournalStore(data_file).load() == data
+
+
+def test_index_tracks_card_positions():
+    data = {'boards': {}, 'current_board': None}
+    index = BoardIndex()
+    apply_change(data, {'op': 'create_board', 'board': "b", 'name': "Board"}, index)
+    for list_id in ("l1", "l2"):
+        apply_change(data, {'op': 'create_list', 'board': "b", 'list': list_id, 'name': list_id}, index)
+    for card_id in "abc":
+        apply_change(data, {'op': 'add_card', 'board': "b", 'list': "l1", 'card': Card(card_id, card_id, 0)}, index)
+    assert index.position("l1", "c") == 2
+
+    apply_change(data, {'op': 'move_card', 'board': "b", 'card': "a", 'source': "l1", 'target': "l2",
+                        'index': 0}, index)
+    apply_change(data, {'op': 'delete_card', 'board': "b", 'list': "l1", 'card': "b"}, index)
+    assert index.position("l1", "c") == 0
+    assert index.find_card("a") == ("l2", Card("a", "a", 0))
+    assert index.find_card("b") is None
+    assert index.find_list("l2")[0] == "b"
+
+
+def test_cards_read_like_schema_dicts():
+    card = Card.from_dict({"id": "c", "title": "Title", "created": "2024-05-08 09:30"})
+    assert card["created"] == "2024-05-08 09:30"
+    assert card.created_at == parse_created("2024-05-08 09:30")
+    assert card.get('width', 260) == 260
+    assert 'width' not in card
+    card.update({'width': 300, 'title': "New"})
+    assert card.to_dict() == {"id": "c", "title": "New", "created": "2024-05-08 09:30", "width": 300}
+    assert card.pop('width') == 300
+    assert card == {"id": "c", "title": "New", "created": "2024-05-08 09:30"}
+    with pytest.raises(KeyError):
+        card["height"]
+    with pytest.raises(KeyError):
+        card["colour"] = "red"
+    assert json.loads(json.dumps([card], default=encode_card)) == [card.to_dict()]
+
+
+def test_unreadable_times_are_kept_as_text():
+    card = Card.from_dict({"id": "c", "title": "Title", "created": "last Tuesday"})
+    assert card["created"] == "last Tuesday"
+    assert card.to_dict()["created"] == "last Tuesday"
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from profiling import Histogram, Profiler
+
+
+def test_percentiles_fall_within_a_bucket():
+    histogram = Histogram()
+    for millis in range(1, 1001):
+        histogram.add(millis / 1000)
+    assert histogram.count == 1000
+    assert histogram.max == 1.0
+    for fraction in (0.5, 0.95, 0.99):
+        assert fraction <= histogram.percentile(fraction) <= fraction * 1.2
+    assert Histogram().percentile(0.5) == 0.0
+
+
+def test_instrumented_calls_are_timed_and_traced(tmp_path):
+    class Board:
+        def render(self, value):
+            return value * 2
+
+        def fail(self):
+            raise ValueError("boom")
+
+    board = Board()
+    profiler = Profiler(max_events=3)
+    profiler.instrument(board, ["render", "fail"])
+    assert [board.render(i) for i in range(4)] == [0, 2, 4, 6]
+    with pytest.raises(ValueError):
+        board.fail()
+
+    assert {row[0]: row[1] for row in profiler.stats()} == {"Board.render": 4, "Board.fail": 1}
+    trace_file = str(tmp_path / "trace.json")
+    profiler.dump_trace(trace_file)
+    with open(trace_file) as f:
+        events = json.load(f)["traceEvents"]
+    # Only the most recent calls are kept
+    assert [event["name"] for event in events] == ["Board.render", "Board.render", "Board.fail"]
@@ -0,0 +1,125 @@
+import random
+
+import pytest
+
+from query import CardFilter
+
+
+def card_ids(matches):
+    return {list_id: [card.id for card in cards] for list_id, cards in matches.items()}
+
+
+def brute_force(engine, card_filter):
+    """What query() should return, by checking every card of the current board."""
+    matches = {}
+    for list_id, list_data in engine.boards[engine.current_board]["lists"].items():
+        cards = [
+            card for card in list_data["cards"]
+            if (card_filter.created_after is None or card.created_at >= card_filter.created_after)
+            and (card_filter.created_before is None or card.created_at < card_filter.created_before)
+            and (not card_filter.title_contains or card_filter.title_contains in card.title.casefold())
+            and (card_filter.lists is None or list_id in card_filter.lists)
+        ]
+        if card_filter.sort == 'created':
+            cards.sort(key=lambda card: (card.created_at, card.id))
+        elif card_filter.sort == 'title':
+            cards.sort(key=lambda card: (card.title.casefold(), card.id))
+        if card_filter.descending:
+            cards.reverse()
+        matches[list_id] = cards
+    return matches
+
+
+@pytest.mark.parametrize("sort", [None, "created", "title"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_query_matches_a_brute_force_filter(tmp_path, open_engine, sort, descending):
+    rng = random.Random(5)
+    engine = open_engine(str(tmp_path / "boards.json"))
+    engine.create_board("Board")
+    lists = [engine.create_list(f"List {i}") for i in range(3)]
+
+    def created():
+        return f"2024-01-{rng.randint(1, 9):02d} 10:00"
+    cards = [engine.create_card(rng.choice(lists), rng.choice("aAb") + str(i), created=created()).id
+             for i in range(40)]
+    filters = [
+        CardFilter(sort=sort, descending=descending),
+        CardFilter(created_after="2024-01-03", created_before="2024-01-07", sort=sort, descending=descending),
+        CardFilter(title_contains="A", lists={lists[0], lists[2]}, sort=sort, descending=descending),
+    ]
+
+    for step in range(60):
+        roll = rng.random()
+        if roll < 0.2:
+            cards.append(engine.create_card(rng.choice(lists), rng.choice("ab") + "new", 0, created()).id)
+        elif roll < 0.35:
+            engine.move_card(rng.choice(cards), rng.choice(lists), 0)
+        elif roll < 0.45:
+            engine.move_cards(rng.sample(cards, 3), rng.choice(lists), rng.randint(0, 30))
+        elif roll < 0.6:
+            engine.rename_card(rng.choice(cards), rng.choice("aAb") + "renamed")
+        elif roll < 0.7:
+            engine.update_cards(rng.sample(cards, 3), title=rng.choice("aAb") + "bulk", created=created())
+        elif roll < 0.8:
+            engine.update_card(rng.choice(cards), created=created())
+        elif roll < 0.9:
+            engine.delete_card(cards.pop(rng.randrange(len(cards))))
+        else:
+            deleting = rng.sample(cards, 2)
+            engine.delete_cards(deleting)
+            cards = [card_id for card_id in cards if card_id not in deleting]
+        for card_filter in filters:
+            assert card_ids(engine.query(card_filter)) == card_ids(brute_force(engine, card_filter))
+
+
+@pytest.mark.parametrize("sort", [None, "created", "title"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_update_query_matches_a_fresh_query(tmp_path, open_engine, sort, descending):
+    rng = random.Random(7)
+    engine = open_engine(str(tmp_path / "boards.json"))
+    engine.create_board("Board")
+    lists = [engine.create_list(f"List {i}") for i in range(3)]
+
+    def created():
+        return f"2024-01-{rng.randint(1, 9):02d} 10:00"
+    cards = [engine.create_card(rng.choice(lists), rng.choice("ab") + str(i), created=created()).id
+             for i in range(40)]
+    card_filter = CardFilter(title_contains="a", created_after="2024-01-04",
+                             lists={lists[0], lists[2]}, sort=sort, descending=descending)
+    matches = engine.query(card_filter)
+    changes = []
+    engine.subscribe(changes.append)
+
+    for step in range(150):
+        changes.clear()
+        for _ in range(rng.randint(1, 4)):
+            roll = rng.random()
+            if roll < 0.2:
+                cards.append(engine.create_card(rng.choice(lists), rng.choice("ab") + "new",
+                                                rng.randint(0, 30), created()).id)
+            elif roll < 0.4:
+                engine.move_card(rng.choice(cards), rng.choice(lists), rng.randint(0, 30))
+            elif roll < 0.5:
+                engine.move_cards(rng.sample(cards, 3), rng.choice(lists), rng.randint(0, 30))
+            elif roll < 0.6:
+                engine.rename_card(rng.choice(cards), rng.choice("ab") + "renamed")
+            elif roll < 0.7:
+                engine.update_cards(rng.sample(cards, 3), title=rng.choice("ab") + "bulk")
+            elif roll < 0.8:
+                added = engine.create_cards(rng.choice(lists), ["a added"] * rng.choice([2, 70]), rng.randint(0, 30))
+                cards += [card.id for card in added]
+            elif roll < 0.9:
+                engine.delete_card(cards.pop(rng.randrange(len(cards))))
+            else:
+                deleting = rng.sample(cards, 2)
+                engine.delete_cards(deleting)
+                cards = [card_id for card_id in cards if card_id not in deleting]
+        engine.update_query(matches, card_filter, changes)
+        assert card_ids(matches) == card_ids(engine.query(card_filter))
+
+
+def test_unknown_sorts_are_rejected():
+    with pytest.raises(ValueError):
+        CardFilter(sort="size")
+    assert not CardFilter().is_active()
+    assert CardFilter(descending=True, sort="title").is_active()
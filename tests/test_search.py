@@ -0,0 +1,96 @@
+import random
+
+from search import SearchIndex
+
+
+def build(engine):
+    engine.create_board("Garden plans")
+    todo = engine.create_list("Planting")
+    engine.create_list("Harvest")
+    cards = [engine.create_card(todo, title).id for title in ("Plant tomatoes", "Water plants", "Prune roses")]
+    return todo, cards
+
+
+def test_terms_match_as_prefixes(data_file, open_engine):
+    engine = open_engine(data_file)
+    todo, cards = build(engine)
+    results = engine.search("pla")
+    # Boards first, then lists, then cards
+    assert results[:2] == [('board', engine.current_board), ('list', todo)]
+    assert sorted(results[2:]) == sorted([('card', cards[0]), ('card', cards[1])])
+    assert engine.search("water pla") == [('card', cards[1])]
+    assert engine.search("pla", limit=3)[:2] == [('board', engine.current_board), ('list', todo)]
+    assert len(engine.search("pla", limit=3)) == 3
+    assert engine.search("tomatoes roses") == []
+    assert engine.search("  ") == []
+
+
+def test_edits_update_the_index(data_file, open_engine):
+    engine = open_engine(data_file)
+    todo, cards = build(engine)
+    engine.rename_card(cards[2], "Trim hedges")
+    engine.delete_card(cards[0])
+    engine.rename_list(todo, "Sowing")
+    assert engine.search("prune") == []
+    assert engine.search("trim") == [('card', cards[2])]
+    assert engine.search("tomatoes") == []
+    assert engine.search("planting") == []
+    assert engine.search("sow") == [('list', todo)]
+    engine.delete_board(engine.current_board)
+    assert engine.search("water") == []
+
+
+def test_narrowed_queries_match_fresh_ones(data_file, open_engine):
+    engine = open_engine(data_file)
+    build(engine)
+    for typed in ("p", "pl", "pla", "plan", "plant", "plant t", "plant to", "pru"):
+        narrowed = engine.search(typed)
+        engine.search_index.last_query = None
+        assert sorted(narrowed) == sorted(engine.search(typed))
+
+
+def test_incremental_index_matches_a_rebuilt_one(data_file, open_engine):
+    rng = random.Random(3)
+    words = ["alpha", "beta", "gamma", "delta", "alpine", "bet"]
+    engine = open_engine(data_file)
+    engine.create_board("Board")
+    lists = [engine.create_list(f"List {i}") for i in range(3)]
+    cards = []
+    for _ in range(300):
+        roll = rng.random()
+        if roll < 0.4 or not cards:
+            cards.append(engine.create_card(rng.choice(lists), " ".join(rng.sample(words, 2))).id)
+        elif roll < 0.6:
+            engine.rename_card(rng.choice(cards), rng.choice(words))
+        elif roll < 0.7:
+            engine.move_card(rng.choice(cards), rng.choice(lists), 0)
+        elif roll < 0.8:
+            engine.update_cards(rng.sample(cards, min(3, len(cards))), title=rng.choice(words))
+        elif roll < 0.9:
+            engine.delete_card(cards.pop(rng.randrange(len(cards))))
+        else:
+            deleting = rng.sample(cards, min(2, len(cards)))
+            engine.delete_cards(deleting)
+            cards = [card_id for card_id in cards if card_id not in deleting]
+
+    rebuilt = SearchIndex()
+    for board in engine.boards.values():
+        rebuilt.add_board(board)
+    assert engine.search_index.postings == rebuilt.postings
+    assert engine.search_index.tokens == rebuilt.tokens
+    assert engine.search_index.card_lists == rebuilt.card_lists
+
+
+def test_lazily_loaded_boards_are_searchable_once_loaded(tmp_path, open_engine):
+    data_file = str(tmp_path / "boards.db")
+    engine = open_engine(data_file)
+    build(engine)
+    garden = engine.current_board
+    engine.create_board("Other")
+    engine.flush()
+
+    engine = open_engine(data_file)
+    assert engine.search("garden") == [('board', garden)]
+    assert engine.search("water") == []
+    engine.load_all_boards()
+    assert [kind for kind, doc_id in engine.search("water")] == ['card']
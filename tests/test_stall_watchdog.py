@@ -0,0 +1,78 @@
+import json
+import time
+
+import pytest
+
+from stall_watchdog import StallWatchdog, stall_log_file
+
+
+class Handlers:
+    def slow_click(self):
+        time.sleep(0.3)
+
+
+@pytest.fixture
+def watchdog(tmp_path):
+    """A watchdog whose heartbeats are run by the test instead of an event loop."""
+    pending = []
+    watchdog = StallWatchdog(lambda delay_ms, callback: pending.append(callback), owner=Handlers(),
+                             interval=0.02, threshold=0.1, log_file=str(tmp_path / "stalls.log"))
+    watchdog.run_pending = lambda: pending.pop()()
+    watchdog.start()
+    yield watchdog
+    watchdog.stop()
+
+
+def test_stall_names_the_blocking_handler(watchdog):
+    watchdog.owner.slow_click()
+    watchdog.run_pending()
+    [stall] = watchdog.stalls
+    assert stall['duration_ms'] > 100
+    assert stall['handler'] == "Handlers.slow_click"
+    assert any("slow_click" in line for line in stall['stack'])
+    with open(watchdog.log_file) as f:
+        assert [json.loads(line)['handler'] for line in f] == ["Handlers.slow_click"]
+
+
+def test_prompt_heartbeats_record_nothing(watchdog):
+    for _ in range(3):
+        time.sleep(0.02)
+        watchdog.run_pending()
+    assert not watchdog.stalls
+
+
+def test_log_rolls_over(watchdog):
+    watchdog.max_log_bytes = 10
+    for _ in range(3):
+        watchdog.record(0.5, None)
+    with open(watchdog.log_file) as f:
+        assert len(f.readlines()) == 1
+    with open(watchdog.log_file + ".1") as f:
+        assert len(f.readlines()) == 1
+
+
+def test_sampler_sleeps_until_a_heartbeat_is_late(watchdog):
+    waits = []
+    wait = watchdog.condition.wait
+    watchdog.condition.wait = lambda timeout=None: waits.append(timeout) or wait(timeout)
+    for _ in range(15):
+        time.sleep(0.02)
+        watchdog.run_pending()
+    # Waking every threshold (0.1 s) or so, rather than polling
+    assert len(waits) <= 6
+    watchdog.stop()
+    watchdog.sampler.join(1)
+    assert not watchdog.sampler.is_alive()
+
+
+def test_unwritable_log_is_reported_once(watchdog, tmp_path, capsys):
+    watchdog.log_file = str(tmp_path / "missing" / "stalls.log")
+    for _ in range(2):
+        watchdog.record(0.5, None)
+    assert capsys.readouterr().out.count("Could not write stall log") == 1
+    assert len(watchdog.stalls) == 2
+
+
+def test_log_sits_beside_the_data_file():
+    assert stall_log_file("/home/me/taskflow_data.json") == "/home/me/taskflow_data.stalls.log"
+    assert stall_log_file("boards.db") == "boards.stalls.log"
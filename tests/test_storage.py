@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+
+import pytest
+
+from storage import (
+    BinaryStore, JournalStore, SaveScheduler, SnapshotReader, SQLiteStore, convert_data_file, migrate_json_to_sqlite,
+    open_store
+)
+
+
+@pytest.fixture(params=["boards.json", "boards.tfb"])
+def journal_file(request, tmp_path):
+    """A fresh data file for each journaling backend."""
+    return str(tmp_path / request.param)
+
+
+def add_board(store, name="Work", cards=("one", "two")):
+    """Append the records for a board with one list, "todo", holding cards whose ids are their titles."""
+    board_id = name.lower()
+    store.append({'op': 'create_board', 'board': board_id, 'name': name})
+    store.append({'op': 'create_list', 'board': board_id, 'list': board_id + "-todo", 'name': "To do"})
+    for title in cards:
+        store.append({'op': 'add_card', 'board': board_id, 'list': board_id + "-todo",
+                      'card': {"id": title, "title": title, "created": "2024-01-01 10:00"}})
+
+
+def card_titles(data, board="Work"):
+    board_id = board.lower()
+    return [card["title"] for card in data['boards'][board_id]["lists"][board_id + "-todo"]["cards"]]
+
+
+def test_journal_replays_over_the_snapshot(journal_file):
+    store = open_store(journal_file)
+    store.load()
+    add_board(store)
+    store.append({'op': 'move_card', 'board': "work", 'card': "two", 'source': "work-todo",
+                  'target': "work-todo", 'index': 0})
+    store.flush()
+    # Never closed, as after a crash: the journal alone has the edits
+    data = open_store(journal_file).load()
+    assert card_titles(data) == ["two", "one"]
+    assert data['current_board'] == "work"
+
+
+def test_compaction_folds_the_journal_into_a_snapshot(journal_file):
+    store = open_store(journal_file)
+    store.compact_threshold = 512
+    store.load()
+    add_board(store, cards=[f"card {i}" for i in range(40)])
+    store.close()
+    assert not os.path.exists(journal_file + ".journal.compacting")
+    store = open_store(journal_file)
+    assert store.read_snapshot()[1] > 0
+    assert card_titles(store.load()) == [f"card {i}" for i in range(40)]
+    store.close()
+
+
+def test_torn_final_record_is_ignored(journal_file):
+    store = open_store(journal_file)
+    store.load()
+    add_board(store)
+    store.close()
+    with open(journal_file + ".journal", "a") as f:
+        f.write('{"op":"add_card","board":"work","li')
+    assert card_titles(open_store(journal_file).load()) == ["one", "two"]
+
+
+def test_records_after_a_torn_one_are_kept(journal_file):
+    store = open_store(journal_file)
+    store.load()
+    add_board(store)
+    store.close()
+    with open(journal_file + ".journal", "a") as f:
+        f.write('{"op":"add_card","board":"work","li')
+
+    store = open_store(journal_file)
+    store.load()
+    store.append({'op': 'add_card', 'board': "work", 'list': "work-todo",
+                  'card': {"id": "three", "title": "three", "created": "2024-01-01 10:00"}})
+    store.flush()
+    # Not closed, so the new record is only in the journal, after where the torn one was cut off
+    assert card_titles(open_store(journal_file).load()) == ["one", "two", "three"]
+
+
+def test_leftover_temp_snapshot_is_discarded(journal_file):
+    store = open_store(journal_file)
+    store.load()
+    add_board(store)
+    store.close()
+    with open(journal_file + ".tmp", "w") as f:
+        f.write('{"boards": {}, "journal_')
+    assert card_titles(open_store(journal_file).load()) == ["one", "two"]
+    assert not os.path.exists(journal_file + ".tmp")
+
+
+def test_sqlite_loads_other_boards_on_demand(tmp_path):
+    db_file = str(tmp_path / "boards.db")
+    store = open_store(db_file)
+    assert isinstance(store, SQLiteStore)
+    store.load()
+    add_board(store, "Home", ["dishes"])
+    add_board(store)
+    store.append({'op': 'move_card', 'board': "work", 'card': "two", 'source': "work-todo",
+                  'target': "work-todo", 'index': 0})
+    store.close()
+
+    store = open_store(db_file)
+    data = store.load()
+    assert data['current_board'] == "work"
+    assert data['boards']["home"]["lists"] is None
+    assert card_titles(data) == ["two", "one"]
+    assert card_titles({'boards': {"home": store.load_board("home")}}, "Home") == ["dishes"]
+    store.close()
+
+
+def test_migrating_json_to_sqlite(tmp_path):
+    json_file, db_file = str(tmp_path / "boards.json"), str(tmp_path / "boards.db")
+    store = JournalStore(json_file)
+    store.load()
+    add_board(store)
+    store.close()
+
+    migrate_json_to_sqlite(json_file, db_file)
+    with pytest.raises(FileExistsError):
+        migrate_json_to_sqlite(json_file, db_file)
+    store = SQLiteStore(db_file)
+    assert card_titles(store.load()) == ["one", "two"]
+    store.close()
+
+
+def test_binary_store_decodes_boards_on_demand(tmp_path):
+    tfb_file = str(tmp_path / "boards.tfb")
+    # A tiny threshold folds the journal into a snapshot on close
+    store = BinaryStore(tfb_file, compact_threshold=1)
+    store.load()
+    add_board(store, "Home", ["dishes"])
+    add_board(store)
+    store.close()
+
+    store = BinaryStore(tfb_file)
+    data = store.load()
+    assert data['boards']["home"]["lists"] is None
+    assert card_titles(data) == ["one", "two"]
+    # A journal record for an unloaded board decodes just that board
+    store.append({'op': 'add_card', 'board': "home", 'list': "home-todo",
+                  'card': {"id": "laundry", "title": "laundry", "created": "2024-01-01 10:00"}})
+    store.flush()
+    assert card_titles({'boards': {"home": store.load_board("home")}}, "Home") == ["dishes"]
+    data = BinaryStore(tfb_file).load()
+    assert card_titles(data, "Home") == ["dishes", "laundry"]
+    assert card_titles(data) == ["one", "two"]
+    store.close()
+
+
+def test_binary_compaction_copies_untouched_boards(tmp_path):
+    tfb_file = str(tmp_path / "boards.tfb")
+    store = BinaryStore(tfb_file, compact_threshold=1)
+    store.load()
+    add_board(store, "Home", ["dishes"])
+    add_board(store)
+    store.close()
+    reader = SnapshotReader(tfb_file)
+    home_blob = reader.blob("home")
+    reader.close()
+
+    store = BinaryStore(tfb_file, compact_threshold=512)
+    data = store.load()
+    assert data['boards']["home"]["lists"] is None
+    add_board(store, "Garden", [f"card {i}" for i in range(20)])
+    store.close()
+    reader = SnapshotReader(tfb_file)
+    assert reader.blob("home") == home_blob
+    assert [name for board_id, name, *rest in reader.table['boards']] == ["Home", "Work", "Garden"]
+    reader.close()
+
+
+def test_other_files_are_not_binary_snapshots(tmp_path):
+    path = str(tmp_path / "boards.tfb")
+    with open(path, "wb") as f:
+        f.write(b"{}" * 20)
+    with pytest.raises(ValueError):
+        SnapshotReader(path)
+
+
+def test_converting_between_formats(tmp_path):
+    json_file = str(tmp_path / "boards.json")
+    store = JournalStore(json_file)
+    store.load()
+    add_board(store, "Home", ["dishes"])
+    add_board(store)
+    store.close()
+
+    previous = json_file
+    for name in ("boards.tfb", "boards.db", "copy.json"):
+        convert_data_file(previous, str(tmp_path / name))
+        previous = str(tmp_path / name)
+    store = JournalStore(previous)
+    data = store.load()
+    assert card_titles(data) == ["one", "two"]
+    assert card_titles(data, "Home") == ["dishes"]
+    store.close()
+
+
+def test_unflushed_records_stay_out_of_the_journal(journal_file):
+    store = open_store(journal_file)
+    store.load()
+    add_board(store)
+    assert open_store(journal_file).load()['boards'] == {}
+    store.flush()
+    assert card_titles(open_store(journal_file).load()) == ["one", "two"]
+
+
+def test_scheduler_coalesces_a_burst_into_one_flush():
+    flushes = []
+    scheduler = SaveScheduler(lambda: flushes.append(time.monotonic()), debounce=0.05)
+    for _ in range(20):
+        scheduler.mark_dirty()
+    time.sleep(0.2)
+    assert len(flushes) == 1
+    scheduler.close()
+    assert len(flushes) == 1
+
+
+def test_scheduler_flushes_a_steady_stream_by_the_staleness_bound():
+    flushed = threading.Event()
+    scheduler = SaveScheduler(flushed.set, debounce=0.05, max_staleness=0.1)
+    start = time.monotonic()
+    while not flushed.is_set() and time.monotonic() - start < 2:
+        scheduler.mark_dirty()
+        time.sleep(0.01)
+    scheduler.close()
+    assert flushed.is_set()
+    assert time.monotonic() - start < 1
+
+
+def test_scheduler_close_writes_pending_changes():
+    flushes = []
+    scheduler = SaveScheduler(lambda: flushes.append(1), debounce=60)
+    scheduler.mark_dirty()
+    scheduler.close()
+    assert flushes == [1]
+
+
+@pytest.mark.parametrize("name", ["boards.json", "boards.db"])
+def test_board_renderer_survives_reload(tmp_path, name):
+    data_file = str(tmp_path / name)
+    store = open_store(data_file)
+    store.load()
+    add_board(store)
+    store.append({'op': 'update_board', 'board': "work", 'fields': {'renderer': "canvas"}})
+    store.close()
+    store = open_store(data_file)
+    assert store.load()['boards']["work"]['renderer'] == "canvas"
+    store.close()
@@ -0,0 +1,129 @@
+import pytest
+
+from board_store import BoardStore
+from conftest import contents
+from storage import open_store
+
+
+def test_sync_takes_in_another_processes_changes(data_file, open_engine):
+    writer = open_engine(data_file)
+    writer.create_board("Work")
+    todo = writer.create_list("To do")
+    writer.flush()
+    reader = open_engine(data_file)
+    events = []
+    reader.subscribe(events.append)
+    assert reader.sync() == 0
+
+    card = writer.create_card(todo, "From the writer")
+    writer.create_board("Second")
+    writer.rename_card(card.id, "Renamed")
+    writer.flush()
+    taken = reader.sync()
+    if data_file.endswith(".db"):
+        # SQLite can't say what changed, so the reader loads everything again
+        assert taken is None
+        assert [event['op'] for event in events] == ['reload']
+    else:
+        assert taken == 3
+        assert [event['op'] for event in events] == ['add_card', 'create_board', 'update_card']
+        # Another process switching boards doesn't switch this one
+        assert reader.boards[reader.current_board]["name"] == "Work"
+    assert contents(reader) == contents(writer)
+    assert reader.sync() == 0
+
+
+def test_both_processes_end_up_with_every_change(data_file, open_engine):
+    first = open_engine(data_file)
+    first.create_board("Work")
+    todo = first.create_list("To do")
+    first.flush()
+    second = open_engine(data_file)
+
+    first.create_card(todo, "first")
+    first.flush()
+    second.sync()
+    second.create_card(todo, "second")
+    second.flush()
+    first.sync()
+    first.create_list("Done")
+    first.flush()
+    second.sync()
+    assert contents(first) == contents(second)
+    assert [card.title for card in second.find_list(todo)[1]["cards"]] == ["first", "second"]
+    assert contents(open_engine(data_file)) == contents(first)
+
+
+def test_crossed_edits_reload(tmp_path, open_engine):
+    data_file = str(tmp_path / "boards.json")
+    first = open_engine(data_file)
+    first.create_board("Work")
+    todo = first.create_list("To do")
+    first.flush()
+    second = open_engine(data_file)
+
+    # Both edit before either syncs: the second's record lands after the first's in the file
+    first.create_card(todo, "first")
+    second.create_card(todo, "second")
+    first.flush()
+    second.flush()
+    events = []
+    second.subscribe(events.append)
+    assert second.sync() is None
+    assert events == [{'op': 'reload'}]
+    first.sync()
+    assert contents(first) == contents(second) == contents(open_engine(data_file))
+
+
+@pytest.mark.parametrize("name", ["boards.json", "boards.tfb"])
+def test_viewer_follows_compactions(tmp_path, open_engine, name):
+    data_file = str(tmp_path / name)
+    writer = BoardStore(open_store(data_file))
+    writer.store.compact_threshold = 4096
+    writer.load()
+    writer.create_board("Board")
+    todo = writer.create_list("List")
+    writer.flush()
+    viewer = open_engine(data_file)
+    for batch in range(5):
+        for i in range(60):
+            writer.create_card(todo, f"card {batch} {i} " * 4)
+            writer.flush()
+        writer.store.wait_for_compaction()
+        viewer.sync()
+        assert contents(viewer) == contents(writer)
+    writer.close()
+
+
+def test_sqlite_skips_writes_another_process_crossed(tmp_path, open_engine):
+    data_file = str(tmp_path / "boards.db")
+    first = open_engine(data_file)
+    first.create_board("Board")
+    todo = first.create_list("To do")
+    done = first.create_list("Done")
+    cards = first.create_cards(todo, ["a", "b", "c", "d", "e"])
+    first.flush()
+
+    second = open_engine(data_file)
+    second.delete_card(cards[0].id)
+    second.delete_list(done)
+    second.delete_cards([cards[3].id, cards[4].id])
+    second.flush()
+
+    first.move_card(cards[0].id, todo, 0)  # Deleted there
+    first.create_card(done, "f")  # List deleted there
+    first.move_cards([cards[1].id, cards[2].id], todo, 3)  # Past the end of the list as it is there
+    first.rename_card(cards[1].id, "renamed")
+    first.flush()
+    saved = open_engine(data_file)
+    assert list(saved.boards[saved.current_board]["lists"]) == [todo]
+    assert [card.title for card in saved.find_list(todo)[1]["cards"]] == ["renamed", "c"]
+
+
+def test_sqlite_write_errors_propagate(tmp_path, open_engine):
+    engine = open_engine(str(tmp_path / "boards.db"))
+    engine.create_board("Board")
+    engine.flush()
+    engine.store.append({'op': 'no_such_op', 'board': engine.current_board})
+    with pytest.raises(ValueError):
+        engine.flush()
@@ -0,0 +1,114 @@
+import io
+import json
+import time
+
+import pytest
+
+from conftest import contents
+from model import parse_created
+from trello import JsonStream, read_trello_board, trello_created
+
+# Trello ids start with their creation time in epoch seconds
+CREATED = 0x5f5b1d8b
+
+
+def trello_id(number):
+    return f"{CREATED:08x}{number:016x}"
+
+
+def trello_card(number, list_number, pos, closed=False):
+    return {"id": trello_id(number), "idList": trello_id(list_number), "name": f"Card {number} ✓",
+            "pos": pos, "closed": closed, "labels": [{"name": "x"}], "desc": "d" * 100}
+
+
+EXPORT = {
+    "id": trello_id(0),
+    "cards": [trello_card(10, 1, 200), trello_card(11, 1, 100), trello_card(12, 2, 5.5),
+              trello_card(13, 1, 50, closed=True)],
+    "actions": [{"type": "updateCard", "data": {"list": {"name": "["}, "old": [1, [2, [3]]]}}] * 50,
+    "lists": [
+        {"id": trello_id(2), "name": "Doing", "pos": 2000},
+        {"id": trello_id(3), "name": "Archived", "pos": 1, "closed": True},
+        {"id": trello_id(1), "name": "To do", "pos": 1000},
+    ],
+    "name": "Roadmap",
+    "prefs": {"background": "blue"},
+}
+
+
+class TrickleFile(io.BytesIO):
+    """Returns a few bytes per read, so values and multi-byte characters straddle chunks."""
+    def read(self, size=-1):
+        return super().read(5)
+
+
+@pytest.fixture
+def export_file(tmp_path):
+    path = str(tmp_path / "export.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(EXPORT, f, ensure_ascii=False, indent=1)
+    return path
+
+
+def test_export_becomes_a_board(export_file):
+    progress = []
+    board = read_trello_board(export_file, lambda done, total: progress.append((done, total)))
+    assert board["name"] == "Roadmap"
+    assert [(list_data["name"], [card.title for card in list_data["cards"]]) for list_data in board["lists"].values()] \
+        == [("To do", ["Card 11 ✓", "Card 10 ✓"]), ("Doing", ["Card 12 ✓"])]
+    assert progress[-1][0] == progress[-1][1]
+
+
+@pytest.fixture
+def utc_plus_two(monkeypatch):
+    """The local time zone set two hours ahead of UTC (POSIX offsets count westwards)."""
+    monkeypatch.setenv("TZ", "UTC-2")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_created_times_come_from_trello_ids(utc_plus_two):
+    # Kept as local wall-clock minutes, like times typed in: 06:47 UTC is 08:47 here
+    assert trello_created(trello_id(5)) == parse_created("2020-09-11 08:47")
+    assert isinstance(trello_created("not hex"), int)
+    assert isinstance(trello_created(None), int)
+
+
+def test_stream_steps_through_values():
+    stream = JsonStream(TrickleFile('{"a": [1, 22, {"b": "✓✓"}], "c": 1234567, "d": [[], {}]}'.encode()))
+    seen = {}
+    for key in stream.object():
+        if key == 'a':
+            seen[key] = [stream.value() for _ in stream.array()]
+        elif key == 'c':
+            seen[key] = stream.value()
+        else:
+            stream.skip()
+    assert seen == {'a': [1, 22, {'b': "✓✓"}], 'c': 1234567}
+    assert stream.peek() == ''
+
+
+def test_malformed_exports_are_rejected():
+    stream = JsonStream(TrickleFile(b'{"a": 1 "b": 2}'))
+    with pytest.raises(ValueError):
+        for key in stream.object():
+            stream.value()
+
+
+def test_import_is_one_change_and_one_undo_step(data_file, open_engine, export_file):
+    engine = open_engine(data_file)
+    engine.create_board("Roadmap")
+    before = contents(engine)
+    changes = []
+    engine.subscribe(changes.append)
+    board_id = engine.import_board(read_trello_board(export_file))
+    assert len(changes) == 1
+    assert engine.current_board == board_id
+    assert engine.boards[board_id]["name"] == "Roadmap (2)"
+    engine.flush()
+    assert contents(open_engine(data_file)) == contents(engine)
+
+    assert engine.undo()
+    assert contents(engine) == before
@@ -0,0 +1,173 @@
+import codecs
+import json
+import os
+import re
+
+from model import Card, new_id, now_created, timestamp_created
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+## JSON Stream
+class JsonStream:
+    """Walks a JSON file a chunk at a time instead of loading it whole.
+
+    The caller steps through containers with object() and array() and takes
+    each value with value() (decoded by the C json decoder) or skip(). Only
+    the value being decoded has to fit in the buffer, so memory is bounded by
+    the largest single item, not the file. progress(bytes_read) is called
+    after every chunk."""
+    CHUNK = 64 * 1024
+
+    def __init__(self, f, progress=None):
+        self.file = f
+        self.progress = progress
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.bytes_read = 0
+        self.eof = False
+
+    def fill(self, size=CHUNK):
+        """Append at least size more bytes of the file to the buffer (less at the end)."""
+        chunk = self.file.read(max(size, self.CHUNK))
+        self.bytes_read += len(chunk)
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk, final=not chunk)
+        self.pos = 0
+        self.eof = not chunk
+        if self.progress:
+            self.progress(self.bytes_read)
+
+    def peek(self):
+        """The next character that isn't whitespace ('' at the end of the file)."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self.fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} near byte {self.bytes_read}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buffer, self.pos)
+                # A number at the very end of the buffer may go on in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            # Grow geometrically so a large value is decoded O(log n) times, not once per chunk
+            self.fill(len(self.buffer) - self.pos)
+
+    def skip(self):
+        """Step over the next value. Arrays are decoded an item at a time, so a huge one is never held whole."""
+        if self.peek() == '[':
+            for _ in self.array():
+                self.value()
+        else:
+            self.value()
+
+    def items(self, open_char, close_char):
+        self.expect(open_char)
+        if self.peek() == close_char:
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self.pos += 1
+            if char == close_char:
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or {close_char!r} near byte {self.bytes_read}")
+
+    def array(self):
+        """Iterate over an array; the caller must consume each item."""
+        return self.items('[', ']')
+
+    def object(self):
+        """Iterate over an object's keys; the caller must consume each value."""
+        for _ in self.items('{', '}'):
+            key = self.value()
+            self.expect(':')
+            yield key
+
+
+## Trello Import
+def trello_created(trello_id):
+    """A card's creation time: Trello ids start with it as 8 hex digits of epoch seconds."""
+    try:
+        seconds = int(trello_id[:8], 16)
+    except (TypeError, ValueError):
+        return now_created()
+    return timestamp_created(seconds)
+
+
+def read_trello_board(path, progress=None):
+    """Stream a Trello board export (JSON) into a new TaskFlow board.
+
+    Keeps the board name, its open lists in Trello's order and their open
+    cards; actions, checklists, labels and the rest are stepped over without
+    being held in memory. Cards may come before the lists they belong to, as
+    they do in Trello's exports. progress(bytes_read, total_bytes) is called
+    as the file is read. Returns the board dict, ready for
+    BoardStore.import_board."""
+    total = os.path.getsize(path)
+    name = None
+    lists = {}  # Trello list id -> (pos, name)
+    cards = {}  # Trello list id -> [(pos, Card)]
+    with open(path, 'rb') as f:
+        stream = JsonStream(f, progress and (lambda done: progress(done, total)))
+        for key in stream.object():
+            if key == 'name':
+                name = stream.value()
+            elif key == 'lists':
+                for _ in stream.array():
+                    item = stream.value()
+                    if not item.get('closed'):
+                        lists[item['id']] = (item.get('pos', 0), item.get('name') or "Untitled")
+            elif key == 'cards':
+                for _ in stream.array():
+                    item = stream.value()
+                    if not item.get('closed'):
+                        card = Card(new_id(), item.get('name') or "", trello_created(item.get('id')))
+                        cards.setdefault(item.get('idList'), []).append((item.get('pos', 0), card))
+            else:
+                stream.skip()
+
+    board = {"id": new_id(), "name": name or os.path.splitext(os.path.basename(path))[0], "lists": {}}
+    for trello_id, (pos, list_name) in sorted(lists.items(), key=lambda item: item[1][0]):
+        entries = sorted(cards.get(trello_id, ()), key=lambda entry: entry[0])
+        list_id = new_id()
+        board["lists"][list_id] = {"id": list_id, "name": list_name, "cards": [card for pos, card in entries]}
+    return board
+
+
+if __name__ == "__main__":
+    import sys
+
+    from board_store import BoardStore
+    from storage import open_store
+
+    if len(sys.argv) < 3:
+        print("Usage: python trello.py taskflow_data.json trello_export.json [more exports...]")
+        sys.exit(1)
+    engine = BoardStore(open_store(sys.argv[1]))
+    engine.load()
+    for path in sys.argv[2:]:
+        board = read_trello_board(path, lambda done, total: print(f"\r{path}: {done * 100 // max(total, 1)}%",
+                                                                   end="", file=sys.stderr))
+        board_id = engine.import_board(board)
+        card_count = sum(len(list_data["cards"]) for list_data in board["lists"].values())
+        print(f"\rImported {path} as '{engine.boards[board_id]['name']}': "
+              f"{len(board['lists'])} lists, {card_count} cards", file=sys.stderr)
+    engine.close()